@@ -0,0 +1,43 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.users.principals import get_principal
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    Loads the user together with the profile in a single query,
+    or from the cache, see apps.users.principals.
+
+    The user is always loaded, so tokens of deactivated or deleted users
+    stop working as soon as the cached user is dropped.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+
+        return self.load_user(user_id)
+
+    def load_user(self, user_id):
+        user = get_principal(user_id)
+        if user is None:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found'
+            )
+
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+
+        return user
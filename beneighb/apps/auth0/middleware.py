@@ -0,0 +1,47 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from apps.auth0.authentication import JWTAuthentication
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections and event streams with the JWT
+    access token from the `token` query parameter, as browsers can't set
+    headers of WebSocket and EventSource requests.
+
+    The Authorization header is used as well, if present.
+    """
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+
+        header = dict(scope.get('headers', [])).get(b'authorization')
+        if token is None and header:
+            token = get_header_token(header)
+
+        scope['user'] = await get_user(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+def get_header_token(header):
+    parts = header.decode('latin-1').split()
+    if len(parts) == 2 and parts[0] == 'Bearer':
+        return parts[1]
+    return None
+
+
+@database_sync_to_async
+def get_user(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (AuthenticationFailed, InvalidToken):
+        return AnonymousUser()
@@ -1,18 +1,26 @@
 from unittest.mock import patch
 
 from django.core import mail
+from django.core.cache import cache
 from django.http import HttpResponse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.exceptions import ErrorDetail
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.auth0.authentication import JWTAuthentication
+from apps.chat.factories import ChatFactory
 
 from apps.users.factories import (
+    ProfileFactory,
     UserWithUnVerifiedEmailFactory,
     UserWithVerifiedEmailFactory,
 )
 from apps.users.models import User, Profile
+from apps.users.principals import local_cache
 
 AUTHORIZATION_HEADER_TEMPLATE = 'Bearer {token}'
 
@@ -286,3 +294,73 @@ class ResetEmailSendsCorrectEmailTestCase(TestCase):
         expected_link = 'https://link.beneighb.com/confirm-email/'
 
         self.assertIn(expected_link, email.body)
+
+
+class JWTAuthenticationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithVerifiedEmailFactory(
+            username=USERNAME, email=EMAIL, profile=ProfileFactory()
+        )
+        cls.USER.set_password(PASSWORD)
+        cls.USER.save()
+
+    def get_token(self):
+        client = APIClient()
+        response = client.post(
+            '/auth/token/', {'username': EMAIL, 'password': PASSWORD}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['access']
+
+    def test_loads_user_with_profile_in_single_query(self):
+        token = RefreshToken.for_user(self.USER).access_token
+
+        with self.assertNumQueries(1):
+            user = JWTAuthentication().get_user(token)
+            self.assertEqual(user.profile, self.USER.profile)
+
+    def test_rejects_deactivated_user(self):
+        token = AccessToken(self.get_token())
+
+        self.USER.is_active = False
+        self.USER.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            JWTAuthentication().get_user(token)
+
+    def test_rejects_deactivated_user_in_request(self):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=AUTHORIZATION_HEADER_TEMPLATE.format(
+                token=self.get_token()
+            )
+        )
+
+        self.USER.is_active = False
+        self.USER.save()
+
+        response = client.get('/chats/')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(PRINCIPALS_CACHE=1)
+    def test_request_with_cached_user_skips_user_lookup(self):
+        cache.clear()
+        self.addCleanup(local_cache.clear)
+        ChatFactory(offer__helper=self.USER.profile)
+
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=AUTHORIZATION_HEADER_TEMPLATE.format(
+                token=self.get_token()
+            )
+        )
+        client.get('/chats/')
+
+        # Chats, last messages
+        with self.assertNumQueries(2):
+            response = client.get('/chats/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
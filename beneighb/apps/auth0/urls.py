@@ -10,13 +10,18 @@ from apps.auth0.views import (
     DummyView,
     GoogleLoginView,
 )
+from apps.core.throttling import TokenObtainThrottle
 
 # namespace ↓ (view names need to be prefixed with 'auth0:')
 # app_name = 'auth0'
 
 urlpatterns = [
     path('dummy/', DummyView.as_view(), name='dummy-view'),
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path(
+        'token/',
+        TokenObtainPairView.as_view(throttle_classes=[TokenObtainThrottle]),
+        name='token_obtain_pair',
+    ),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('password-reset/', BeneighbPasswordResetView.as_view()),
     path(
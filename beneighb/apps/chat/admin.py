@@ -6,12 +6,13 @@ from .models import Chat, Message
 @admin.register(Chat)
 class ChatAdmin(admin.ModelAdmin):
     list_display = ['id', 'get_offer_helper', 'get_task_owner', 'created_at']
+    list_select_related = ['helper', 'owner']
 
     def get_task_owner(self, obj):
-        return obj.offer.task.owner
+        return obj.owner
 
     def get_offer_helper(self, obj):
-        return obj.offer.helper
+        return obj.helper
 
     get_task_owner.short_description = 'Task owner'
     get_offer_helper.short_description = 'Offer helper'
@@ -25,7 +26,6 @@ admin.site.register(
         'recipient',
         'chat',
         'sent_at',
-        'read_at',
         'text',
     ],
 )
@@ -0,0 +1,70 @@
+import logging
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from apps.chat.events import get_chat_group
+from apps.chat.views.permissions import get_chat_participant_ids
+from apps.core.pubsub import subscribe, unsubscribe
+
+logger = logging.getLogger(__name__)
+
+# Close codes of the rejected connections, mirroring HTTP statuses
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_NOT_FOUND = 4404
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes new messages and read receipts of the chat to its participants.
+
+    Messages are still sent and marked as read through the REST API,
+    the connection is used by the server only.
+    """
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHORIZED)
+            return
+
+        self.chat_id = self.scope['url_route']['kwargs']['chat_id']
+        self.profile_id = user.profile_id
+
+        # Same rules as ChatAccessPermissionClass
+        participant_ids = await database_sync_to_async(
+            get_chat_participant_ids
+        )(self.chat_id)
+        if not participant_ids:
+            await self.close(code=CLOSE_NOT_FOUND)
+            return
+        if self.profile_id not in participant_ids:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.group = get_chat_group(self.chat_id)
+        await subscribe(self.channel_layer, self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await unsubscribe(
+                self.channel_layer, self.group, self.channel_name
+            )
+
+    async def chat_message(self, event):
+        message = dict(event['message'])
+        message['is_mine'] = message.pop('sender') == self.profile_id
+
+        await self.send_json({'type': 'message', 'message': message})
+
+    async def chat_read(self, event):
+        await self.send_json(
+            {
+                'type': 'read',
+                'message': event['message'],
+                'read_at': event['read_at'],
+                'is_mine': event['reader'] == self.profile_id,
+            }
+        )
@@ -0,0 +1,34 @@
+from rest_framework.fields import DateTimeField
+
+from apps.chat.serializers import MessageEventSerializer
+from apps.core.pubsub import publish
+
+
+def get_chat_group(chat_id):
+    return f'chat-{chat_id}'
+
+
+def broadcast_message(message):
+    publish(
+        get_chat_group(message.chat_id),
+        {
+            'type': 'chat.message',
+            'message': MessageEventSerializer(message).data,
+        },
+    )
+
+
+def broadcast_read(chat_id, message_id, reader_id, read_at):
+    """
+    Tells the participants that the reader has read the message
+    and all the former messages of the chat.
+    """
+    publish(
+        get_chat_group(chat_id),
+        {
+            'type': 'chat.read',
+            'message': message_id,
+            'read_at': DateTimeField().to_representation(read_at),
+            'reader': reader_id,
+        },
+    )
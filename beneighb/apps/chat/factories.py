@@ -29,7 +29,11 @@ class ChatFactory(DjangoModelFactory):
             kwargs['offer_id'] = offer.id
 
         if not hasattr(offer, 'chat'):
-            chat = super().create(offer=offer)
+            chat = super().create(
+                offer=offer,
+                owner_id=offer.task.owner_id,
+                helper_id=offer.helper_id,
+            )
         else:
             chat = offer.chat
 
@@ -55,8 +59,8 @@ class MessageFactory(DjangoModelFactory):
 
     @factory.post_generation
     def set_recipient(self, create, extracted, **kwargs):
-        offer_helper = self.chat.offer.helper
-        task_owner = self.chat.offer.task.owner
+        offer_helper = self.chat.helper
+        task_owner = self.chat.owner
 
         if self.recipient not in (offer_helper, task_owner):
             self.recipient = (
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('chat', '0007_alter_chat_offer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(
+                fields=['chat', 'id'], name='message_chat_id_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,182 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:01
+
+from itertools import islice
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def create_read_watermarks(apps, schema_editor):
+    """
+    Creates watermarks at the last read message of every recipient
+    in every chat, and their history with every read_at of the messages,
+    so read_at of the messages is kept.
+    """
+    Message = apps.get_model('chat', 'Message')
+    ReadWatermark = apps.get_model('chat', 'ReadWatermark')
+    ReadWatermarkHistory = apps.get_model('chat', 'ReadWatermarkHistory')
+
+    read_messages = (
+        Message.objects.filter(read_at__isnull=False)
+        .values('chat_id', 'recipient_id')
+        .annotate(
+            last_read_message_id=models.Max('id'),
+            last_read_at=models.Max('read_at'),
+        )
+        .order_by()
+    )
+    _bulk_create(
+        ReadWatermark,
+        (
+            ReadWatermark(
+                chat_id=read['chat_id'],
+                profile_id=read['recipient_id'],
+                last_read_message_id=read['last_read_message_id'],
+                read_at=read['last_read_at'],
+            )
+            for read in read_messages.iterator()
+        ),
+    )
+
+    reads = (
+        Message.objects.filter(read_at__isnull=False)
+        .values('chat_id', 'recipient_id', 'read_at')
+        .annotate(last_read_message_id=models.Max('id'))
+        .order_by()
+    )
+    _bulk_create(
+        ReadWatermarkHistory,
+        (
+            ReadWatermarkHistory(
+                chat_id=read['chat_id'],
+                profile_id=read['recipient_id'],
+                last_read_message_id=read['last_read_message_id'],
+                read_at=read['read_at'],
+            )
+            for read in reads.iterator()
+        ),
+    )
+
+
+def restore_read_at(apps, schema_editor):
+    Message = apps.get_model('chat', 'Message')
+    ReadWatermarkHistory = apps.get_model('chat', 'ReadWatermarkHistory')
+
+    first_reads = ReadWatermarkHistory.objects.filter(
+        chat_id=OuterRef('chat_id'),
+        profile_id=OuterRef('recipient_id'),
+        last_read_message_id__gte=OuterRef('id'),
+    ).order_by('last_read_message_id')
+    Message.objects.update(read_at=Subquery(first_reads.values('read_at')[:1]))
+
+
+def _bulk_create(model, objects):
+    while batch := list(islice(objects, BATCH_SIZE)):
+        model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0013_push_notification_collapse_key'),
+        ('chat', '0008_message_chat_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadWatermark',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('last_read_message_id', models.BigIntegerField()),
+                ('read_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(
+                fields=['recipient', 'chat', 'id'],
+                name='message_recipient_chat_id_idx',
+            ),
+        ),
+        migrations.AddField(
+            model_name='readwatermark',
+            name='chat',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='read_watermarks',
+                to='chat.chat',
+            ),
+        ),
+        migrations.AddField(
+            model_name='readwatermark',
+            name='profile',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='read_watermarks',
+                to='users.profile',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='readwatermark',
+            constraint=models.UniqueConstraint(
+                fields=('chat', 'profile'),
+                name='readwatermark_chat_profile_unique',
+            ),
+        ),
+        migrations.CreateModel(
+            name='ReadWatermarkHistory',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('last_read_message_id', models.BigIntegerField()),
+                ('read_at', models.DateTimeField()),
+                (
+                    'chat',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='read_watermark_history',
+                        to='chat.chat',
+                    ),
+                ),
+                (
+                    'profile',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='read_watermark_history',
+                        to='users.profile',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name_plural': 'read watermark history',
+                'indexes': [
+                    models.Index(
+                        fields=['chat', 'last_read_message_id'],
+                        name='readwatermarkhistory_chat_idx',
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_read_watermarks, restore_read_at),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_at',
+        ),
+    ]
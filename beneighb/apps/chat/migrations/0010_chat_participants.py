@@ -0,0 +1,79 @@
+# Generated by Django 4.2.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def copy_chat_participants(apps, schema_editor):
+    """
+    Copies the task owner and the helper of the offer to every chat.
+    """
+    Chat = apps.get_model('chat', 'Chat')
+    Offer = apps.get_model('marketplace', 'Offer')
+
+    offers = Offer.objects.filter(id=models.OuterRef('offer_id'))
+    chats = Chat.objects.filter(owner__isnull=True).order_by('id')
+
+    last_id = 0
+    while batch := list(
+        chats.filter(id__gt=last_id).values_list('id', flat=True)[:BATCH_SIZE]
+    ):
+        Chat.objects.filter(id__in=batch).update(
+            owner_id=models.Subquery(offers.values('task__owner_id')),
+            helper_id=models.Subquery(offers.values('helper_id')),
+        )
+        last_id = batch[-1]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0013_push_notification_collapse_key'),
+        ('marketplace', '0018_offer_helper_task_idx'),
+        ('chat', '0009_read_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='helper',
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='helped_chats',
+                to='users.profile',
+            ),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='owner',
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='owned_chats',
+                to='users.profile',
+            ),
+        ),
+        migrations.RunPython(
+            copy_chat_participants, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='chat',
+            name='helper',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='helped_chats',
+                to='users.profile',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='chat',
+            name='owner',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='owned_chats',
+                to='users.profile',
+            ),
+        ),
+    ]
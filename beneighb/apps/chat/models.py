@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models import Exists, OuterRef, Subquery
 
 
 class Chat(models.Model):
@@ -6,10 +7,62 @@ class Chat(models.Model):
         'marketplace.Offer',
         on_delete=models.CASCADE,
     )
+    # Participants copied from the offer, so that membership checks
+    # don't have to join offer and task
+    owner = models.ForeignKey(
+        'users.Profile',
+        on_delete=models.CASCADE,
+        related_name='owned_chats',
+    )
+    helper = models.ForeignKey(
+        'users.Profile',
+        on_delete=models.CASCADE,
+        related_name='helped_chats',
+    )
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
 
     def __str__(self):
-        return f'Chat-{self.id}|Offer-{self.offer.id}'
+        return f'Chat-{self.id}|Offer-{self.offer_id}'
+
+
+class MessageQuerySet(models.QuerySet):
+    def with_read_at(self):
+        """
+        Annotates read_at of the messages from the history of the read
+        watermarks of the participants who have not sent them.
+        """
+        return self.annotate(read_at=Subquery(_get_first_reads()[:1]))
+
+    def unread(self):
+        return self.filter(~Exists(_get_reader_watermarks()))
+
+    def unread_by(self, profile_id):
+        """
+        Messages sent to the profile and not read by it yet.
+
+        Same as filtering by recipient and unread(), but reads only
+        recipient, chat and id of the messages, which are covered by
+        message_recipient_chat_id_idx.
+        """
+        watermarks = ReadWatermark.objects.filter(
+            chat_id=OuterRef('chat_id'),
+            profile_id=profile_id,
+            last_read_message_id__gte=OuterRef('id'),
+        )
+        return self.filter(recipient_id=profile_id).filter(~Exists(watermarks))
+
+    def count_unread_by_chat(self, profile_id):
+        """
+        Returns (chat id, count) of the messages unread by the profile
+        in every chat with unread messages.
+        """
+        return (
+            self.unread_by(profile_id)
+            .order_by()
+            .values('chat')
+            .annotate(count=models.Count('id'))
+            .values_list('chat', 'count')
+        )
 
 
 class Message(models.Model):
@@ -33,9 +86,197 @@ class Message(models.Model):
     )
 
     sent_at = models.DateTimeField()
-    read_at = models.DateTimeField(null=True, blank=True)
 
     text = models.TextField(max_length=300)
 
+    objects = MessageQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat', 'id'], name='message_chat_id_idx'),
+            models.Index(
+                fields=['recipient', 'chat', 'id'],
+                name='message_recipient_chat_id_idx',
+            ),
+        ]
+
+    @property
+    def read_at(self):
+        """
+        When the message has been read, that is when the read watermark
+        of the other participant of the chat has passed it first.
+        """
+        if not hasattr(self, '_read_at'):
+            self._read_at = (
+                ReadWatermarkHistory.objects.filter(
+                    chat_id=self.chat_id,
+                    last_read_message_id__gte=self.id,
+                )
+                .exclude(profile_id=self.sender_id)
+                .order_by('last_read_message_id')
+                .values_list('read_at', flat=True)
+                .first()
+            )
+        return self._read_at
+
+    @read_at.setter
+    def read_at(self, value):
+        # Set by MessageQuerySet.with_read_at
+        self._read_at = value
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('_read_at', None)
+
     def __str__(self):
         return f'Message-{self.id}|Chat-{self.id}|Offer-{self.chat.offer.id}'  # noqa
+
+
+class ReadWatermarkManager(models.Manager):
+    def advance(self, chat_id, profile_id, message_id, read_at):
+        """
+        Marks all the messages of the chat up to the message as read
+        by the profile with a single upsert.
+
+        Returns False if they have already been read.
+        """
+        advanced = self.advance_many(
+            profile_id, [(chat_id, message_id, read_at)]
+        )
+        return bool(advanced)
+
+    def advance_many(self, profile_id, watermarks):
+        """
+        Same as advance() for (chat id, message id, read_at) of several
+        chats, with a single statement. Chats must not repeat.
+
+        The advanced watermarks are added to their history, which keeps
+        read_at of the messages read before.
+
+        Returns (chat id, message id, read_at) of the advanced watermarks.
+        """
+        if not watermarks:
+            return []
+
+        table = self.model._meta.db_table
+        history_table = ReadWatermarkHistory._meta.db_table
+        values = ', '.join(['(%s, %s, %s, %s)'] * len(watermarks))
+        params = [
+            param
+            for chat_id, message_id, read_at in watermarks
+            for param in (chat_id, profile_id, message_id, read_at)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH advanced AS (
+                    INSERT INTO {table}
+                        (chat_id, profile_id, last_read_message_id, read_at)
+                    VALUES {values}
+                    ON CONFLICT (chat_id, profile_id) DO UPDATE SET
+                        last_read_message_id = EXCLUDED.last_read_message_id,
+                        read_at = EXCLUDED.read_at
+                    WHERE {table}.last_read_message_id
+                        < EXCLUDED.last_read_message_id
+                    RETURNING chat_id, profile_id, last_read_message_id,
+                        read_at
+                )
+                INSERT INTO {history_table}
+                    (chat_id, profile_id, last_read_message_id, read_at)
+                SELECT chat_id, profile_id, last_read_message_id, read_at
+                FROM advanced
+                RETURNING chat_id, last_read_message_id, read_at
+                """,
+                params,
+            )
+            return cursor.fetchall()
+
+
+class ReadWatermark(models.Model):
+    """
+    Messages of the chat sent to the profile are read up to
+    last_read_message_id, the last of them has been read at read_at.
+    """
+
+    chat = models.ForeignKey(
+        Chat,
+        on_delete=models.CASCADE,
+        related_name='read_watermarks',
+    )
+    profile = models.ForeignKey(
+        'users.Profile',
+        on_delete=models.CASCADE,
+        related_name='read_watermarks',
+    )
+    last_read_message_id = models.BigIntegerField()
+    read_at = models.DateTimeField()
+
+    objects = ReadWatermarkManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['chat', 'profile'],
+                name='readwatermark_chat_profile_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'Chat-{self.chat_id}|Profile-{self.profile_id}'
+            f'|Message-{self.last_read_message_id}'
+        )
+
+
+class ReadWatermarkHistory(models.Model):
+    """
+    Every advance of a read watermark, the messages of the chat up to
+    last_read_message_id not read before have been read at read_at.
+    """
+
+    chat = models.ForeignKey(
+        Chat,
+        on_delete=models.CASCADE,
+        related_name='read_watermark_history',
+    )
+    profile = models.ForeignKey(
+        'users.Profile',
+        on_delete=models.CASCADE,
+        related_name='read_watermark_history',
+    )
+    last_read_message_id = models.BigIntegerField()
+    read_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'read watermark history'
+        indexes = [
+            models.Index(
+                fields=['chat', 'last_read_message_id'],
+                name='readwatermarkhistory_chat_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'Chat-{self.chat_id}|Profile-{self.profile_id}'
+            f'|Message-{self.last_read_message_id}'
+        )
+
+
+def _get_first_reads():
+    return (
+        ReadWatermarkHistory.objects.filter(
+            chat_id=OuterRef('chat_id'),
+            last_read_message_id__gte=OuterRef('id'),
+        )
+        .exclude(profile_id=OuterRef('sender_id'))
+        .order_by('last_read_message_id')
+        .values('read_at')
+    )
+
+
+def _get_reader_watermarks():
+    return ReadWatermark.objects.filter(
+        chat_id=OuterRef('chat_id'),
+        last_read_message_id__gte=OuterRef('id'),
+    ).exclude(profile_id=OuterRef('sender_id'))
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from apps.chat.consumers import ChatConsumer
+
+websocket_urlpatterns = [
+    path('ws/chats/<int:chat_id>/', ChatConsumer.as_asgi()),
+]
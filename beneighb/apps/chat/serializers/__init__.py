@@ -4,7 +4,11 @@ from .chat import (  # noqa
 )
 
 from .message import (  # noqa
+    MessageBatchCreateSerializer,
+    MessageBatchMarkAsReadSerializer,
     MessageCreateSerializer,
+    MessageEventSerializer,
     MessageMarkAsReadSerializer,
     MessageSerializer,
+    ReadWatermarkSerializer,
 )
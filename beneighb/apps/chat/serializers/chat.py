@@ -1,22 +1,23 @@
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
-from apps.chat.models import Chat
+
+from apps.chat.models import Chat, Message
+from apps.chat.serializers.message import MessageSerializer
 
 
 class BaseChatSerializer(serializers.ModelSerializer):
-    service = serializers.IntegerField(
-        source='offer.task.service.id'
-    )
+    service = serializers.IntegerField(source='offer.task.service_id')
     profile_name = serializers.SerializerMethodField()
-    offer = serializers.IntegerField(source='offer.id')
+    offer = serializers.IntegerField(source='offer_id')
 
     def get_profile_name(self, obj):
-        my_profile = self.context['request'].user.profile
-
-        task_owner = obj.offer.task.owner
-        offer_helper = obj.offer.helper
+        my_profile_id = self.context['request'].user.profile_id
 
         return (
-            offer_helper.name if my_profile == task_owner else task_owner.name
+            obj.helper.name
+            if my_profile_id == obj.owner_id
+            else obj.owner.name
         )
 
     class Meta:
@@ -35,5 +36,54 @@ class ChatSerializer(BaseChatSerializer):
 
 
 class ChatWithMessageDataSerializer(BaseChatSerializer):
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField(read_only=True)
+
     class Meta(BaseChatSerializer.Meta):
-        fields = BaseChatSerializer.Meta.fields
+        fields = BaseChatSerializer.Meta.fields + (
+            'last_message',
+            'unread_count',
+        )
+
+    @staticmethod
+    def setup_eager_loading(queryset, profile_id):
+        """
+        Loads the chats with their participants, last messages and counts
+        of the messages unread by the profile in a fixed number of queries,
+        ordered by the last activity.
+        """
+        last_message = Message.objects.with_read_at().order_by('-id')[:1]
+
+        chat_messages = Message.objects.filter(chat=OuterRef('pk'))
+        last_message_created_at = chat_messages.order_by('-id').values(
+            'created_at'
+        )[:1]
+        unread_count = chat_messages.count_unread_by_chat(profile_id).values(
+            'count'
+        )
+
+        return (
+            queryset.select_related('offer__task', 'owner', 'helper')
+            .prefetch_related(
+                Prefetch(
+                    'messages', queryset=last_message, to_attr='last_messages'
+                )
+            )
+            .annotate(
+                last_activity_at=Coalesce(
+                    Subquery(last_message_created_at), F('created_at')
+                ),
+                unread_count=Coalesce(Subquery(unread_count), 0),
+            )
+            .order_by('-last_activity_at', '-id')
+        )
+
+    def get_last_message(self, obj):
+        last_messages = getattr(obj, 'last_messages', None)
+        if last_messages is None:
+            last_messages = obj.messages.with_read_at().order_by('-id')[:1]
+
+        if not last_messages:
+            return None
+
+        return MessageSerializer(last_messages[0], context=self.context).data
@@ -1,9 +1,9 @@
-from django.db import transaction
 from rest_framework import serializers
-from apps.chat.models import Chat, Message
+from apps.chat.models import Message, ReadWatermark
 
 
 class MessageSerializer(serializers.ModelSerializer):
+    read_at = serializers.DateTimeField(read_only=True)
     is_mine = serializers.SerializerMethodField()
 
     class Meta:
@@ -18,10 +18,37 @@ class MessageSerializer(serializers.ModelSerializer):
         )
 
     def get_is_mine(self, obj):
-        return self.context['request'].user.profile == obj.sender
+        return self.context['request'].user.profile_id == obj.sender_id
+
+
+class MessageEventSerializer(serializers.ModelSerializer):
+    """
+    Message pushed to the chat participants over WebSocket, is_mine is
+    computed for each connection from sender.
+    """
+
+    read_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = Message
+        fields = (
+            'id',
+            'chat',
+            'sent_at',
+            'read_at',
+            'sender',
+            'text',
+        )
 
 
 class MessageCreateSerializer(serializers.ModelSerializer):
+    """
+    Expects the chat loaded by the view in the context,
+    the message is saved with it.
+    """
+
+    chat = serializers.PrimaryKeyRelatedField(read_only=True)
+    read_at = serializers.DateTimeField(read_only=True)
     is_mine = serializers.SerializerMethodField()
     sender = serializers.IntegerField(source='sender_id', write_only=True)
     recipient = serializers.IntegerField(
@@ -48,34 +75,45 @@ class MessageCreateSerializer(serializers.ModelSerializer):
         if hasattr(self.initial_data, '_mutable'):
             self.initial_data._mutable = True
 
-        current_profile = self.context['request'].user.profile
+        current_profile_id = self.context['request'].user.profile_id
 
-        self.initial_data['sender'] = current_profile.id
+        self.initial_data['sender'] = current_profile_id
         self.initial_data['recipient'] = self.get_receipient(
-            current_profile
-        ).id
-        self.initial_data['chat'] = self.context['view'].kwargs['chat_id']
-
-    def get_receipient(self, sender):
-        chat_id = self.context['view'].kwargs['chat_id']
-        chat = Chat.objects.get(id=chat_id)
-        task_owner = chat.offer.task.owner
-        helper = chat.offer.helper
-
-        if sender == task_owner:
-            return helper
-        elif sender == helper:
-            return task_owner
+            current_profile_id
+        )
+
+    def get_receipient(self, sender_id):
+        chat = self.context['chat']
+
+        if sender_id == chat.owner_id:
+            return chat.helper_id
+        elif sender_id == chat.helper_id:
+            return chat.owner_id
         else:
             raise serializers.ValidationError(
                 {'sender': 'You are not a member of this chat.'},
             )
 
     def get_is_mine(self, obj):
-        return self.context['request'].user.profile == obj.sender
+        return self.context['request'].user.profile_id == obj.sender_id
+
+
+class MessageBatchCreateSerializer(serializers.ModelSerializer):
+    """
+    Message of a batch, the chats of all the messages of the batch
+    are checked by the view at once.
+    """
+
+    chat = serializers.IntegerField(source='chat_id')
+
+    class Meta:
+        model = Message
+        fields = ('chat', 'sent_at', 'text')
 
 
 class MessageMarkAsReadSerializer(serializers.ModelSerializer):
+    read_at = serializers.DateTimeField(allow_null=True, required=False)
+
     class Meta:
         model = Message
         fields = ('id', 'read_at')
@@ -90,17 +128,29 @@ class MessageMarkAsReadSerializer(serializers.ModelSerializer):
         return data
 
     def update(self, instance, validated_data):
-        my_profile = self.context['request'].user.profile
-        chat_messages = instance.chat.messages.all()
-
-        unread_msgs = chat_messages.exclude(sender=my_profile).filter(
-            read_at=None,
-            sent_at__lte=instance.sent_at,
+        """
+        Moves read watermark of the current profile in the chat
+        up to the message, if it is not there yet.
+        """
+        self.is_advanced = ReadWatermark.objects.advance(
+            instance.chat_id,
+            self.context['request'].user.profile_id,
+            instance.id,
+            validated_data['read_at'],
         )
-
-        if unread_msgs.exists():
-            with transaction.atomic():
-                unread_msgs.update(read_at=validated_data.get('read_at'))
-                instance.refresh_from_db()
+        instance.refresh_from_db()
 
         return instance
+
+
+class MessageBatchMarkAsReadSerializer(serializers.Serializer):
+    message = serializers.IntegerField()
+    read_at = serializers.DateTimeField()
+
+
+class ReadWatermarkSerializer(serializers.ModelSerializer):
+    message = serializers.IntegerField(source='last_read_message_id')
+
+    class Meta:
+        model = ReadWatermark
+        fields = ('chat', 'message', 'read_at')
@@ -2,13 +2,15 @@ from unittest import mock
 from collections import OrderedDict
 
 from django.test import TestCase
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.users.factories import UserWithProfileFactory
 
-from apps.chat.factories import ChatFactory
+from apps.chat.factories import ChatFactory, MessageFactory
+from apps.chat.models import ReadWatermark
 from apps.users.tests.utils import get_client_with_valid_token
 
 
@@ -62,6 +64,8 @@ class ChatListTestCase(TestCase):
                 'offer': chat.offer.id,
                 'service': chat.offer.task.service.id,
                 'profile_name': chat.offer.task.owner.name,
+                'last_message': None,
+                'unread_count': 0,
             }
         )
 
@@ -84,6 +88,8 @@ class ChatListTestCase(TestCase):
                 'offer': chat.offer.id,
                 'service': chat.offer.task.service.id,
                 'profile_name': chat.offer.helper.name,
+                'last_message': None,
+                'unread_count': 0,
             }
         )
 
@@ -111,3 +117,69 @@ class ChatListTestCase(TestCase):
         response = client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
+
+
+class ChatListInboxTestCase(TestCase):
+    url = '/chats/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.CHATS = [
+            ChatFactory(offer__helper=cls.USER.profile) for i in range(3)
+        ]
+
+    def test_returns_last_message_and_unread_count(self):
+        chat = self.CHATS[0]
+        task_owner = chat.offer.task.owner
+
+        messages = [
+            MessageFactory(chat=chat, sender=task_owner) for i in range(3)
+        ]
+        ReadWatermark.objects.advance(
+            chat.id, self.USER.profile.id, messages[0].id, timezone.now()
+        )
+        last_message = MessageFactory(chat=chat, sender=self.USER.profile)
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data[0]['id'], chat.id)
+        self.assertEqual(response.data[0]['unread_count'], 2)
+        self.assertEqual(
+            response.data[0]['last_message'],
+            {
+                'id': last_message.id,
+                'chat': chat.id,
+                'sent_at': mock.ANY,
+                'read_at': None,
+                'is_mine': True,
+                'text': last_message.text,
+            },
+        )
+
+    def test_ordered_by_last_activity(self):
+        MessageFactory(chat=self.CHATS[1], sender=self.USER.profile)
+        MessageFactory(chat=self.CHATS[0], sender=self.USER.profile)
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.get(self.url)
+
+        self.assertEqual(
+            [chat['id'] for chat in response.data],
+            [self.CHATS[0].id, self.CHATS[1].id, self.CHATS[2].id],
+        )
+
+    def test_number_of_queries_does_not_depend_on_chats(self):
+        for chat in self.CHATS:
+            for i in range(2):
+                MessageFactory(chat=chat, sender=chat.offer.task.owner)
+
+        client = get_client_with_valid_token(self.USER)
+
+        # User, chats, last messages
+        with self.assertNumQueries(3):
+            response = client.get(self.url)
+
+        self.assertEqual(len(response.data), 3)
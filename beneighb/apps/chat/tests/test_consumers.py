@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.chat.consumers import (
+    CLOSE_FORBIDDEN,
+    CLOSE_NOT_FOUND,
+    CLOSE_UNAUTHORIZED,
+)
+from apps.chat.factories import ChatFactory, MessageFactory
+from apps.users.factories import UserWithProfileFactory
+from apps.users.tests.utils import get_client_with_valid_token
+from beneighb.asgi import application
+
+
+# Consumers query the database from other threads, so the data
+# have to be committed instead of living in a test case transaction
+@mock.patch('apps.chat.views.message.enqueue_collapsible_push_notification')
+class ChatConsumerTestCase(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.helper = UserWithProfileFactory()
+        self.owner = UserWithProfileFactory()
+        self.chat = ChatFactory(
+            offer__helper=self.helper.profile,
+            offer__task__owner=self.owner.profile,
+        )
+
+    def get_url(self, user=None, chat_id=None):
+        url = f'/ws/chats/{chat_id or self.chat.id}/'
+        if user:
+            url += f'?token={RefreshToken.for_user(user).access_token}'
+        return url
+
+    def get_communicator(self, url):
+        # Has to be created in the event loop of the test
+        return WebsocketCommunicator(application, url)
+
+    def assert_rejected(self, url, code):
+        async def connect():
+            communicator = self.get_communicator(url)
+            connected, close_code = await communicator.connect()
+            await communicator.disconnect()
+            return connected, close_code
+
+        connected, close_code = async_to_sync(connect)()
+        self.assertFalse(connected)
+        self.assertEqual(close_code, code)
+
+    def test_rejects_without_token(self, _mocked_enqueue):
+        self.assert_rejected(self.get_url(), CLOSE_UNAUTHORIZED)
+
+    def test_rejects_invalid_token(self, _mocked_enqueue):
+        url = f'/ws/chats/{self.chat.id}/?token=invalid'
+        self.assert_rejected(url, CLOSE_UNAUTHORIZED)
+
+    def test_rejects_non_participant(self, _mocked_enqueue):
+        url = self.get_url(UserWithProfileFactory())
+        self.assert_rejected(url, CLOSE_FORBIDDEN)
+
+    def test_rejects_non_existing_chat(self, _mocked_enqueue):
+        url = self.get_url(self.helper, chat_id=self.chat.id + 1000)
+        self.assert_rejected(url, CLOSE_NOT_FOUND)
+
+    def test_pushes_new_message_to_participants(self, _mocked_enqueue):
+        client = get_client_with_valid_token(self.helper)
+        url = f'/chats/{self.chat.id}/messages/'
+        data = {
+            'text': 'Hello world',
+            'sent_at': datetime.now(tz=timezone.utc) + timedelta(days=1),
+        }
+
+        helper_url = self.get_url(self.helper)
+        owner_url = self.get_url(self.owner)
+
+        async def send_message():
+            helper = self.get_communicator(helper_url)
+            owner = self.get_communicator(owner_url)
+            await helper.connect()
+            await owner.connect()
+
+            response = await sync_to_async(client.post)(url, data)
+
+            events = [
+                await helper.receive_json_from(),
+                await owner.receive_json_from(),
+            ]
+            await helper.disconnect()
+            await owner.disconnect()
+            return response, events
+
+        response, (helper_event, owner_event) = async_to_sync(send_message)()
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(helper_event['type'], 'message')
+        self.assertEqual(helper_event['message']['id'], response.data['id'])
+        self.assertEqual(helper_event['message']['text'], 'Hello world')
+        self.assertTrue(helper_event['message']['is_mine'])
+
+        self.assertEqual(
+            owner_event['message'],
+            dict(helper_event['message'], is_mine=False),
+        )
+
+    def test_pushes_read_receipt(self, _mocked_enqueue):
+        message = MessageFactory(
+            chat=self.chat,
+            sender=self.helper.profile,
+            recipient=self.owner.profile,
+        )
+        client = get_client_with_valid_token(self.owner)
+        url = f'/chats/messages/{message.id}/mark-as-read/'
+
+        helper_url = self.get_url(self.helper)
+
+        async def mark_as_read():
+            helper = self.get_communicator(helper_url)
+            await helper.connect()
+
+            response = await sync_to_async(client.put)(
+                url, {'read_at': datetime.now(tz=timezone.utc)}
+            )
+
+            event = await helper.receive_json_from()
+            await helper.disconnect()
+            return response, event
+
+        response, event = async_to_sync(mark_as_read)()
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            event,
+            {
+                'type': 'read',
+                'message': message.id,
+                'read_at': response.data['read_at'],
+                'is_mine': False,
+            },
+        )
@@ -41,7 +41,29 @@ class CreateMessageTestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
-    @mock.patch('apps.chat.views.message.send_push_notification')
+    @mock.patch(
+        'apps.chat.views.message.enqueue_collapsible_push_notification'
+    )
+    def test_idempotent(self, mocked_send_push_notification):
+        data = self._get_correct_data()
+        client = get_client_with_valid_token(self.USER)
+
+        responses = [
+            client.post(
+                self.url, data, HTTP_X_IDEMPOTENCY_KEY='Some-idempotency-key'
+            )
+            for _ in range(2)
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(responses[1].data, responses[0].data)
+
+        self.assertEqual(Message.objects.count(), 1)
+        self.assertEqual(mocked_send_push_notification.call_count, 1)
+
+    @mock.patch(
+        'apps.chat.views.message.enqueue_collapsible_push_notification'
+    )
     def test_success_for_helper(self, mocked_send_push_notification):
         data = self._get_correct_data()
 
@@ -84,7 +106,9 @@ class CreateMessageTestCase(TestCase):
             },
         )
 
-    @mock.patch('apps.chat.views.message.send_push_notification')
+    @mock.patch(
+        'apps.chat.views.message.enqueue_collapsible_push_notification'
+    )
     def test_success_for_owner(self, mocked_send_push_notification):
         data = self._get_correct_data()
 
@@ -126,7 +150,9 @@ class CreateMessageTestCase(TestCase):
             },
         )
 
-    @mock.patch('apps.chat.views.message.send_push_notification')
+    @mock.patch(
+        'apps.chat.views.message.enqueue_collapsible_push_notification'
+    )
     def test_user_without_permissions(self, mocked_send_push_notification):
         data = self._get_correct_data()
 
@@ -148,7 +174,9 @@ class CreateMessageTestCase(TestCase):
         self.assertEqual(Message.objects.count(), 0)
         self.assertEqual(mocked_send_push_notification.call_count, 0)
 
-    @mock.patch('apps.chat.views.message.send_push_notification')
+    @mock.patch(
+        'apps.chat.views.message.enqueue_collapsible_push_notification'
+    )
     def test_incorrect_chat_id(self, mocked_send_push_notification):
         data = self._get_correct_data()
 
@@ -219,3 +247,21 @@ class CreateMessageTestCase(TestCase):
         )
 
         self.assertEqual(Message.objects.count(), 0)
+
+    @mock.patch(
+        'apps.chat.views.message.enqueue_collapsible_push_notification'
+    )
+    def test_number_of_queries(self, mocked_send_push_notification):
+        data = self._get_correct_data()
+
+        client = get_client_with_valid_token(self.USER)
+
+        # User, chat with participants, savepoints around the insert
+        with self.assertNumQueries(5):
+            response = client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            mocked_send_push_notification.call_args[0][0],
+            Chat.objects.get().owner,
+        )
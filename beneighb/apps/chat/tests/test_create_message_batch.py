@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.chat.factories import ChatFactory
+from apps.chat.models import Message
+from apps.chat.views.message import CHAT_PUSH_COLLAPSE_KEY
+from apps.core.throttling import LocalTokenBucket
+from apps.users.factories import UserWithProfileFactory
+from apps.users.tests.utils import get_client_with_valid_token
+
+
+@mock.patch('apps.chat.views.message.enqueue_collapsible_push_notification')
+class CreateMessageBatchTestCase(TestCase):
+    url = '/chats/messages/batch/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.HELPER_CHAT = ChatFactory(offer__helper=cls.USER.profile)
+        cls.OWNER_CHAT = ChatFactory(offer__task__owner=cls.USER.profile)
+
+    def setUp(self):
+        super().setUp()
+
+        # The user has a full budget of messages in every test
+        patcher = mock.patch(
+            'apps.core.throttling.get_backend',
+            return_value=LocalTokenBucket(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_data(self, *chats):
+        sent_at = datetime.now(tz=timezone.utc) - timedelta(minutes=5)
+        return [
+            {
+                'chat': chat.id,
+                'sent_at': sent_at + timedelta(seconds=i),
+                'text': f'Message {i}',
+            }
+            for i, chat in enumerate(chats)
+        ]
+
+    def test_returns_401_without_token(self, mocked_enqueue):
+        client = APIClient()
+
+        data = self.get_data(self.HELPER_CHAT)
+        response = client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sends_messages_to_several_chats(self, mocked_enqueue):
+        client = get_client_with_valid_token(self.USER)
+
+        data = self.get_data(
+            self.HELPER_CHAT, self.OWNER_CHAT, self.HELPER_CHAT
+        )
+        # User, chats, savepoint, insert, savepoint
+        with self.assertNumQueries(5):
+            response = client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        messages = list(Message.objects.order_by('id'))
+        self.assertEqual(
+            [message.text for message in messages],
+            ['Message 0', 'Message 1', 'Message 2'],
+        )
+        self.assertEqual(
+            [message.recipient for message in messages],
+            [
+                self.HELPER_CHAT.owner,
+                self.OWNER_CHAT.helper,
+                self.HELPER_CHAT.owner,
+            ],
+        )
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    'id': message.id,
+                    'chat': message.chat_id,
+                    'sent_at': mock.ANY,
+                    'read_at': None,
+                    'is_mine': True,
+                    'text': message.text,
+                }
+                for message in messages
+            ],
+        )
+
+    def test_notifies_recipients_once_per_chat(self, mocked_enqueue):
+        client = get_client_with_valid_token(self.USER)
+
+        data = self.get_data(
+            self.HELPER_CHAT, self.OWNER_CHAT, self.HELPER_CHAT
+        )
+        response = client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(mocked_enqueue.call_count, 2)
+        calls = {call.args[0]: call for call in mocked_enqueue.call_args_list}
+
+        helper_chat_call = calls[self.HELPER_CHAT.owner]
+        self.assertEqual(helper_chat_call.args[1], 'Message 2')
+        self.assertEqual(helper_chat_call.kwargs['count'], 2)
+        self.assertEqual(
+            helper_chat_call.kwargs['collapse_key'], CHAT_PUSH_COLLAPSE_KEY
+        )
+
+        owner_chat_call = calls[self.OWNER_CHAT.helper]
+        self.assertEqual(owner_chat_call.args[1], 'Message 1')
+        self.assertEqual(owner_chat_call.kwargs['count'], 1)
+
+    def test_rejects_batch_with_foreign_chat(self, mocked_enqueue):
+        client = get_client_with_valid_token(self.USER)
+
+        data = self.get_data(self.HELPER_CHAT, ChatFactory())
+        response = client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Message.objects.count(), 0)
+        self.assertEqual(mocked_enqueue.call_count, 0)
+
+    def test_rejects_batch_with_non_existing_chat(self, mocked_enqueue):
+        client = get_client_with_valid_token(self.USER)
+
+        data = self.get_data(self.HELPER_CHAT)
+        data[0]['chat'] = self.OWNER_CHAT.id + 1000
+        response = client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Message.objects.count(), 0)
+
+    def test_rejects_invalid_messages(self, mocked_enqueue):
+        client = get_client_with_valid_token(self.USER)
+
+        data = self.get_data(self.HELPER_CHAT, self.HELPER_CHAT)
+        data[1]['text'] = ''
+        response = client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('text', response.data[1])
+        self.assertEqual(Message.objects.count(), 0)
+
+    def test_rejects_empty_and_too_large_batches(self, mocked_enqueue):
+        client = get_client_with_valid_token(self.USER)
+
+        response = client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data = self.get_data(*[self.HELPER_CHAT] * 101)
+        response = client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(Message.objects.count(), 0)
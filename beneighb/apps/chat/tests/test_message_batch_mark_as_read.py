@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.chat.factories import ChatFactory, MessageFactory
+from apps.chat.models import Message, ReadWatermark
+from apps.users.factories import UserWithProfileFactory
+from apps.users.tests.utils import get_client_with_valid_token
+
+
+class MessageBatchMarkAsReadTestCase(TestCase):
+    url = '/chats/messages/mark-as-read/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.CHATS = [
+            ChatFactory(offer__helper=cls.USER.profile) for i in range(2)
+        ]
+        cls.MESSAGES = [
+            [MessageFactory(chat=chat, sender=chat.owner) for i in range(3)]
+            for chat in cls.CHATS
+        ]
+        cls.READ_AT = datetime.now(tz=timezone.utc) - timedelta(minutes=1)
+
+    def test_returns_401_without_token(self):
+        client = APIClient()
+
+        data = [{'message': self.MESSAGES[0][0].id, 'read_at': self.READ_AT}]
+        response = client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @mock.patch('apps.chat.views.message.broadcast_read')
+    def test_marks_messages_of_several_chats(self, mocked_broadcast_read):
+        first_chat, second_chat = self.CHATS
+        data = [
+            {'message': self.MESSAGES[0][0].id, 'read_at': self.READ_AT},
+            {'message': self.MESSAGES[0][1].id, 'read_at': self.READ_AT},
+            {'message': self.MESSAGES[1][2].id, 'read_at': self.READ_AT},
+        ]
+
+        client = get_client_with_valid_token(self.USER)
+
+        # User, messages, upsert, watermarks
+        with self.assertNumQueries(4):
+            response = client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    'chat': first_chat.id,
+                    'message': self.MESSAGES[0][1].id,
+                    'read_at': mock.ANY,
+                },
+                {
+                    'chat': second_chat.id,
+                    'message': self.MESSAGES[1][2].id,
+                    'read_at': mock.ANY,
+                },
+            ],
+        )
+
+        unread = Message.objects.unread_by(self.USER.profile.id)
+        self.assertEqual(
+            list(unread.values_list('id', flat=True)),
+            [self.MESSAGES[0][2].id],
+        )
+        self.assertEqual(mocked_broadcast_read.call_count, 2)
+
+    @mock.patch('apps.chat.views.message.broadcast_read')
+    def test_does_not_move_watermarks_back(self, mocked_broadcast_read):
+        chat = self.CHATS[0]
+        ReadWatermark.objects.advance(
+            chat.id, self.USER.profile.id, self.MESSAGES[0][2].id, self.READ_AT
+        )
+
+        data = [{'message': self.MESSAGES[0][0].id, 'read_at': self.READ_AT}]
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['message'], self.MESSAGES[0][2].id)
+        self.assertEqual(mocked_broadcast_read.call_count, 0)
+
+    def test_rejects_messages_of_foreign_chats(self):
+        foreign_message = MessageFactory()
+        data = [
+            {'message': self.MESSAGES[0][0].id, 'read_at': self.READ_AT},
+            {'message': foreign_message.id, 'read_at': self.READ_AT},
+        ]
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(ReadWatermark.objects.exists())
+
+    def test_rejects_non_existing_messages(self):
+        data = [{'message': 424242, 'read_at': self.READ_AT}]
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_read_at(self):
+        data = [{'message': self.MESSAGES[0][0].id}]
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.put(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('read_at', response.data[0])
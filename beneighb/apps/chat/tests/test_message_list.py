@@ -125,3 +125,84 @@ class MessageListTestCase(TestCase):
 
         response = client.get(self.URL)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MessageListCursorTestCase(TestCase):
+    url_template = '/chats/{}/messages/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.CHAT = ChatFactory(offer__helper=cls.USER.profile)
+        cls.MESSAGES = [
+            MessageFactory(chat=cls.CHAT, sender=cls.USER.profile)
+            for i in range(6)
+        ]
+        cls.URL = cls.url_template.format(cls.CHAT.id)
+
+    def get_ids(self, query):
+        client = get_client_with_valid_token(self.USER)
+
+        response = client.get(self.URL + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [message['id'] for message in response.data]
+
+    def test_lists_messages_ordered_by_id(self):
+        ids = [message.id for message in self.MESSAGES]
+
+        self.assertEqual(self.get_ids(''), ids)
+        self.assertEqual(self.get_ids('?limit=2'), ids[:2])
+
+    def test_after_id_lists_newer_messages(self):
+        ids = [message.id for message in self.MESSAGES]
+
+        self.assertEqual(self.get_ids(f'?after_id={ids[2]}'), ids[3:])
+        self.assertEqual(self.get_ids(f'?after_id={ids[2]}&limit=2'), ids[3:5])
+        self.assertEqual(self.get_ids(f'?after_id={ids[-1]}'), [])
+
+    def test_before_id_pages_backwards(self):
+        ids = [message.id for message in self.MESSAGES]
+
+        self.assertEqual(
+            self.get_ids(f'?before_id={ids[-1]}&limit=2'), ids[3:5]
+        )
+        self.assertEqual(
+            self.get_ids(f'?before_id={ids[3]}&limit=2'), ids[1:3]
+        )
+        self.assertEqual(self.get_ids(f'?before_id={ids[1]}'), ids[:1])
+
+    def test_after_id_and_before_id_list_range(self):
+        ids = [message.id for message in self.MESSAGES]
+
+        self.assertEqual(
+            self.get_ids(f'?after_id={ids[0]}&before_id={ids[4]}&limit=2'),
+            ids[1:3],
+        )
+
+    def test_other_chats_messages_are_not_listed(self):
+        MessageFactory(
+            chat=ChatFactory(offer__helper=self.USER.profile),
+            sender=self.USER.profile,
+        )
+        ids = [message.id for message in self.MESSAGES]
+
+        self.assertEqual(self.get_ids(f'?after_id={ids[-1]}'), [])
+
+    def test_invalid_cursor(self):
+        client = get_client_with_valid_token(self.USER)
+
+        for param in ['after_id', 'before_id']:
+            response = client.get(self.URL + f'?{param}=a')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(
+                response.data,
+                {'error': f'Invalid {param} value. Must be an integer.'},
+            )
+
+    def test_number_of_queries_does_not_depend_on_messages(self):
+        client = get_client_with_valid_token(self.USER)
+
+        # User, permission check, messages
+        with self.assertNumQueries(3):
+            client.get(self.URL + f'?after_id={self.MESSAGES[0].id}')
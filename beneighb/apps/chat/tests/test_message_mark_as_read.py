@@ -8,6 +8,7 @@ from rest_framework.test import APIClient
 from rest_framework.exceptions import ErrorDetail
 
 from apps.chat.factories import ChatFactory, MessageFactory
+from apps.chat.models import Message, ReadWatermark
 from apps.users.factories import UserWithProfileFactory
 from apps.users.tests.utils import get_client_with_valid_token
 
@@ -179,3 +180,83 @@ class MessageMarkAsReadTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         self.assertEqual(response.data['read_at'], response_read_at)
+
+
+class MessageMarkAsReadWatermarkTestCase(TestCase):
+    url_template = '/chats/messages/{}/mark-as-read/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.CHAT = ChatFactory(offer__helper=cls.USER.profile)
+        task_owner = cls.CHAT.offer.task.owner
+        cls.MESSAGES = [
+            MessageFactory(chat=cls.CHAT, sender=task_owner) for i in range(5)
+        ]
+
+    def mark_as_read(self, message, read_at):
+        client = get_client_with_valid_token(self.USER)
+        url = self.url_template.format(message.id)
+
+        response = client.put(url, {'read_at': read_at})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_marks_as_read_with_constant_number_of_queries(self):
+        client = get_client_with_valid_token(self.USER)
+        url = self.url_template.format(self.MESSAGES[-1].id)
+
+        # User, permission check, message, upsert, refreshed message
+        # and its read_at
+        with self.assertNumQueries(6):
+            client.put(url, {'read_at': datetime.now(tz=timezone.utc)})
+
+        self.assertEqual(
+            ReadWatermark.objects.get().last_read_message_id,
+            self.MESSAGES[-1].id,
+        )
+
+    def test_watermark_does_not_move_back(self):
+        read_at = datetime.now(tz=timezone.utc)
+        self.mark_as_read(self.MESSAGES[3], read_at)
+
+        response = self.mark_as_read(
+            self.MESSAGES[1], read_at + timedelta(minutes=1)
+        )
+        self.assertEqual(
+            response.data['read_at'],
+            read_at.isoformat().replace('+00:00', 'Z'),
+        )
+
+        watermark = ReadWatermark.objects.get()
+        self.assertEqual(watermark.last_read_message_id, self.MESSAGES[3].id)
+        self.assertEqual(watermark.read_at, read_at)
+
+    def test_message_list_derives_read_at(self):
+        read_at = datetime.now(tz=timezone.utc)
+        self.mark_as_read(self.MESSAGES[2], read_at)
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.get(f'/chats/{self.CHAT.id}/messages/')
+
+        read = [message['read_at'] is not None for message in response.data]
+        self.assertEqual(read, [True, True, True, False, False])
+
+    def test_keeps_read_at_of_messages_read_before(self):
+        first_read_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        second_read_at = datetime(2026, 1, 2, tzinfo=timezone.utc)
+        self.mark_as_read(self.MESSAGES[0], first_read_at)
+        self.mark_as_read(self.MESSAGES[1], second_read_at)
+
+        client = get_client_with_valid_token(self.USER)
+        response = client.get(f'/chats/{self.CHAT.id}/messages/')
+
+        read_at = {
+            message['id']: message['read_at'] for message in response.data
+        }
+        self.assertEqual(read_at[self.MESSAGES[0].id], '2026-01-01T00:00:00Z')
+        self.assertEqual(read_at[self.MESSAGES[1].id], '2026-01-02T00:00:00Z')
+        self.assertIsNone(read_at[self.MESSAGES[2].id])
+
+        message = Message.objects.get(id=self.MESSAGES[0].id)
+        self.assertEqual(message.read_at, first_read_at)
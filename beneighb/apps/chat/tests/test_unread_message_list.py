@@ -1,4 +1,3 @@
-from datetime import datetime
 from unittest import mock
 from collections import OrderedDict
 
@@ -9,6 +8,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.chat.factories import ChatFactory, MessageFactory
+from apps.chat.models import ReadWatermark
 from apps.marketplace.factories import OfferFactory
 from apps.users.factories import UserWithProfileFactory
 from apps.users.tests.utils import get_client_with_valid_token
@@ -104,8 +104,9 @@ class UnreadMessageListTestCase(TestCase):
 
         read_msg = MessageFactory(chat=chat, sender=task_owner)
 
-        read_msg.read_at = datetime.now(tz=timezone.utc)
-        read_msg.save()
+        ReadWatermark.objects.advance(
+            chat.id, user.profile.id, read_msg.id, timezone.now()
+        )
 
         for i in range(3):
             MessageFactory(chat=chat, sender=task_owner)
@@ -161,3 +162,89 @@ class UnreadMessageListTestCase(TestCase):
         self.assertEqual(
             response.data, {'error': 'Invalid unread value. Must be "true"'}
         )
+
+
+class UnreadMessageListPaginationTestCase(TestCase):
+    url = '/chats/messages/?unread=true'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.CHAT = ChatFactory(offer__helper=cls.USER.profile)
+        cls.MESSAGES = [
+            MessageFactory(chat=cls.CHAT, sender=cls.CHAT.owner)
+            for i in range(3)
+        ]
+
+    def test_returns_pages_with_link_to_the_next_one(self):
+        client = get_client_with_valid_token(self.USER)
+
+        response = client.get(self.url + '&limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [message['id'] for message in response.data],
+            [message.id for message in reversed(self.MESSAGES[1:])],
+        )
+
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        response = client.get(next_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [message['id'] for message in response.data],
+            [self.MESSAGES[0].id],
+        )
+        self.assertNotIn('Link', response.headers)
+
+
+class UnreadMessageCountTestCase(TestCase):
+    url = '/chats/messages/?unread=true&count_only=true'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.USER = UserWithProfileFactory()
+        cls.CHATS = [
+            ChatFactory(offer__helper=cls.USER.profile) for i in range(2)
+        ]
+
+    def test_returns_zero_without_unread_messages(self):
+        client = get_client_with_valid_token(self.USER)
+
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'count': 0, 'chats': []})
+
+    def test_returns_counts_per_chat(self):
+        first_chat, second_chat = self.CHATS
+
+        read_message = MessageFactory(
+            chat=first_chat, sender=first_chat.owner
+        )
+        ReadWatermark.objects.advance(
+            first_chat.id,
+            self.USER.profile.id,
+            read_message.id,
+            timezone.now(),
+        )
+        for i in range(2):
+            MessageFactory(chat=first_chat, sender=first_chat.owner)
+        MessageFactory(chat=second_chat, sender=second_chat.owner)
+        # Sent by the user, so not unread for the user
+        MessageFactory(chat=second_chat, sender=self.USER.profile)
+
+        client = get_client_with_valid_token(self.USER)
+
+        # User, counts
+        with self.assertNumQueries(2):
+            response = client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                'count': 3,
+                'chats': [
+                    {'chat': first_chat.id, 'count': 2},
+                    {'chat': second_chat.id, 'count': 1},
+                ],
+            },
+        )
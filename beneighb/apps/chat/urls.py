@@ -3,6 +3,8 @@ from rest_framework.routers import DefaultRouter
 
 from apps.chat.views import (
     ChatMineListView,
+    MessageBatchCreateView,
+    MessageBatchMarkAsReadView,
     MessageMarkAsReadView,
     MessageForChatViewSet,
     UnreadMessageList,
@@ -23,6 +25,16 @@ urlpatterns = [
         MessageMarkAsReadView.as_view(),
         name='message-read',
     ),
+    path(
+        'messages/batch/',
+        MessageBatchCreateView.as_view(),
+        name='message-batch',
+    ),
+    path(
+        'messages/mark-as-read/',
+        MessageBatchMarkAsReadView.as_view(),
+        name='message-batch-read',
+    ),
     path(
         'messages/',
         UnreadMessageList.as_view(),
@@ -16,12 +16,14 @@ class ChatMineListView(generics.ListAPIView):
     serializer_class = ChatWithMessageDataSerializer
 
     def get_queryset(self):
-        my_profile = self.request.user.profile
+        my_profile_id = self.request.user.profile_id
 
-        is_helper = Q(offer__helper=my_profile)
-        is_owner = Q(offer__task__owner=my_profile)
+        is_helper = Q(helper_id=my_profile_id)
+        is_owner = Q(owner_id=my_profile_id)
 
-        qs = Chat.objects.filter(is_helper | is_owner)
+        qs = ChatWithMessageDataSerializer.setup_eager_loading(
+            Chat.objects.filter(is_helper | is_owner), my_profile_id
+        )
         limit = self.request.query_params.get('limit', None)
         if limit:
             qs = qs[: int(limit)]
@@ -1,31 +1,66 @@
 import logging
 
-from django.db.models import Q
+from collections import defaultdict
+from datetime import timedelta
 
-from rest_framework import generics, viewsets
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateTimeField, Value
+
+from rest_framework import generics, status, viewsets
+from rest_framework.exceptions import (
+    NotFound,
+    PermissionDenied,
+    ValidationError,
+)
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from .permissions import (
     ChatAccessPermissionClass,
     MessageAccessPermissionClass,
+    get_view_chat,
 )
 
-from apps.chat.models import Chat, Message
+from apps.chat.events import broadcast_message, broadcast_read
+from apps.chat.models import Chat, Message, ReadWatermark
 from apps.chat.serializers import (
+    MessageBatchCreateSerializer,
+    MessageBatchMarkAsReadSerializer,
     MessageCreateSerializer,
     MessageMarkAsReadSerializer,
     MessageSerializer,
+    ReadWatermarkSerializer,
+)
+from apps.core.idempotency import IdempotentCreateMixin
+from apps.core.pagination import KeysetPagination
+from apps.core.throttling import (
+    MessageBatchCreateThrottle,
+    MessageCreateThrottle,
 )
-from apps.users.notifications import send_push_notification
+from apps.users.events import publish_profile_event
+from apps.users.outbox import enqueue_collapsible_push_notification
 
 
 logger = logging.getLogger(__name__)
 
+# Messages sent or marked as read by a single batch request
+MAX_BATCH_SIZE = 100
+
+CHAT_PUSH_COLLAPSE_KEY = 'chat-messages'
+
 
 class UnreadMessageList(generics.ListAPIView):
+    """
+    Lists messages unread by the user, across all of the user's chats.
+
+    With count_only only the numbers of the unread messages are returned,
+    in total and per chat, e.g. to refresh badges.
+    """
+
     permission_classes = (IsAuthenticated,)
     serializer_class = MessageSerializer
+    pagination_class = KeysetPagination
 
     def list(self, request, *args, **kwargs):
         unread = self.request.query_params.get('unread', None)
@@ -35,21 +70,30 @@ class UnreadMessageList(generics.ListAPIView):
                 status=400,
             )
 
-        return super().list(request, *args, **kwargs)
+        count_only = self.request.query_params.get('count_only', None)
+        if count_only == 'true':
+            return self.count(request)
 
-    def get_queryset(self):
-        my_profile = self.request.user.profile
+        return super().list(request, *args, **kwargs)
 
-        # TODO: Move to utils
-        is_helper = Q(offer__helper=my_profile)
-        is_owner = Q(offer__task__owner=my_profile)
+    def count(self, request):
+        counts = Message.objects.count_unread_by_chat(
+            request.user.profile_id
+        ).order_by('chat')
+        chats = [{'chat': chat, 'count': count} for chat, count in counts]
 
-        my_chats = Chat.objects.filter(is_helper | is_owner)
+        return Response(
+            {
+                'count': sum(chat['count'] for chat in chats),
+                'chats': chats,
+            }
+        )
 
-        return Message.objects.filter(
-            chat__in=my_chats,
-            read_at__isnull=True,
-        ).exclude(sender=my_profile)
+    def get_queryset(self):
+        # Unread messages have no read_at by definition
+        return Message.objects.unread_by(
+            self.request.user.profile_id
+        ).annotate(read_at=Value(None, output_field=DateTimeField()))
 
 
 class MessageMarkAsReadView(generics.UpdateAPIView):
@@ -58,9 +102,20 @@ class MessageMarkAsReadView(generics.UpdateAPIView):
     lookup_url_kwarg = 'message_id'
     queryset = Message.objects.all()
 
+    def perform_update(self, serializer):
+        message = serializer.save()
+        if serializer.is_advanced:
+            broadcast_read(
+                message.chat_id,
+                message.id,
+                self.request.user.profile_id,
+                serializer.validated_data['read_at'],
+            )
+
 
-class MessageForChatViewSet(viewsets.ModelViewSet):
+class MessageForChatViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, ChatAccessPermissionClass]
+    throttle_classes = [MessageCreateThrottle]
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -70,34 +125,231 @@ class MessageForChatViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         chat_id = self.kwargs.get('chat_id')
-        return Message.objects.filter(chat_id=chat_id)
+        return Message.objects.filter(chat_id=chat_id).with_read_at()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'create':
+            context['chat'] = get_view_chat(self)
+        return context
+
+    def get_int_query_param(self, name):
+        value = self.request.query_params.get(name, None)
+        if value is None:
+            return None
+
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError(
+                {'error': f'Invalid {name} value. Must be an integer.'}
+            )
 
     def list(self, request, chat_id=None):
-        queryset = self.get_queryset()
+        """
+        Lists messages of the chat ordered by id.
 
-        limit = request.query_params.get('limit', None)
-        if limit is not None:
-            try:
-                limit = int(limit)
-            except ValueError:
-                return Response(
-                    {'error': 'Invalid limit value. Must be an integer.'},
-                    status=400,
-                )
+        With after_id only newer messages are listed, with before_id
+        the older ones, limit then keeps the ones closest to the cursor.
+        """
+        limit = self.get_int_query_param('limit')
+        after_id = self.get_int_query_param('after_id')
+        before_id = self.get_int_query_param('before_id')
+
+        queryset = self.get_queryset()
+        if after_id is not None:
+            queryset = queryset.filter(id__gt=after_id)
+        if before_id is not None:
+            queryset = queryset.filter(id__lt=before_id)
 
-            queryset = queryset[:limit]
+        if before_id is not None and after_id is None:
+            # Paging backwards, newest of the older messages first
+            queryset = queryset.order_by('-id')
+            if limit is not None:
+                queryset = queryset[:limit]
+            messages = list(queryset)[::-1]
+        else:
+            queryset = queryset.order_by('id')
+            if limit is not None:
+                queryset = queryset[:limit]
+            messages = list(queryset)
 
         serializer = MessageSerializer(
-            queryset, many=True, context={'request': request}
+            messages, many=True, context={'request': request}
         )
         return Response(serializer.data)
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        message = serializer.save()
+        chat = get_view_chat(self)
+        message = serializer.save(chat=chat)
+        message.recipient = (
+            chat.helper
+            if message.recipient_id == chat.helper_id
+            else chat.owner
+        )
+        # Watermarks are below ids of the new messages
+        message.read_at = None
+        broadcast_message(message)
+
+        notify_new_messages(message.recipient, [message])
+
+
+class MessageBatchCreateView(generics.GenericAPIView):
+    """
+    Sends several messages at once, possibly to different chats,
+    e.g. the ones queued by the app while it was offline.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (MessageBatchCreateThrottle,)
+    serializer_class = MessageBatchCreateSerializer
+
+    def get_chats(self, chat_ids):
+        """
+        Returns chats of the current profile by their ids, with their
+        participants.
+        """
+        chats = Chat.objects.select_related('owner', 'helper').in_bulk(
+            chat_ids
+        )
+        if len(chats) < len(chat_ids):
+            raise NotFound('Chat not found')
+
+        profile_id = self.request.user.profile_id
+        for chat in chats.values():
+            if profile_id not in (chat.helper_id, chat.owner_id):
+                raise PermissionDenied()
+
+        return chats
+
+    def post(self, request):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=MAX_BATCH_SIZE,
+        )
+        serializer.is_valid(raise_exception=True)
+
+        profile_id = request.user.profile_id
+        chats = self.get_chats(
+            {item['chat_id'] for item in serializer.validated_data}
+        )
+
+        messages = []
+        for item in serializer.validated_data:
+            chat = chats[item['chat_id']]
+            messages.append(
+                Message(
+                    chat=chat,
+                    sender_id=profile_id,
+                    recipient=(
+                        chat.helper
+                        if profile_id == chat.owner_id
+                        else chat.owner
+                    ),
+                    sent_at=item['sent_at'],
+                    text=item['text'],
+                )
+            )
+
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+
+            messages_by_chat = defaultdict(list)
+            for message in messages:
+                message.read_at = None
+                broadcast_message(message)
+                messages_by_chat[message.chat_id].append(message)
+
+            for chat_messages in messages_by_chat.values():
+                notify_new_messages(chat_messages[0].recipient, chat_messages)
+
+        serializer = MessageSerializer(
+            messages, many=True, context={'request': request}
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
-        data = {
-            'type': 'new_message',
-            'chat_id': str(message.chat.id),
+class MessageBatchMarkAsReadView(generics.GenericAPIView):
+    """
+    Marks messages of several chats as read at once, up to the given
+    message in every chat.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = MessageBatchMarkAsReadSerializer
+
+    def put(self, request):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=MAX_BATCH_SIZE,
+        )
+        serializer.is_valid(raise_exception=True)
+
+        read_at = {
+            item['message']: item['read_at']
+            for item in serializer.validated_data
         }
-        # TODO: Use celery instead
-        send_push_notification(message.recipient, message.text, data=data)
+        messages = Message.objects.filter(id__in=read_at).values_list(
+            'id', 'chat_id', 'chat__helper_id', 'chat__owner_id'
+        )
+        if len(messages) < len(read_at):
+            raise NotFound('Message not found')
+
+        profile_id = request.user.profile_id
+        watermarks = {}
+        for message_id, chat_id, helper_id, owner_id in messages:
+            if profile_id not in (helper_id, owner_id):
+                raise PermissionDenied()
+
+            # The last of the messages of every chat
+            if (
+                chat_id not in watermarks
+                or watermarks[chat_id][1] < message_id
+            ):
+                watermarks[chat_id] = (
+                    chat_id,
+                    message_id,
+                    read_at[message_id],
+                )
+
+        advanced = ReadWatermark.objects.advance_many(
+            profile_id, list(watermarks.values())
+        )
+        for chat_id, message_id, advanced_read_at in advanced:
+            broadcast_read(chat_id, message_id, profile_id, advanced_read_at)
+
+        serializer = ReadWatermarkSerializer(
+            ReadWatermark.objects.filter(
+                profile_id=profile_id, chat_id__in=watermarks
+            ).order_by('chat_id'),
+            many=True,
+        )
+        return Response(serializer.data)
+
+
+def notify_new_messages(recipient, messages):
+    """
+    Notifies the recipient about new messages of a chat, with a single
+    event and a push notification coalesced with the former ones
+    of the recipient, from any chat.
+    """
+    chat_id = messages[0].chat_id
+    data = {
+        'type': 'new_message',
+        'chat_id': str(chat_id),
+    }
+    publish_profile_event(recipient.id, data)
+    enqueue_collapsible_push_notification(
+        recipient,
+        messages[-1].text,
+        collapse_key=CHAT_PUSH_COLLAPSE_KEY,
+        coalesced_body='{count} new messages',
+        window=timedelta(seconds=settings.CHAT_PUSH_COALESCING_WINDOW),
+        data=data,
+        count=len(messages),
+    )
@@ -8,40 +8,59 @@ from apps.chat.models import Chat, Message
 logger = logging.getLogger(__name__)
 
 
+def get_chat_participant_ids(chat_id):
+    """
+    Returns ids of the helper and the task owner of the chat,
+    or None if there is no such chat.
+    """
+    return (
+        Chat.objects.filter(id=chat_id)
+        .values_list('helper_id', 'owner_id')
+        .first()
+    )
+
+
+def get_view_chat(view):
+    """
+    Returns the chat of the view with its participants,
+    or None if there is no such chat.
+
+    The chat is loaded once per request and shared by the permission,
+    the serializer and the view.
+    """
+    if not hasattr(view, '_chat'):
+        view._chat = (
+            Chat.objects.select_related('owner', 'helper')
+            .filter(id=view.kwargs['chat_id'])
+            .first()
+        )
+    return view._chat
+
+
 class ChatAccessPermissionClass(BasePermission):
     def has_permission(self, request, view):
-        chat_id = view.kwargs['chat_id']
-        chat = Chat.objects.filter(id=chat_id).first()
+        chat = get_view_chat(view)
 
         if not chat:
             from django.http import Http404
 
             raise Http404('Chat not found')
 
-        my_profile = request.user.profile
-        chat_authors = [
-            chat.offer.helper,
-            chat.offer.task.owner,
-        ]
-
-        return my_profile in chat_authors
+        return request.user.profile_id in (chat.helper_id, chat.owner_id)
 
 
 class MessageAccessPermissionClass(BasePermission):
     def has_permission(self, request, view):
         message_id = view.kwargs['message_id']
-        message = Message.objects.filter(id=message_id).first()
+        participant_ids = (
+            Message.objects.filter(id=message_id)
+            .values_list('chat__helper_id', 'chat__owner_id')
+            .first()
+        )
 
-        if not message:
+        if not participant_ids:
             from django.http import Http404
 
             raise Http404('Message not found')
 
-        my_profile = request.user.profile
-        chat = message.chat
-        chat_authors = [
-            chat.offer.helper,
-            chat.offer.task.owner,
-        ]
-
-        return my_profile in chat_authors
+        return request.user.profile_id in participant_ids
@@ -0,0 +1,13 @@
+import functools
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@functools.cache
+def load_backend(setting_name):
+    """
+    Returns the instance of the class named by the setting, created once
+    per process.
+    """
+    return import_string(getattr(settings, setting_name))()
@@ -0,0 +1,54 @@
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def dispatch(job, *args, **kwargs):
+    """
+    Runs the job on the thread pool of the process after commit,
+    or inline with settings.BACKGROUND_JOBS_SYNC.
+    """
+    transaction.on_commit(lambda: _submit(job, args, kwargs))
+
+
+def _submit(job, args, kwargs):
+    if settings.BACKGROUND_JOBS_SYNC:
+        _run(job, args, kwargs)
+        return
+
+    _get_executor().submit(_run_in_thread, job, args, kwargs)
+
+
+def _get_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_JOBS_WORKERS,
+            thread_name_prefix='background-jobs',
+        )
+    return _executor
+
+
+def _run(job, args, kwargs):
+    try:
+        job(*args, **kwargs)
+    except Exception:
+        logger.exception(f'Background job {job.__name__} has failed')
+
+
+def _run_in_thread(job, args, kwargs):
+    close_old_connections()
+    try:
+        _run(job, args, kwargs)
+    finally:
+        # Connections are per thread, closing the one of this job's thread
+        connections.close_all()
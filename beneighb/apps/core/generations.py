@@ -0,0 +1,65 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+INITIAL_GENERATION = '0'
+
+
+def get_generation_key(key):
+    return f'{key}:generation'
+
+
+def get_current(key):
+    """
+    Returns the value cached under the key by the current generation,
+    or None, and the current generation to cache a value with.
+    """
+    generation_key = get_generation_key(key)
+    values = cache.get_many([key, generation_key])
+
+    generation = values.get(generation_key, INITIAL_GENERATION)
+    entry = values.get(key)
+    if entry is None or entry[0] != generation:
+        return None, generation
+    return entry[1], generation
+
+
+def set_current(key, value, generation, timeout):
+    """
+    Caches the value loaded in the generation, it is ignored
+    if the key has been invalidated since.
+    """
+    cache.set(key, (generation, value), timeout)
+
+
+def get_versioned_keys(*keys):
+    """
+    Returns the keys suffixed with their current generations, for values
+    kept outside of the cache.
+    """
+    generation_keys = [get_generation_key(key) for key in keys]
+    generations = cache.get_many(generation_keys)
+    return [
+        f'{key}:{generations.get(generation_key, INITIAL_GENERATION)}'
+        for key, generation_key in zip(keys, generation_keys)
+    ]
+
+
+def invalidate_generations(*keys):
+    """
+    Starts new generations of the keys now and once more after commit,
+    so values loaded from a snapshot without the change, even if cached
+    after commit, belong to a former generation.
+    """
+    _start_generations(keys)
+    transaction.on_commit(lambda: _start_generations(keys))
+
+
+def _start_generations(keys):
+    # Kept without expiry, a lost generation would bring back the values
+    # cached in the initial one
+    cache.set_many(
+        {get_generation_key(key): uuid.uuid4().hex for key in keys},
+        timeout=None,
+    )
@@ -0,0 +1,83 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_X_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Longer than any request should take
+LOCK_TIMEOUT = 30
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Request with this idempotency key is in progress.'
+    default_code = 'idempotency_conflict'
+
+
+def get_idempotency_key(user_id, method, path, header_key):
+    # Scoped to the endpoint, clients may reuse keys across endpoints
+    return f'idemp-{user_id}-{method}-{path}-{header_key}'
+
+
+class IdempotentCreateMixin:
+    """
+    Replays the stored response of the first successful create() with
+    the same idempotency key of the user, method and path.
+
+    Duplicates arriving while the first request is in progress get 409,
+    failed responses are not stored, so the request can be retried.
+    """
+
+    def create(self, request, *args, **kwargs):
+        header_key = request.META.get(IDEMPOTENCY_HEADER)
+        if header_key is None:
+            return super().create(request, *args, **kwargs)
+
+        key = get_idempotency_key(
+            request.user.pk, request.method, request.path, header_key
+        )
+        lock_key = f'{key}-lock'
+
+        stored = cache.get(key)
+        if stored is not None:
+            return self.replay(key, stored)
+
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            logger.info(f'Duplicate request in progress: key={key}')
+            raise IdempotencyConflict()
+
+        try:
+            # Stored by a request which has released the lock meanwhile
+            stored = cache.get(key)
+            if stored is not None:
+                return self.replay(key, stored)
+
+            response = super().create(request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                cache.set(
+                    key,
+                    {
+                        'status': response.status_code,
+                        'data': dict(response.data),
+                        'headers': dict(response.items()),
+                    },
+                    settings.IDEMPOTENCY_TIMEOUT,
+                )
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    def replay(self, key, stored):
+        logger.info(f'Duplicate request replayed: key={key}')
+
+        headers = {**stored['headers'], REPLAYED_HEADER: 'true'}
+        # Set again by the renderer
+        headers.pop('Content-Type', None)
+        return Response(stored['data'], stored['status'], headers=headers)
@@ -0,0 +1,132 @@
+import base64
+import binascii
+import itertools
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Only the clients which ask for it with `limit` or `cursor` get pages,
+    the others keep getting the whole list. The response body stays
+    a plain list either way. The link to the next page is sent in the
+    `Link` header and carries an opaque cursor with the position of the
+    last returned row.
+    """
+
+    page_size = 50
+    max_page_size = 100
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, id__lt=pk)  # noqa
+            )
+
+        results = list(queryset[: self.limit + 1])
+        self.set_next_position(results, lambda row: (row.created_at, row.id))
+        return results[: self.limit]
+
+    def paginate_keys(self, get_keys, request):
+        """
+        Same as paginate_queryset, but for (created_at, id) keys returned
+        by get_keys(position): the ones before the position, newest first.
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        keys = get_keys(position)
+        results = list(itertools.islice(keys, self.limit + 1))
+        self.set_next_position(results, lambda key: key)
+        return results[: self.limit]
+
+    def is_requested(self, request):
+        return (
+            self.page_size_query_param in request.query_params
+            or self.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link is not None:
+            headers['Link'] = f'<{next_link}>; rel="next"'
+
+        return Response(data, headers=headers)
+
+    def get_limit(self, request):
+        limit = request.query_params.get(self.page_size_query_param)
+        if limit is None:
+            return self.page_size
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            return self.page_size
+
+        if limit <= 0:
+            return self.page_size
+
+        return min(limit, self.max_page_size)
+
+    def set_next_position(self, results, get_position):
+        self.next_position = None
+        if len(results) > self.limit:
+            self.next_position = get_position(results[self.limit - 1])
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.next_position)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            decoded = base64.urlsafe_b64decode(encoded.encode('ascii'))
+            created_at, pk = decoded.decode('ascii').rsplit('|', 1)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return created_at, pk
+
+    @staticmethod
+    def encode_cursor(position):
+        created_at, pk = position
+        raw = f'{created_at.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
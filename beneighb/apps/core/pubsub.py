@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+
+import psycopg2
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from apps.core.backends import load_backend
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelLayerBackend:
+    """
+    Sends the events to the groups of the shared channel layer.
+    """
+
+    def publish(self, topic, event):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+
+        transaction.on_commit(
+            lambda: async_to_sync(channel_layer.group_send)(topic, event)
+        )
+
+    async def start_listener(self):
+        pass
+
+
+class PostgresBackend:
+    """
+    Sends the events with NOTIFY, the listener of every process hands
+    them to the groups of its in-memory channel layer.
+    """
+
+    # Channel of the NOTIFY payloads, shared by all the topics
+    channel = 'beneighb_events'
+    # Doubled after every failed attempt to reconnect
+    reconnect_delay = 1
+    max_reconnect_delay = 60
+
+    def __init__(self):
+        self.listener = None
+        self.listening = asyncio.Event()
+
+    def publish(self, topic, event):
+        # Notifications are delivered on commit and dropped on rollback
+        payload = json.dumps(
+            {'topic': topic, 'event': event}, cls=DjangoJSONEncoder
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    async def start_listener(self):
+        if self.listener is None:
+            self.listener = asyncio.ensure_future(self.listen())
+            self.listener.add_done_callback(self.forget_listener)
+
+    def forget_listener(self, listener):
+        # A stopped listener is started again by the next subscription
+        if self.listener is listener:
+            self.listener = None
+
+    async def listen(self):
+        """
+        Hands the notifications over to the local channel layer, and
+        reconnects with a backoff if the connection is lost.
+        """
+        channel_layer = get_channel_layer()
+        loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+
+        while True:
+            try:
+                # Connecting blocks, so it is left to a thread
+                listener = await loop.run_in_executor(None, self.connect)
+            except psycopg2.Error:
+                logger.exception('Cannot connect the events listener')
+            else:
+                if await self.consume(listener, channel_layer, loop):
+                    delay = self.reconnect_delay
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def connect(self):
+        return psycopg2.connect(**connection.get_connection_params())
+
+    async def consume(self, listener, channel_layer, loop):
+        """
+        Receives the notifications until the connection is lost.
+        Returns whether the connection has been listening.
+        """
+        # The descriptor of a closed connection is not available anymore
+        fd = None
+        lost = loop.create_future()
+        try:
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+
+            fd = listener.fileno()
+            loop.add_reader(fd, self.receive, listener, channel_layer, lost)
+            self.listening.set()
+            await lost
+        except psycopg2.Error:
+            logger.exception('Events listener has been disconnected')
+        finally:
+            self.listening.clear()
+            try:
+                if fd is not None:
+                    loop.remove_reader(fd)
+                listener.close()
+            except Exception:
+                logger.exception('Cannot close the events listener')
+
+        return fd is not None
+
+    def receive(self, listener, channel_layer, lost):
+        try:
+            listener.poll()
+        except psycopg2.Error as e:
+            if not lost.done():
+                lost.set_exception(e)
+            return
+
+        while listener.notifies:
+            notify = listener.notifies.pop(0)
+            payload = json.loads(notify.payload)
+            asyncio.ensure_future(
+                channel_layer.group_send(payload['topic'], payload['event'])
+            )
+
+
+def get_backend():
+    return load_backend('PUBSUB_BACKEND')
+
+
+def publish(topic, event):
+    """
+    Publishes the event, a dict with the type of the handler
+    of the consumers, to the subscribers of the topic on commit.
+    """
+    get_backend().publish(topic, event)
+
+
+async def subscribe(channel_layer, topic, channel_name):
+    await get_backend().start_listener()
+    await channel_layer.group_add(topic, channel_name)
+
+
+async def unsubscribe(channel_layer, topic, channel_name):
+    await channel_layer.group_discard(topic, channel_name)
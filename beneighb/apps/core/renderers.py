@@ -0,0 +1,32 @@
+import orjson
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders the same output as JSONRenderer with orjson. Datetimes and
+    types unsupported by orjson go to the encoder of DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = OPTIONS
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            # The only indent supported by orjson
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_encoder.default, option=options)
+
+        # Escaped like by JSONRenderer, as they are invalid in JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.backends import load_backend
+from apps.core.throttling import LocalTokenBucket
+
+
+@override_settings(TEST_BACKEND='apps.core.throttling.LocalTokenBucket')
+class LoadBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        load_backend.cache_clear()
+        self.addCleanup(load_backend.cache_clear)
+
+    def test_creates_backend_once(self):
+        backend = load_backend('TEST_BACKEND')
+
+        self.assertIsInstance(backend, LocalTokenBucket)
+        self.assertIs(load_backend('TEST_BACKEND'), backend)
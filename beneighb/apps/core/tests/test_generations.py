@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.core.generations import (
+    get_current,
+    get_versioned_keys,
+    invalidate_generations,
+    set_current,
+)
+
+
+class GenerationsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_caches_value_of_current_generation(self):
+        value, generation = get_current('key')
+        self.assertIsNone(value)
+
+        set_current('key', 'value', generation, 60)
+
+        self.assertEqual(get_current('key'), ('value', generation))
+
+    def test_ignores_value_loaded_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_generations('key')
+
+            # Loaded from a snapshot without the change,
+            # cached after the commit
+            _, generation = get_current('key')
+
+        set_current('key', 'stale value', generation, 60)
+
+        value, current_generation = get_current('key')
+        self.assertIsNone(value)
+        self.assertNotEqual(current_generation, generation)
+
+    def test_versions_keys(self):
+        key, other_key = get_versioned_keys('key', 'other-key')
+
+        invalidate_generations('key')
+
+        new_key, new_other_key = get_versioned_keys('key', 'other-key')
+        self.assertNotEqual(new_key, key)
+        self.assertEqual(new_other_key, other_key)
@@ -0,0 +1,142 @@
+import asyncio
+
+from unittest.mock import Mock, patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from apps.core import pubsub
+from apps.core.backends import load_backend
+
+
+# The listener has its own connection, so the notifications
+# have to be committed instead of living in a test case transaction
+@override_settings(PUBSUB_BACKEND='apps.core.pubsub.PostgresBackend')
+class PostgresBackendTestCase(TransactionTestCase):
+    topic = 'test-topic'
+
+    def setUp(self):
+        super().setUp()
+
+        load_backend.cache_clear()
+        self.addCleanup(load_backend.cache_clear)
+
+    def publish(self, value, rollback=False):
+        try:
+            with transaction.atomic():
+                pubsub.publish(self.topic, {'type': 'test', 'value': value})
+                if rollback:
+                    raise RuntimeError()
+        except RuntimeError:
+            pass
+
+    def receive_published(self, *publications):
+        async def receive():
+            channel_layer = get_channel_layer()
+            channel = await channel_layer.new_channel()
+            await pubsub.subscribe(channel_layer, self.topic, channel)
+
+            backend = pubsub.get_backend()
+            await backend.listening.wait()
+            try:
+                for args in publications:
+                    await sync_to_async(self.publish)(*args)
+
+                return await asyncio.wait_for(
+                    channel_layer.receive(channel), timeout=5
+                )
+            finally:
+                await pubsub.unsubscribe(channel_layer, self.topic, channel)
+                backend.listener.cancel()
+                await asyncio.gather(backend.listener, return_exceptions=True)
+
+        return async_to_sync(receive)()
+
+    def test_delivers_committed_events(self):
+        event = self.receive_published((1,))
+
+        self.assertEqual(event, {'type': 'test', 'value': 1})
+
+    def test_drops_rolled_back_events(self):
+        event = self.receive_published((1, True), (2,))
+
+        self.assertEqual(event, {'type': 'test', 'value': 2})
+
+    def test_starts_one_listener_per_process(self):
+        async def subscribe_twice():
+            channel_layer = get_channel_layer()
+            await pubsub.subscribe(channel_layer, self.topic, 'first')
+            listener = pubsub.get_backend().listener
+            await pubsub.subscribe(channel_layer, self.topic, 'second')
+
+            self.assertIs(pubsub.get_backend().listener, listener)
+
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+        async_to_sync(subscribe_twice)()
+
+    @patch.object(pubsub.PostgresBackend, 'reconnect_delay', 0)
+    def test_reconnects_when_connection_is_lost(self):
+        connect = Mock(wraps=pubsub.get_backend().connect)
+
+        async def receive_after_reconnect():
+            channel_layer = get_channel_layer()
+            channel = await channel_layer.new_channel()
+            pubsub.get_backend().connect = connect
+            await pubsub.subscribe(channel_layer, self.topic, channel)
+
+            backend = pubsub.get_backend()
+            await backend.listening.wait()
+            try:
+                await sync_to_async(self.terminate_listener)()
+                # Reconnected right away, the listening flag can be set
+                # again before it is checked
+                while connect.call_count < 2:
+                    await asyncio.sleep(0.01)
+
+                await asyncio.wait_for(backend.listening.wait(), timeout=5)
+                await sync_to_async(self.publish)(1)
+
+                return await asyncio.wait_for(
+                    channel_layer.receive(channel), timeout=5
+                )
+            finally:
+                await pubsub.unsubscribe(channel_layer, self.topic, channel)
+                backend.listener.cancel()
+                await asyncio.gather(backend.listener, return_exceptions=True)
+
+        with self.assertLogs(pubsub.logger, 'ERROR'):
+            event = async_to_sync(receive_after_reconnect)()
+
+        self.assertEqual(event, {'type': 'test', 'value': 1})
+
+    def test_starts_listener_again_when_stopped(self):
+        async def subscribe_after_stop():
+            backend = pubsub.get_backend()
+            channel_layer = get_channel_layer()
+            await pubsub.subscribe(channel_layer, self.topic, 'first')
+            stopped = backend.listener
+
+            stopped.cancel()
+            await asyncio.gather(stopped, return_exceptions=True)
+            self.assertIsNone(backend.listener)
+
+            await pubsub.subscribe(channel_layer, self.topic, 'second')
+            self.assertIsNotNone(backend.listener)
+            self.assertIsNot(backend.listener, stopped)
+
+            backend.listener.cancel()
+            await asyncio.gather(backend.listener, return_exceptions=True)
+
+        async_to_sync(subscribe_after_stop)()
+
+    def terminate_listener(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_terminate_backend(pid) FROM pg_stat_activity '
+                'WHERE query = %s',
+                [f'LISTEN {pubsub.PostgresBackend.channel}'],
+            )
@@ -0,0 +1,86 @@
+import io
+import uuid
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from apps.core.parsers import ORJSONParser
+from apps.core.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    def assert_rendered_as_json_renderer(self, data, **kwargs):
+        self.assertEqual(
+            ORJSONRenderer().render(data, **kwargs),
+            JSONRenderer().render(data, **kwargs),
+        )
+
+    def test_renders_as_json_renderer(self):
+        sent_at = datetime(2023, 8, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+        self.assert_rendered_as_json_renderer(
+            ReturnList(
+                [
+                    ReturnDict(
+                        {
+                            'id': 1,
+                            'price': Decimal('25.50'),
+                            'sent_at': sent_at,
+                            'local_sent_at': sent_at.replace(tzinfo=None),
+                            'date': date(2023, 8, 1),
+                            'duration': timedelta(minutes=5),
+                            'uuid': uuid.UUID(int=1),
+                            'detail': gettext_lazy('Not found.'),
+                            'counts': {1: 2},
+                            'text': 'Привіт\u2028світ',
+                            'offers': [],
+                        },
+                        serializer=None,
+                    )
+                ],
+                serializer=None,
+            )
+        )
+
+    def test_renders_none_as_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_renders_with_indent(self):
+        self.assertEqual(
+            ORJSONRenderer().render(
+                {'id': 1}, accepted_media_type='application/json; indent=4'
+            ),
+            b'{\n  "id": 1\n}',
+        )
+
+
+class ORJSONParserTestCase(SimpleTestCase):
+    def parse(self, content, encoding='utf-8'):
+        return ORJSONParser().parse(
+            io.BytesIO(content), parser_context={'encoding': encoding}
+        )
+
+    def test_parses_as_json_parser(self):
+        content = '{"text": "Привіт", "ids": [1, 2], "price": 2.5}'.encode()
+
+        self.assertEqual(
+            self.parse(content),
+            JSONParser().parse(io.BytesIO(content)),
+        )
+
+    def test_parses_other_encodings(self):
+        content = '{"text": "Привіт"}'.encode('utf-16')
+
+        self.assertEqual(self.parse(content, 'utf-16'), {'text': 'Привіт'})
+
+    def test_raises_parse_error(self):
+        for content in (b'{"text": ', b'{"price": NaN}', b'\xff'):
+            with self.assertRaises(ParseError):
+                self.parse(content)
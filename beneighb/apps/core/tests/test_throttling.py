@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock, skipUnless
+
+import redis
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.chat.factories import ChatFactory
+from apps.core.throttling import (
+    LocalTokenBucket,
+    RedisTokenBucket,
+    parse_rate,
+)
+from apps.users.factories import UserWithProfileFactory
+from apps.users.tests.utils import get_client_with_valid_token
+
+
+def is_redis_available():
+    try:
+        return redis.Redis.from_url(settings.THROTTLE_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+class ParseRateTestCase(SimpleTestCase):
+    def test_parses_rates(self):
+        self.assertEqual(parse_rate('30/hour'), (30, 60 * 60))
+        self.assertEqual(parse_rate('60/min'), (60, 60))
+        self.assertEqual(parse_rate('5/s'), (5, 1))
+
+
+class LocalTokenBucketTestCase(SimpleTestCase):
+    @mock.patch('apps.core.throttling.time.monotonic')
+    def test_refills_bucket(self, mocked_monotonic):
+        bucket = LocalTokenBucket()
+        mocked_monotonic.return_value = 100
+
+        self.assertEqual(bucket.consume('key', 2, 0.5), 0)
+        self.assertEqual(bucket.consume('key', 2, 0.5), 0)
+        self.assertEqual(bucket.consume('key', 2, 0.5), 2)
+
+        # Other buckets are full
+        self.assertEqual(bucket.consume('other-key', 2, 0.5), 0)
+
+        mocked_monotonic.return_value = 101
+        self.assertEqual(bucket.consume('key', 2, 0.5), 1)
+
+        mocked_monotonic.return_value = 103
+        self.assertEqual(bucket.consume('key', 2, 0.5), 0)
+
+        # Doesn't fill over the capacity
+        mocked_monotonic.return_value = 1000
+        for _ in range(2):
+            self.assertEqual(bucket.consume('key', 2, 0.5), 0)
+        self.assertGreater(bucket.consume('key', 2, 0.5), 0)
+
+    @mock.patch('apps.core.throttling.time.monotonic')
+    def test_takes_several_tokens(self, mocked_monotonic):
+        bucket = LocalTokenBucket()
+        mocked_monotonic.return_value = 100
+
+        self.assertEqual(bucket.consume('key', 3, 0.5, cost=2), 0)
+        self.assertEqual(bucket.consume('key', 3, 0.5, cost=2), 2)
+        self.assertEqual(bucket.consume('key', 3, 0.5), 0)
+
+    def test_drops_least_recently_used_buckets(self):
+        bucket = LocalTokenBucket()
+        bucket.size = 2
+
+        for key in ('first', 'second', 'first', 'third'):
+            bucket.consume(key, 2, 1)
+
+        self.assertEqual(list(bucket.buckets), ['first', 'third'])
+
+
+@skipUnless(is_redis_available(), 'Redis is not available')
+class RedisTokenBucketTestCase(SimpleTestCase):
+    def test_consumes_tokens(self):
+        client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL)
+        client.delete('throttle-test')
+        self.addCleanup(client.delete, 'throttle-test')
+
+        bucket = RedisTokenBucket()
+        self.assertEqual(bucket.consume('throttle-test', 2, 0.5), 0)
+        self.assertEqual(bucket.consume('throttle-test', 2, 0.5), 0)
+        self.assertGreater(bucket.consume('throttle-test', 2, 0.5), 1.9)
+        self.assertGreater(client.pttl('throttle-test'), 0)
+
+    def test_takes_several_tokens(self):
+        client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL)
+        client.delete('throttle-test')
+        self.addCleanup(client.delete, 'throttle-test')
+
+        bucket = RedisTokenBucket()
+        self.assertEqual(bucket.consume('throttle-test', 3, 0.5, cost=2), 0)
+        self.assertGreater(
+            bucket.consume('throttle-test', 3, 0.5, cost=2), 1.9
+        )
+        self.assertEqual(bucket.consume('throttle-test', 3, 0.5), 0)
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+            'message_create': '2/min',
+            'token_obtain': '1/min',
+        },
+    }
+)
+@mock.patch('apps.chat.views.message.enqueue_collapsible_push_notification')
+class TokenBucketThrottleTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = mock.patch(
+            'apps.core.throttling.get_backend',
+            return_value=LocalTokenBucket(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send_message(self, user, chat):
+        client = get_client_with_valid_token(user)
+        return client.post(
+            f'/chats/{chat.id}/messages/',
+            {
+                'text': 'Hello world',
+                'sent_at': datetime.now(tz=timezone.utc) + timedelta(days=1),
+            },
+        )
+
+    def test_throttles_user(self, _mocked_enqueue):
+        user = UserWithProfileFactory()
+        owner = UserWithProfileFactory()
+        chat = ChatFactory(
+            offer__helper=user.profile, offer__task__owner=owner.profile
+        )
+
+        for _ in range(2):
+            response = self.send_message(user, chat)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.send_message(user, chat)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(response['Retry-After'], '30')
+
+        # Reading isn't throttled
+        client = get_client_with_valid_token(user)
+        response = client.get(f'/chats/{chat.id}/messages/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Other users have their own budgets
+        response = self.send_message(owner, chat)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def send_messages(self, user, chat, count):
+        client = get_client_with_valid_token(user)
+        sent_at = datetime.now(tz=timezone.utc) - timedelta(minutes=5)
+        return client.post(
+            '/chats/messages/batch/',
+            [
+                {'chat': chat.id, 'sent_at': sent_at, 'text': 'Hello world'}
+                for _ in range(count)
+            ],
+            format='json',
+        )
+
+    def test_charges_every_message_of_batch(self, _mocked_enqueue):
+        user = UserWithProfileFactory()
+        chat = ChatFactory(offer__helper=user.profile)
+
+        response = self.send_messages(user, chat, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.send_message(user, chat)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+    def test_throttles_large_batch(self, _mocked_enqueue):
+        user = UserWithProfileFactory()
+        chat = ChatFactory(offer__helper=user.profile)
+
+        response = self.send_message(user, chat)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.send_messages(user, chat, 50)
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        # Until the bucket is full again
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_throttles_anonymous_by_address(self, _mocked_enqueue):
+        client = APIClient()
+        data = {'username': 'testuser', 'password': 'incorrect_password'}
+
+        response = client.post(
+            '/auth/token/', data, HTTP_X_FORWARDED_FOR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = client.post(
+            '/auth/token/', data, HTTP_X_FORWARDED_FOR='10.0.0.1'
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+        response = client.post(
+            '/auth/token/', data, HTTP_X_FORWARDED_FOR='10.0.0.2'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @mock.patch('apps.core.throttling.get_backend')
+    def test_allows_requests_without_redis(
+        self, mocked_get_backend, _mocked_enqueue
+    ):
+        mocked_get_backend().consume.side_effect = redis.ConnectionError()
+
+        user = UserWithProfileFactory()
+        chat = ChatFactory(offer__helper=user.profile)
+
+        with self.assertLogs('apps.core.throttling', 'ERROR'):
+            response = self.send_message(user, chat)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+
+import redis
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from apps.core.backends import load_backend
+
+logger = logging.getLogger(__name__)
+
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+# Returns 0 if the tokens have been taken, otherwise milliseconds until
+# there are enough of them. Time of Redis is used, so that clocks of
+# the servers don't matter.
+TOKEN_BUCKET_SCRIPT = '''
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+-- Dropped when full again, as missing buckets are full
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return wait
+'''
+
+
+class RedisTokenBucket:
+    """
+    Buckets in Redis, shared by all the processes.
+    """
+
+    def __init__(self):
+        client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL)
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def consume(self, key, capacity, rate, cost=1):
+        """
+        Takes cost tokens from the bucket, which gets rate tokens per
+        second. Returns 0 if they are taken, otherwise seconds until
+        there are enough of them.
+        """
+        return self.script(keys=[key], args=[capacity, rate, cost]) / 1000
+
+
+class LocalTokenBucket:
+    """
+    Buckets of the process, the least recently used ones are dropped
+    when there are more than size of them.
+    """
+
+    size = 10000
+
+    def __init__(self):
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, cost=1):
+        now = time.monotonic()
+
+        with self.lock:
+            tokens, updated_at = self.buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+            wait = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+
+            self.buckets[key] = (tokens, now)
+            while len(self.buckets) > self.size:
+                self.buckets.popitem(last=False)
+
+        return wait
+
+
+def get_backend():
+    return load_backend('THROTTLE_BACKEND')
+
+
+def parse_rate(rate):
+    """
+    Returns the number of requests and the duration in seconds
+    of a rate like '30/hour'.
+    """
+    num_requests, period = rate.split('/')
+    return int(num_requests), DURATIONS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles POST requests with the budget of the scope, per user
+    or per IP address for anonymous requests. The rate of the scope is
+    the size of the bucket and the pace it refills at.
+    """
+
+    scope = None
+    methods = ('POST',)
+
+    def allow_request(self, request, view):
+        if request.method not in self.methods:
+            return True
+
+        num_requests, duration = parse_rate(
+            api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        )
+
+        try:
+            self.retry_after = get_backend().consume(
+                self.get_key(request),
+                num_requests,
+                num_requests / duration,
+                # A request can't cost more than a full bucket,
+                # or it would never be allowed
+                min(self.get_cost(request), num_requests),
+            )
+        except redis.RedisError:
+            # Requests aren't refused because of the throttling
+            logger.exception(f'Cannot throttle scope={self.scope}')
+            return True
+
+        return self.retry_after == 0
+
+    def get_cost(self, request):
+        """
+        Returns the number of tokens the request takes.
+        """
+        return 1
+
+    def get_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'throttle-{self.scope}-user-{request.user.pk}'
+        return f'throttle-{self.scope}-ip-{self.get_ident(request)}'
+
+    def wait(self):
+        return self.retry_after
+
+
+class TaskCreateThrottle(TokenBucketThrottle):
+    scope = 'task_create'
+
+
+class OfferCreateThrottle(TokenBucketThrottle):
+    scope = 'offer_create'
+
+
+class MessageCreateThrottle(TokenBucketThrottle):
+    scope = 'message_create'
+
+
+class MessageBatchCreateThrottle(MessageCreateThrottle):
+    """
+    Charges every message of the batch, from the budget of the single
+    messages.
+    """
+
+    def get_cost(self, request):
+        # Invalid batches are refused by the view anyway
+        if isinstance(request.data, list):
+            return len(request.data)
+        return 1
+
+
+class TokenObtainThrottle(TokenBucketThrottle):
+    scope = 'token_obtain'
@@ -0,0 +1,335 @@
+import bisect
+import heapq
+import threading
+import time
+
+from datetime import datetime, timedelta, timezone
+
+import redis
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.backends import load_backend
+from apps.core.generations import get_versioned_keys, invalidate_generations
+from apps.marketplace.models import Task
+from apps.users.models import Profile
+
+FEED_TIMEOUT = 60 * 60
+BUILD_LOCK_TIMEOUT = 30
+BATCH_SIZE = 100
+ONLINE_FEED_KEY = 'task-feed-online'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Entries of the local store created at a time sort before this key
+EPSILON = timedelta(microseconds=1)
+
+
+class RedisFeedStore:
+    """
+    Scores of the entries are microseconds of created_at, members are
+    zero-padded ids with owner ids, so entries created at the same time
+    are sorted by id.
+    """
+
+    def __init__(self):
+        self.client = redis.Redis.from_url(settings.FEED_REDIS_URL)
+
+    def is_built(self, key):
+        return bool(self.client.exists(self.get_built_key(key)))
+
+    def build(self, key, entries):
+        pipeline = self.client.pipeline()
+        if entries:
+            pipeline.zadd(
+                key,
+                {
+                    self.encode_member(entry): self.encode_score(entry)
+                    for entry in entries
+                },
+            )
+        pipeline.expire(key, FEED_TIMEOUT)
+        pipeline.set(self.get_built_key(key), 1, ex=FEED_TIMEOUT)
+        pipeline.execute()
+
+    def add(self, key, entry):
+        pipeline = self.client.pipeline()
+        pipeline.zadd(
+            key, {self.encode_member(entry): self.encode_score(entry)}
+        )
+        # Built feeds keep their expiry, the ones being built or never
+        # built get one
+        pipeline.expire(key, FEED_TIMEOUT, nx=True)
+        pipeline.execute()
+
+    def remove(self, key, entry):
+        self.client.zrem(key, self.encode_member(entry))
+
+    def delete(self, keys):
+        self.client.delete(*keys, *[self.get_built_key(key) for key in keys])
+
+    def range(self, key, created_at, count, offset=0):
+        """
+        Returns up to count entries created at or before created_at,
+        newest first, skipping offset newest of them.
+        """
+        max_score = '+inf'
+        if created_at is not None:
+            max_score = (created_at - EPOCH) // timedelta(microseconds=1)
+
+        rows = self.client.zrevrangebyscore(
+            key, max_score, '-inf', start=offset, num=count, withscores=True
+        )
+        return [self.decode(member, score) for member, score in rows]
+
+    @staticmethod
+    def get_built_key(key):
+        return f'{key}:built'
+
+    @staticmethod
+    def encode_score(entry):
+        return (entry[0] - EPOCH) // timedelta(microseconds=1)
+
+    @staticmethod
+    def encode_member(entry):
+        _, task_id, owner_id = entry
+        return f'{task_id:012d}:{owner_id}'
+
+    @staticmethod
+    def decode(member, score):
+        task_id, owner_id = member.decode().split(':')
+        created_at = EPOCH + timedelta(microseconds=int(score))
+        return created_at, int(task_id), int(owner_id)
+
+
+class LocalFeedStore:
+    """
+    Feeds in the memory of the process.
+    """
+
+    def __init__(self):
+        # key -> (expires_at or None if not built, sorted entries)
+        self.feeds = {}
+        self.lock = threading.Lock()
+
+    def is_built(self, key):
+        with self.lock:
+            return self._get(key)[0] is not None
+
+    def build(self, key, entries):
+        with self.lock:
+            _, feed = self._get(key)
+            # Entries added meanwhile are newer than the snapshot
+            ids = {entry[1] for entry in feed}
+            feed.extend(entry for entry in entries if entry[1] not in ids)
+            feed.sort()
+            self.feeds[key] = (time.monotonic() + FEED_TIMEOUT, feed)
+
+    def add(self, key, entry):
+        with self.lock:
+            expires_at, feed = self._get(key)
+            self._insert(feed, entry)
+            self.feeds[key] = (expires_at, feed)
+
+    def remove(self, key, entry):
+        with self.lock:
+            _, feed = self._get(key)
+            self._remove(feed, entry)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.feeds.pop(key, None)
+
+    def range(self, key, created_at, count, offset=0):
+        with self.lock:
+            _, feed = self._get(key)
+            end = len(feed)
+            if created_at is not None:
+                end = bisect.bisect_left(feed, (created_at + EPSILON,))
+            end = max(0, end - offset)
+            return feed[max(0, end - count) : end][::-1]  # noqa: E203
+
+    def clear(self):
+        with self.lock:
+            self.feeds.clear()
+
+    def _get(self, key):
+        expires_at, feed = self.feeds.get(key, (None, []))
+        if expires_at is not None and expires_at <= time.monotonic():
+            expires_at, feed = None, []
+        return expires_at, feed
+
+    @classmethod
+    def _insert(cls, feed, entry):
+        cls._remove(feed, entry)
+        bisect.insort(feed, entry)
+
+    @staticmethod
+    def _remove(feed, entry):
+        # By id, like members of Redis, created_at could have changed
+        feed[:] = [other for other in feed if other[1] != entry[1]]
+
+
+def get_store():
+    return load_backend('FEED_BACKEND')
+
+
+def get_city_feed_key(city):
+    return f'task-feed-city-{city}'
+
+
+def get_feed(city, before=None):
+    """
+    Yields the entries of the merged city and online feeds created
+    before the (created_at, id) position, newest first.
+    """
+    city_tasks = Task.objects.filter(owner__city=city).exclude(
+        event_type=Task.EventTypes.ONLINE
+    )
+    online_tasks = Task.objects.filter(event_type=Task.EventTypes.ONLINE)
+    city_feed_key, online_feed_key = get_versioned_keys(
+        get_city_feed_key(city), ONLINE_FEED_KEY
+    )
+
+    return heapq.merge(
+        _iter_feed(city_feed_key, city_tasks, before),
+        _iter_feed(online_feed_key, online_tasks, before),
+        reverse=True,
+    )
+
+
+def update_task_feed(task, created=False, update_fields=None):
+    """
+    Moves the task to the feed of its type.
+    """
+    if not created and update_fields and 'event_type' not in update_fields:
+        # The entry and its feed are the same
+        return
+
+    entry = (task.created_at, task.id, task.owner_id)
+    city_feed_key = get_city_feed_key(_get_owner_city(task))
+
+    if task.event_type == Task.EventTypes.ONLINE:
+        keys = ONLINE_FEED_KEY, city_feed_key
+    else:
+        keys = city_feed_key, ONLINE_FEED_KEY
+
+    def update():
+        key, other_key = get_versioned_keys(*keys)
+        store = get_store()
+        store.remove(other_key, entry)
+        store.add(key, entry)
+
+    transaction.on_commit(update)
+
+
+def remove_task_from_feed(task):
+    entry = (task.created_at, task.id, task.owner_id)
+
+    keys = [ONLINE_FEED_KEY]
+    city = _get_owner_city(task)
+    # Without the owner, the entry expires with the feed
+    if city is not None:
+        keys.append(get_city_feed_key(city))
+
+    def remove():
+        store = get_store()
+        for key in get_versioned_keys(*keys):
+            store.remove(key, entry)
+
+    transaction.on_commit(remove)
+
+
+def invalidate_city_feeds(*cities):
+    # Feeds of the former generations expire unread
+    invalidate_generations(*[get_city_feed_key(city) for city in cities])
+
+
+def _get_owner_city(task):
+    """
+    Returns the city of the task owner, without loading the whole owner,
+    or None if the owner has been deleted.
+    """
+    if Task.owner.is_cached(task):
+        return task.owner.city
+
+    return (
+        Profile.objects.filter(id=task.owner_id)
+        .values_list('city', flat=True)
+        .first()
+    )
+
+
+def _iter_feed(key, tasks, before):
+    store = get_store()
+
+    if store.is_built(key) or _build(store, key, tasks):
+        yield from _iter_entries(
+            lambda created_at, offset: store.range(
+                key, created_at, BATCH_SIZE, offset
+            ),
+            before,
+        )
+        return
+
+    # Being built by another request
+    yield from _iter_entries(
+        lambda created_at, offset: _get_tasks_batch(tasks, created_at, offset),
+        before,
+    )
+
+
+def _build(store, key, tasks):
+    """
+    Builds the feed from the database, unless another request holds
+    the lock. Only adds entries, so the ones added meanwhile are kept.
+    """
+    lock_key = f'{key}-lock'
+    if not cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT):
+        return False
+
+    try:
+        store.build(
+            key, list(tasks.values_list('created_at', 'id', 'owner_id'))
+        )
+    finally:
+        cache.delete(lock_key)
+
+    return True
+
+
+def _iter_entries(get_batch, before):
+    """
+    Yields the entries before the position from the batches of entries
+    created at or before a time, newest first, which skip a number of
+    the newest ones.
+    """
+    created_at = before[0] if before is not None else None
+    offset = 0
+    while True:
+        batch = get_batch(created_at, offset)
+
+        for entry in batch:
+            if before is None or entry[:2] < before:
+                yield entry
+
+        if len(batch) < BATCH_SIZE:
+            return
+
+        # Entries created at the same time as the last one, possibly
+        # more than a batch of them, are skipped by the offset
+        last_created_at = batch[-1][0]
+        if last_created_at != created_at:
+            created_at, offset = last_created_at, 0
+        offset += sum(1 for entry in batch if entry[0] == created_at)
+
+
+def _get_tasks_batch(tasks, created_at, offset):
+    if created_at is not None:
+        tasks = tasks.filter(created_at__lte=created_at)
+
+    tasks = tasks.order_by('-created_at', '-id')
+    end = offset + BATCH_SIZE
+    return list(tasks.values_list('created_at', 'id', 'owner_id')[offset:end])
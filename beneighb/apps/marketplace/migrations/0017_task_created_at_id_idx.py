@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            'marketplace',
+            '0016_alter_offer_helper_alter_offer_task_alter_task_owner',
+        ),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(
+                fields=['created_at', 'id'], name='task_created_at_id_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('marketplace', '0017_task_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(
+                fields=['helper', 'task'], name='offer_helper_task_idx'
+            ),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.postgres.fields import ArrayField
 
 
@@ -35,7 +37,9 @@ class Task(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     service = models.ForeignKey('Service', on_delete=models.PROTECT)
-    owner = models.ForeignKey('users.Profile', on_delete=models.CASCADE, related_name='tasks')
+    owner = models.ForeignKey(
+        'users.Profile', on_delete=models.CASCADE, related_name='tasks'
+    )
     datetime_known = models.BooleanField()
     datetime_options = ArrayField(
         models.DateTimeField(),
@@ -52,10 +56,31 @@ class Task(models.Model):
 
     info = models.TextField(max_length=140, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'], name='task_created_at_id_idx'
+            ),
+        ]
+
     def __str__(self):
         return f'Task-{self.id} - {self.service.name}'
 
 
+@receiver(post_save, sender=Task)
+def update_task_feed(sender, instance, created, update_fields, **kwargs):
+    from apps.marketplace.feed import update_task_feed
+
+    update_task_feed(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_from_feed(sender, instance, **kwargs):
+    from apps.marketplace.feed import remove_task_from_feed
+
+    remove_task_from_feed(instance)
+
+
 class Offer(models.Model):
     class StatusTypes(models.TextChoices):
         PENDING = ('pending', 'Pending')
@@ -74,6 +99,13 @@ class Offer(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['helper', 'task'], name='offer_helper_task_idx'
+            ),
+        ]
+
     def __str__(self):
         return f'Offer-{self.id}|Task-{self.task.id}'
 
@@ -0,0 +1,35 @@
+import logging
+
+from apps.marketplace.models import Task
+from apps.users.outbox import enqueue_conditional_push_notification
+from apps.users.topics import (
+    ALL_TOPIC,
+    get_broadcast_condition,
+    get_city_topic,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_new_task_notifications(task):
+    """
+    Enqueues broadcast of the new task to the city topic of its owner,
+    or to all the devices for online tasks, except for the owner's device.
+    """
+    text = f'New task has been created: {task.service.name}'
+    data = {
+        'type': 'new_task',
+        'task_id': str(task.id),
+        'owner_id': str(task.owner_id),
+    }
+
+    # TODO: Uncomment this, during #284 - add back filters for services
+    # Combine the topic with get_service_topic(task.service_id)
+    if task.event_type == Task.EventTypes.ONLINE:
+        topic = ALL_TOPIC
+    else:
+        topic = get_city_topic(task.owner.city)
+
+    enqueue_conditional_push_notification(
+        get_broadcast_condition(topic, task.owner_id), text, data=data
+    )
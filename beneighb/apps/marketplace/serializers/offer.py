@@ -57,7 +57,11 @@ class OfferSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def create(self, validated_data):
         offer = Offer.objects.create(**validated_data)
-        Chat.objects.create(offer=offer)
+        Chat.objects.create(
+            offer=offer,
+            owner_id=offer.task.owner_id,
+            helper_id=offer.helper_id,
+        )
         return offer
 
     def _validate_status(self, data):
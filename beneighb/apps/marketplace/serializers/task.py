@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
+from django.db.models import Prefetch, Q
 from rest_framework import serializers
-from apps.marketplace.models import Task
+from apps.marketplace.models import Offer, Task
 from apps.marketplace.serializers.offer import OfferWithHelperSerializer
 
 
@@ -15,9 +16,7 @@ class RequirableBooleanField(serializers.BooleanField):
 
 class TaskWithOffersSerializer(serializers.ModelSerializer):
     datetime_known = RequirableBooleanField(required=True)
-    offers = OfferWithHelperSerializer(
-        many=True, read_only=True
-    )
+    offers = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -35,18 +34,39 @@ class TaskWithOffersSerializer(serializers.ModelSerializer):
             'info',
         )
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
+    @staticmethod
+    def setup_eager_loading(queryset, profile):
+        """
+        Prefetches the offers visible to the profile together with their
+        helpers, helpers' services and chats, so the whole list is
+        serialized in a fixed number of queries.
+
+        Task owner sees all offers of the task, others only their own ones.
+        """
+        visible_offers = (
+            Offer.objects.filter(Q(task__owner=profile) | Q(helper=profile))
+            .select_related('helper', 'chat')
+            .prefetch_related('helper__services')
+            .order_by('id')
+        )
+
+        return queryset.prefetch_related(
+            Prefetch(
+                'offers', queryset=visible_offers, to_attr='visible_offers'
+            )
+        )
+
+    def get_offers(self, instance):
+        offers = getattr(instance, 'visible_offers', None)
 
-        current_user = self.context['request'].user.profile
+        if offers is None:
+            current_user = self.context['request'].user.profile
 
-        offers = instance.offers.all()
-        if instance.owner != current_user:
-            offers = instance.offers.filter(helper=current_user)
+            offers = instance.offers.all()
+            if instance.owner_id != current_user.id:
+                offers = instance.offers.filter(helper=current_user)
 
-        offer_serializer = OfferWithHelperSerializer(offers, many=True)
-        representation['offers'] = offer_serializer.data
-        return representation
+        return OfferWithHelperSerializer(offers, many=True).data
 
 
 class TaskCreateSerializer(serializers.ModelSerializer):
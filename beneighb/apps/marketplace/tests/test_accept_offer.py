@@ -14,7 +14,7 @@ from apps.marketplace.factories import OfferFactory, TaskFactory
 from apps.users.tests.utils import get_client_with_valid_token
 
 
-@mock.patch('apps.marketplace.views.offer.send_push_notification')
+@mock.patch('apps.marketplace.views.offer.enqueue_push_notification')
 class AcceptOfferTestCase(TestCase):
     url_template = '/marketplace/offers/{}/accept/'
 
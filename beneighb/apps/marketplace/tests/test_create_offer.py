@@ -30,7 +30,7 @@ class CreateOfferTestCase(TestCase):
         response = client.post(self.url, self.correct_data)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
-    @mock.patch('apps.marketplace.views.offer.send_push_notification')
+    @mock.patch('apps.marketplace.views.offer.enqueue_push_notification')
     def test_create_offer_successful(self, mocked_send_push_notification):
         user = UserWithProfileFactory()
         user.profile.services.add(self.TASK.service)
@@ -49,6 +49,8 @@ class CreateOfferTestCase(TestCase):
         self.assertEqual(offer.helper, user.profile)
         self.assertEqual(offer.status, 'pending')
         self.assertEqual(offer.chat.id, response.data['chat'])
+        self.assertEqual(offer.chat.owner, self.TASK.owner)
+        self.assertEqual(offer.chat.helper, user.profile)
 
         # Checking response correctness here, because we need offer.id
         expected_data_without_created_at = {
@@ -62,7 +64,28 @@ class CreateOfferTestCase(TestCase):
         for key, val in expected_data_without_created_at.items():
             self.assertEqual(response.data[key], val)
 
-    @mock.patch('apps.marketplace.views.offer.send_push_notification')
+    @mock.patch('apps.marketplace.views.offer.enqueue_push_notification')
+    def test_create_offer_idempotent(self, mocked_send_push_notification):
+        user = UserWithProfileFactory()
+        user.profile.services.add(self.TASK.service)
+        client = get_client_with_valid_token(user)
+
+        responses = [
+            client.post(
+                self.url,
+                self.correct_data,
+                HTTP_X_IDEMPOTENCY_KEY='Some-idempotency-key',
+            )
+            for _ in range(2)
+        ]
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(responses[1].data, responses[0].data)
+
+        self.assertEqual(Offer.objects.count(), 1)
+        self.assertEqual(mocked_send_push_notification.call_count, 1)
+
+    @mock.patch('apps.marketplace.views.offer.enqueue_push_notification')
     def test_create_offer_notification(self, mocked_send_push_notification):
         user = UserWithProfileFactory()
         user.profile.services.add(self.TASK.service)
@@ -105,7 +128,7 @@ class CreateOfferTestCase(TestCase):
 
         self.assertEqual(Offer.objects.count(), 0)
 
-    @mock.patch('apps.marketplace.views.offer.send_push_notification')
+    @mock.patch('apps.marketplace.views.offer.enqueue_push_notification')
     def test_cannot_create_second_offer_for_task(
         self, _mocked_send_push_notification
     ):
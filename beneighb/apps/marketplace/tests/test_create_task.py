@@ -1,13 +1,14 @@
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
-from unittest import mock, skip
+from unittest import mock
 
-from apps.marketplace.factories import ServiceFactory
+from apps.core.idempotency import get_idempotency_key
+from apps.marketplace.factories import ServiceFactory, TaskFactory
 from apps.marketplace.models import Service, Task
 from apps.users.factories import UserWithProfileFactory
 from apps.users.tests.utils import get_client_with_valid_token
 from django.core.cache import cache
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.exceptions import ErrorDetail
 from rest_framework.test import APIClient
@@ -31,7 +32,9 @@ class CreateTaskTestCase(TestCase):
     def setUp(self):
         super().setUp()
 
-        self.datetime_option = datetime.now(tz=timezone.utc) + timedelta(days=1)
+        self.datetime_option = datetime.now(tz=timezone.utc) + timedelta(
+            days=1
+        )
         self.correct_data['datetime_options'] = [self.datetime_option]
 
     def tearDown(self):
@@ -44,8 +47,7 @@ class CreateTaskTestCase(TestCase):
         response = client.post(self.url, self.correct_data)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_create_task_successful(self, mocked_send_push_notification):
+    def test_create_task_successful(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -65,8 +67,7 @@ class CreateTaskTestCase(TestCase):
         self.assertEqual(task.address, self.correct_data['address'])
         self.assertEqual(task.price_offer, self.correct_data['price_offer'])
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_success_with_info_field(self, mocked_send_push_notification):
+    def test_success_with_info_field(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -90,8 +91,7 @@ class CreateTaskTestCase(TestCase):
         self.assertEqual(task.info, correct_data['info'])
         self.assertEqual(task.price_offer, correct_data['price_offer'])
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_success_with_empty_info_field_should_fail(self, mocked_send_push_notification):
+    def test_success_with_empty_info_field_should_fail(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -104,8 +104,7 @@ class CreateTaskTestCase(TestCase):
 
         self.assertEqual(Task.objects.count(), 0)
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_success_with_whitespaces_info_field_should_fail(self, mocked_send_push_notification):
+    def test_success_with_whitespaces_info_field_should_fail(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -118,8 +117,7 @@ class CreateTaskTestCase(TestCase):
 
         self.assertEqual(Task.objects.count(), 0)
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_success_with_too_long_info_field_should_fail(self, mocked_send_push_notification):
+    def test_success_with_too_long_info_field_should_fail(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -132,8 +130,7 @@ class CreateTaskTestCase(TestCase):
 
         self.assertEqual(Task.objects.count(), 0)
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_create_task_idempotent(self, mocked_send_push_notification):
+    def test_create_task_idempotent(self):
         user = UserWithProfileFactory()
 
         idempotency_key = 'Some-idempotency-key'
@@ -150,13 +147,93 @@ class CreateTaskTestCase(TestCase):
 
         self.assertEqual(Task.objects.count(), 1)
 
-        response = client.post(
+        replayed_response = client.post(
             self.url, correct_data, HTTP_X_IDEMPOTENCY_KEY=idempotency_key
         )
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(
+            replayed_response.status_code, status.HTTP_201_CREATED
+        )
+        self.assertEqual(replayed_response.data, response.data)
+        self.assertEqual(replayed_response['Idempotent-Replayed'], 'true')
+
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_create_task_idempotent_in_progress(self):
+        user = UserWithProfileFactory()
+
+        idempotency_key = 'Some-idempotency-key'
+        client = get_client_with_valid_token(user)
+
+        key = get_idempotency_key(user.pk, 'POST', self.url, idempotency_key)
+        lock_key = f'{key}-lock'
+        cache.add(lock_key, 1)
+
+        response = client.post(
+            self.url, self.correct_data, HTTP_X_IDEMPOTENCY_KEY=idempotency_key
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.assertEqual(Task.objects.count(), 0)
+
+    def test_create_task_idempotent_retries_failed_request(self):
+        user = UserWithProfileFactory()
+
+        idempotency_key = 'Some-idempotency-key'
+        client = get_client_with_valid_token(user)
+
+        incorrect_data = deepcopy(self.correct_data)
+        incorrect_data['info'] = 'a' * 141
+
+        response = client.post(
+            self.url, incorrect_data, HTTP_X_IDEMPOTENCY_KEY=idempotency_key
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = client.post(
+            self.url, self.correct_data, HTTP_X_IDEMPOTENCY_KEY=idempotency_key
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
 
         self.assertEqual(Task.objects.count(), 1)
 
+    def test_create_task_idempotency_key_of_other_user(self):
+        idempotency_key = 'Some-idempotency-key'
+
+        for user in UserWithProfileFactory.create_batch(2):
+            client = get_client_with_valid_token(user)
+            response = client.post(
+                self.url,
+                self.correct_data,
+                HTTP_X_IDEMPOTENCY_KEY=idempotency_key,
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_create_task_idempotency_key_of_other_endpoint(self):
+        user = UserWithProfileFactory()
+        task = TaskFactory()
+        user.profile.services.add(task.service)
+
+        idempotency_key = 'Some-idempotency-key'
+        client = get_client_with_valid_token(user)
+
+        response = client.post(
+            '/marketplace/offers/',
+            {'task': task.id},
+            HTTP_X_IDEMPOTENCY_KEY=idempotency_key,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = client.post(
+            self.url, self.correct_data, HTTP_X_IDEMPOTENCY_KEY=idempotency_key
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+        self.assertEqual(Task.objects.filter(owner=user.profile).count(), 1)
+
     def test_create_task_without_service_id(self):
         user = UserWithProfileFactory()
 
@@ -226,10 +303,7 @@ class CreateTaskPriceOfferTestCase(TestCase):
             'address': 'Some test address',
         }
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_create_task_with_zero_price_offer(
-        self, _mocked_send_push_notification
-    ):
+    def test_create_task_with_zero_price_offer(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -488,8 +562,7 @@ class CreateTaskDatetimeKnownTestCase(TestCase):
 
         self.assertEqual(Task.objects.count(), 0)
 
-    @mock.patch('apps.users.notifications.send_push_notification')
-    def test_create_task_successful(self, _mocked_send_push_notification):
+    def test_create_task_successful(self):
         user = UserWithProfileFactory()
 
         client = get_client_with_valid_token(user)
@@ -634,7 +707,10 @@ class CreateTaskDatetimeKnownTestCase(TestCase):
         )
 
 
-@mock.patch('apps.marketplace.views.task.send_push_notification')
+@override_settings(BACKGROUND_JOBS_SYNC=True)
+@mock.patch(
+    'apps.marketplace.notifications.enqueue_conditional_push_notification'
+)
 class CreateTaskNotificationTestCase(TestCase):
     url = '/marketplace/tasks/'
 
@@ -653,117 +729,115 @@ class CreateTaskNotificationTestCase(TestCase):
         cache.clear()
         super().tearDown()
 
-    def get_notification_recipient(
-        self, service, fcm_token='some valid token'
-    ):
-        profile = UserWithProfileFactory().profile
-        profile.services.add(service)
-        profile.fcm_token = fcm_token
-        profile.save()
-        return profile
-
-    @skip
-    def test_all_profiles_with_corresponding_service_get_notification(
-        self, mocked_send_push_notification
+    def create_task(self, client, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post(self.url, data or self.correct_data)
+
+    def get_conditions(self, mocked_send_conditional_push_notification):
+        calls = mocked_send_conditional_push_notification.call_args_list
+        return [call.args[0] for call in calls]
+
+    def test_offline_task_is_sent_to_owner_city_topic(
+        self, mocked_send_conditional_push_notification
     ):
-        user = UserWithProfileFactory()
+        user = UserWithProfileFactory(profile__city='Berlin')
         client = get_client_with_valid_token(user)
 
-        recipients = []
-        for i in range(3):
-            recipient = self.get_notification_recipient(self.SERVICE)
-            recipients.append(recipient)
-
-        response = client.post(self.url, self.correct_data)
+        response = self.create_task(client)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
         self.assertEqual(
-            mocked_send_push_notification.call_count, len(recipients)
+            self.get_conditions(mocked_send_conditional_push_notification),
+            [
+                "'city-Berlin' in topics && "
+                f"!('profile-{user.profile.id}' in topics)"
+            ],
         )
 
-        calls = mocked_send_push_notification.call_args_list
-        sent_to = set([call.args[0] for call in calls])
-
-        self.assertNotIn(user.profile, sent_to)
-        self.assertEqual(sent_to, set(recipients))
-
-    # TODO: Uncomment this, during #284 - add back filters for services
-    def test_all_profiles_with_get_notification(
-        self, mocked_send_push_notification
+    def test_offline_task_of_owner_without_city_is_sent_to_no_city_topic(
+        self, mocked_send_conditional_push_notification
     ):
-        user = UserWithProfileFactory()
+        user = UserWithProfileFactory(profile__city='')
         client = get_client_with_valid_token(user)
 
-        recipients = []
-        for i in range(3):
-            recipient = self.get_notification_recipient(self.SERVICE)
-            recipients.append(recipient)
+        response = self.create_task(client)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(
+            self.get_conditions(mocked_send_conditional_push_notification),
+            [
+                "'city-none' in topics && "
+                f"!('profile-{user.profile.id}' in topics)"
+            ],
+        )
 
-        recipient_without_service = UserWithProfileFactory().profile
-        recipient_without_service.fcm_token = 'some valid token'
-        recipient_without_service.save()
+    def test_online_task_is_sent_to_all_devices(
+        self, mocked_send_conditional_push_notification
+    ):
+        user = UserWithProfileFactory(profile__city='Berlin')
+        client = get_client_with_valid_token(user)
 
-        recipients.append(recipient_without_service)
+        data = deepcopy(self.correct_data)
+        data['event_type'] = 'online'
+        del data['address']
 
-        response = client.post(self.url, self.correct_data)
+        response = self.create_task(client, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
         self.assertEqual(
-            mocked_send_push_notification.call_count, len(recipients)
+            self.get_conditions(mocked_send_conditional_push_notification),
+            [f"'all' in topics && !('profile-{user.profile.id}' in topics)"],
         )
 
-        calls = mocked_send_push_notification.call_args_list
-        sent_to = set([call.args[0] for call in calls])
+    def test_task_owner_does_not_get_notification(
+        self, mocked_send_conditional_push_notification
+    ):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        response = self.create_task(client)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
-        self.assertNotIn(user.profile, sent_to)
-        self.assertEqual(sent_to, set(recipients))
+        (condition,) = self.get_conditions(
+            mocked_send_conditional_push_notification
+        )
+        self.assertTrue(
+            condition.endswith(f" && !('profile-{user.profile.id}' in topics)")
+        )
 
     def test_notification_sent_with_correct_data(
-        self, mocked_send_push_notification
+        self, mocked_send_conditional_push_notification
     ):
         user = UserWithProfileFactory()
         client = get_client_with_valid_token(user)
 
-        recipient = self.get_notification_recipient(self.SERVICE)  # noqa
-
-        response = client.post(self.url, self.correct_data)
+        response = self.create_task(client)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
-        self.assertEqual(mocked_send_push_notification.call_count, 1)
+        self.assertEqual(
+            mocked_send_conditional_push_notification.call_count, 1
+        )
 
         task = Task.objects.get()
         self.assertEqual(
-            mocked_send_push_notification.call_args[1]['data'],
+            mocked_send_conditional_push_notification.call_args[1]['data'],
             {
                 'type': 'new_task',
                 'task_id': str(task.id),
+                'owner_id': str(user.profile.id),
             },
         )
 
-    def test_task_owner_does_not_get_notification(
-        self, mocked_send_push_notification
-    ):
-        user = self.get_notification_recipient(self.SERVICE).user
-        client = get_client_with_valid_token(user)
-
-        response = client.post(self.url, self.correct_data)
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-
-        self.assertEqual(mocked_send_push_notification.call_count, 0)
-
-    def test_notification_not_sent_to_profiles_without_fcm_token(
-        self, mocked_send_push_notification
+    def test_notification_is_enqueued_with_task(
+        self, mocked_send_conditional_push_notification
     ):
         user = UserWithProfileFactory()
         client = get_client_with_valid_token(user)
 
-        non_recipient = self.get_notification_recipient(  # noqa
-            self.SERVICE, ''
-        )
-        non_recipient_2 = UserWithProfileFactory().profile
-        non_recipient_2.services.add(self.SERVICE)
-
-        response = client.post(self.url, self.correct_data)
+        with self.captureOnCommitCallbacks():
+            response = client.post(self.url, self.correct_data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
-        self.assertEqual(mocked_send_push_notification.call_count, 0)
+        self.assertEqual(
+            mocked_send_conditional_push_notification.call_count, 1
+        )
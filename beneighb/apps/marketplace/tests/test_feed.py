@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock, skipUnless
+
+import redis
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.generations import get_versioned_keys
+from apps.marketplace.factories import TaskFactory
+from apps.marketplace.models import Task
+from apps.marketplace.feed import (
+    LocalFeedStore,
+    RedisFeedStore,
+    get_city_feed_key,
+    get_feed,
+    get_store,
+    invalidate_city_feeds,
+)
+
+
+def is_redis_available():
+    try:
+        return redis.Redis.from_url(settings.FEED_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+class FeedStoreTestsMixin:
+    def get_entries(self):
+        created_at = datetime(
+            2023, 8, 1, 12, 0, 0, 123456, tzinfo=timezone.utc
+        )
+        return [
+            (created_at, 1, 10),
+            (created_at, 2, 20),
+            (created_at + timedelta(microseconds=1), 3, 10),
+            (created_at + timedelta(minutes=1), 4, 30),
+        ]
+
+    def test_returns_range_newest_first(self):
+        entries = self.get_entries()
+        self.store.build(self.key, entries)
+
+        self.assertTrue(self.store.is_built(self.key))
+        self.assertEqual(self.store.range(self.key, None, 10), entries[::-1])
+        self.assertEqual(self.store.range(self.key, None, 2), entries[:1:-1])
+        self.assertEqual(
+            self.store.range(self.key, entries[0][0], 10), entries[1::-1]
+        )
+
+    def test_adds_and_removes_entries(self):
+        entries = self.get_entries()
+        self.store.build(self.key, entries[:2])
+
+        self.store.add(self.key, entries[3])
+        self.store.remove(self.key, entries[0])
+
+        self.assertEqual(
+            self.store.range(self.key, None, 10), [entries[3], entries[1]]
+        )
+
+    def test_skips_offset_of_newest_entries(self):
+        entries = self.get_entries()
+        self.store.build(self.key, entries)
+
+        self.assertEqual(
+            self.store.range(self.key, entries[0][0], 10, offset=1),
+            [entries[0]],
+        )
+        self.assertEqual(
+            self.store.range(self.key, None, 2, offset=1), entries[2:0:-1]
+        )
+
+    def test_deletes_feeds(self):
+        self.store.build(self.key, self.get_entries())
+        self.store.delete([self.key])
+
+        self.assertFalse(self.store.is_built(self.key))
+        self.assertEqual(self.store.range(self.key, None, 10), [])
+
+
+class LocalFeedStoreTestCase(FeedStoreTestsMixin, SimpleTestCase):
+    key = 'task-feed-test'
+
+    def setUp(self):
+        super().setUp()
+        self.store = LocalFeedStore()
+
+    def test_build_keeps_entries_added_meanwhile(self):
+        entries = self.get_entries()
+        moved_entry = (entries[3][0] + timedelta(hours=1), 4, 30)
+
+        self.store.add(self.key, moved_entry)
+        self.assertFalse(self.store.is_built(self.key))
+
+        self.store.build(self.key, entries)
+        self.assertEqual(
+            self.store.range(self.key, None, 10),
+            [moved_entry, *entries[2::-1]],
+        )
+
+
+@skipUnless(is_redis_available(), 'Redis is not available')
+class RedisFeedStoreTestCase(FeedStoreTestsMixin, SimpleTestCase):
+    key = 'task-feed-test'
+
+    def setUp(self):
+        super().setUp()
+        self.store = RedisFeedStore()
+        self.store.delete([self.key])
+        self.addCleanup(self.store.delete, [self.key])
+
+    def test_sets_expiry_of_feed_added_to_before_build(self):
+        entries = self.get_entries()
+
+        self.store.add(self.key, entries[0])
+        self.assertGreater(self.store.client.ttl(self.key), 0)
+
+        self.store.build(self.key, entries)
+        self.store.client.expire(self.key, 10)
+        self.store.add(self.key, entries[1])
+        self.assertLessEqual(self.store.client.ttl(self.key), 10)
+
+
+class GetFeedTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        get_store().clear()
+        self.addCleanup(cache.clear)
+
+    def get_ids(self, city='Dusseldorf', before=None):
+        return [task_id for _, task_id, _ in get_feed(city, before)]
+
+    @mock.patch('apps.marketplace.feed.BATCH_SIZE', 2)
+    def test_reads_feeds_in_batches(self):
+        tasks = [
+            TaskFactory(event_type=event_type)
+            for event_type in ('online', 'offline') * 3
+        ]
+        berlin_task = TaskFactory(event_type='offline', owner__city='Berlin')
+
+        expected_ids = [task.id for task in reversed(tasks)]
+        self.assertEqual(self.get_ids(), expected_ids)
+
+        before = (tasks[3].created_at, tasks[3].id)
+        self.assertEqual(self.get_ids(before=before), expected_ids[3:])
+
+        self.assertEqual(
+            self.get_ids('Berlin'),
+            [berlin_task.id, *[task.id for task in tasks[4::-2]]],
+        )
+
+    def test_moves_changed_task_to_other_feed(self):
+        task = TaskFactory(event_type='offline')
+        self.assertEqual(self.get_ids('Berlin'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.event_type = 'online'
+            task.save()
+
+        self.assertEqual(self.get_ids('Berlin'), [task.id])
+        self.assertEqual(self.get_ids(), [task.id])
+
+    def test_reads_database_while_feed_is_built(self):
+        task = TaskFactory(event_type='offline')
+        [key] = get_versioned_keys(get_city_feed_key('Dusseldorf'))
+        cache.add(f'{key}-lock', 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_ids(), [task.id])
+        # The city tasks and the build of the online feed
+        self.assertEqual(len(queries.captured_queries), 2)
+
+        self.assertFalse(get_store().is_built(key))
+
+    def test_ignores_feed_built_before_invalidation(self):
+        task = TaskFactory(event_type='offline')
+        [key] = get_versioned_keys(get_city_feed_key('Dusseldorf'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_city_feeds('Dusseldorf')
+            task.owner.city = 'Berlin'
+            task.owner.save()
+
+        # Built by a request which has read the former generation
+        get_store().build(key, [(task.created_at, task.id, task.owner_id)])
+
+        self.assertEqual(self.get_ids('Dusseldorf'), [])
+        self.assertEqual(self.get_ids('Berlin'), [task.id])
+
+    @mock.patch('apps.marketplace.feed.BATCH_SIZE', 2)
+    def test_reads_more_than_batch_of_tasks_created_at_once(self):
+        tasks = [TaskFactory(event_type='offline') for _ in range(5)]
+        Task.objects.update(created_at=tasks[0].created_at)
+        expected_ids = [task.id for task in reversed(tasks)]
+
+        # From the database while the feed is being built
+        [key] = get_versioned_keys(get_city_feed_key('Dusseldorf'))
+        cache.add(f'{key}-lock', 1)
+        self.assertEqual(self.get_ids(), expected_ids)
+
+        cache.delete(f'{key}-lock')
+        self.assertEqual(self.get_ids(), expected_ids)
+
+        before = (tasks[0].created_at, tasks[3].id)
+        self.assertEqual(self.get_ids(before=before), expected_ids[2:])
+
+    def test_doesnt_load_owner_on_task_save(self):
+        task = Task.objects.get(id=TaskFactory(event_type='offline').id)
+
+        # The update and the city of the owner
+        with self.assertNumQueries(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                task.event_type = 'online'
+                task.save()
+        self.assertFalse(Task.owner.is_cached(task))
+
+        # The update only, the feed of the task is the same
+        with self.assertNumQueries(1):
+            task.info = 'Changed'
+            task.save(update_fields=['info'])
+
+        self.assertEqual(self.get_ids('Berlin'), [task.id])
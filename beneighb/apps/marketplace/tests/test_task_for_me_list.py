@@ -1,5 +1,8 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
-from unittest import skip
+from django.test.utils import CaptureQueriesContext
+from unittest import mock, skip
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -11,10 +14,21 @@ from apps.marketplace.factories import (
     ServiceFactory,
     TaskFactory,
 )
+from apps.marketplace.feed import get_store
+from apps.marketplace.models import Task
+from apps.core.pagination import KeysetPagination
 from apps.users.tests.utils import get_client_with_valid_token
 
 
-class TaskForMeListTestsCase(TestCase):
+class TaskForMeTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        # Feeds of the process outlive the rolled back tasks of other tests
+        get_store().clear()
+
+
+class TaskForMeListTestsCase(TaskForMeTestCase):
     url = '/marketplace/tasks/for-me/'
 
     def assert_helper_equal(self, response_helper, db_helper):
@@ -216,16 +230,14 @@ class TaskForMeListTestsCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
-class TaskForMeBlockedListTestsCase(TestCase):
+class TaskForMeBlockedListTestsCase(TaskForMeTestCase):
     url = '/marketplace/tasks/for-me/'
 
     def _block_user(self, profile_blocking, profile_to_block):
         url_template = '/users/profiles/{profile_id}/block/'
         client = get_client_with_valid_token(profile_blocking.user)
 
-        return client.post(
-            url_template.format(profile_id=profile_to_block.id)
-        )
+        return client.post(url_template.format(profile_id=profile_to_block.id))
 
     def test_blocked_helper_cannot_see_tasks(self):
         service = ServiceFactory()
@@ -247,3 +259,196 @@ class TaskForMeBlockedListTestsCase(TestCase):
         response = client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
+
+    def test_blocking_helper_cannot_see_tasks_of_blocked_owner(self):
+        helper = UserWithProfileFactory()
+        owner = UserWithProfileFactory()
+        TaskFactory(owner=owner.profile)
+
+        client = get_client_with_valid_token(helper)
+
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        self._block_user(helper.profile, owner.profile)
+
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
+
+class TaskForMePaginationTestsCase(TaskForMeTestCase):
+    url = '/marketplace/tasks/for-me/'
+
+    def _get_next_url(self, response):
+        link = response.headers.get('Link')
+        if link is None:
+            return None
+
+        return link.split(';')[0].strip('<>')
+
+    def test_paginates_with_cursor(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        tasks = [TaskFactory() for i in range(5)]
+
+        response = client.get(self.url, {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        received_ids = []
+        pages = 0
+        while True:
+            pages += 1
+            received_ids += [task['id'] for task in response.data]
+
+            next_url = self._get_next_url(response)
+            if next_url is None:
+                break
+
+            response = client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(received_ids, [task.id for task in reversed(tasks)])
+
+    @mock.patch.object(KeysetPagination, 'page_size', 2)
+    def test_returns_all_tasks_without_limit_and_cursor(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        tasks = [TaskFactory() for i in range(3)]
+
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [task['id'] for task in response.data],
+            [task.id for task in reversed(tasks)],
+        )
+        self.assertIsNone(response.headers.get('Link'))
+
+    def test_no_link_header_on_last_page(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        TaskFactory()
+        TaskFactory()
+
+        response = client.get(self.url, {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertIsNone(response.headers.get('Link'))
+
+    def test_tasks_with_same_created_at_are_not_skipped(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        tasks = [TaskFactory() for i in range(3)]
+        Task.objects.update(created_at=tasks[0].created_at)
+
+        response = client.get(self.url, {'limit': 1})
+        received_ids = [response.data[0]['id']]
+
+        next_url = self._get_next_url(response)
+        while next_url is not None:
+            response = client.get(next_url)
+            received_ids += [task['id'] for task in response.data]
+            next_url = self._get_next_url(response)
+
+        self.assertEqual(received_ids, [task.id for task in reversed(tasks)])
+
+    def test_returns_404_for_invalid_cursor(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        response = client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TaskForMeFeedTestsCase(TaskForMeTestCase):
+    url = '/marketplace/tasks/for-me/'
+
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_shows_task_created_after_feed_is_cached(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        task_1 = TaskFactory(event_type='offline', address='Some address')
+
+        response = client.get(self.url)
+        self.assertEqual([task['id'] for task in response.data], [task_1.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task_2 = TaskFactory()
+
+        response = client.get(self.url)
+        self.assertEqual(
+            [task['id'] for task in response.data], [task_2.id, task_1.id]
+        )
+
+    def test_doesnt_show_deleted_task(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        task = TaskFactory(event_type='offline', address='Some address')
+
+        response = client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+
+        response = client.get(self.url)
+        self.assertEqual(response.data, [])
+
+    def test_shows_tasks_of_owner_moved_to_user_city(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        owner = UserWithProfileFactory(profile__city='Berlin')
+        task = TaskFactory(
+            owner=owner.profile, event_type='offline', address='Some address'
+        )
+
+        response = client.get(self.url)
+        self.assertEqual(response.data, [])
+
+        owner_client = get_client_with_valid_token(owner)
+        response = owner_client.put(
+            '/users/profile/',
+            {
+                'name': owner.profile.name,
+                'age_above_18': True,
+                'agreed_with_conditions': True,
+                'gender': owner.profile.gender,
+                'speaking_languages': owner.profile.speaking_languages,
+                'city': 'Dusseldorf',
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = client.get(self.url)
+        self.assertEqual([task['id'] for task in response.data], [task.id])
+
+    def test_cached_feed_doesnt_query_tasks(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        TaskFactory()
+        client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        task_queries = [
+            query['sql']
+            for query in queries.captured_queries
+            if 'FROM "marketplace_task"' in query['sql']
+        ]
+        self.assertEqual(len(task_queries), 1)
+        self.assertIn('"marketplace_task"."id" IN', task_queries[0])
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -7,6 +9,7 @@ from apps.users.factories import UserWithProfileFactory
 
 from apps.marketplace.factories import (
     OfferFactory,
+    ServiceFactory,
     TaskFactory,
 )
 from apps.users.tests.utils import get_client_with_valid_token
@@ -115,3 +118,53 @@ class TaskMineListTestsCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data[0]['id'], task.id)
         self.assertEqual(response.data[0]['owner'], user.profile.id)
+
+    def test_number_of_queries_does_not_depend_on_number_of_tasks(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        def create_task_with_offers():
+            task = TaskFactory(owner=user.profile)
+            for i in range(2):
+                offer = OfferFactory(task=task)
+                offer.helper.services.add(ServiceFactory())
+
+        create_task_with_offers()
+        with CaptureQueriesContext(connection) as one_task_queries:
+            response = client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        for i in range(4):
+            create_task_with_offers()
+        with CaptureQueriesContext(connection) as many_tasks_queries:
+            response = client.get(self.url)
+        self.assertEqual(len(response.data), 5)
+
+        self.assertEqual(
+            len(many_tasks_queries.captured_queries),
+            len(one_task_queries.captured_queries),
+        )
+
+    def test_paginates_newest_first_with_limit(self):
+        client = get_client_with_valid_token(self.USER)
+
+        response = client.get(self.url, {'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [task['id'] for task in response.data], [self.TASK_2.id]
+        )
+
+        next_url = response.headers['Link'].split(';')[0].strip('<>')
+        response = client.get(next_url)
+        self.assertEqual(
+            [task['id'] for task in response.data], [self.TASK_WITH_INFO.id]
+        )
+        self.assertNotIn('Link', response.headers)
+
+    def test_returns_all_tasks_without_limit_and_cursor(self):
+        client = get_client_with_valid_token(self.USER)
+
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn('Link', response.headers)
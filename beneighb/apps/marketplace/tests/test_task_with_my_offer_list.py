@@ -1,5 +1,7 @@
 from collections import OrderedDict
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from unittest import mock
 
 from rest_framework import status
@@ -148,3 +150,54 @@ class TaskWithMyOfferListTestsCase(TestCase):
         response = client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
+
+    def test_filters_by_offer_status(self):
+        user = UserWithProfileFactory()
+
+        pending_task = TaskFactory()
+        accepted_task = TaskFactory()
+        OfferFactory(helper=user.profile, task=pending_task)
+        OfferFactory(
+            helper=user.profile, task=accepted_task, status='accepted'
+        )
+
+        client = get_client_with_valid_token(user)
+
+        response = client.get(self.url, {'status': 'accepted'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [task['id'] for task in response.data], [accepted_task.id]
+        )
+
+        response = client.get(self.url, {'status': 'pending'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [task['id'] for task in response.data], [pending_task.id]
+        )
+
+    def test_returns_400_for_invalid_status(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        response = client.get(self.url, {'status': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_number_of_queries_does_not_depend_on_number_of_offers(self):
+        user = UserWithProfileFactory()
+        client = get_client_with_valid_token(user)
+
+        OfferFactory(helper=user.profile)
+        with CaptureQueriesContext(connection) as one_offer_queries:
+            response = client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        for i in range(9):
+            OfferFactory(helper=user.profile)
+        with CaptureQueriesContext(connection) as many_offers_queries:
+            response = client.get(self.url)
+        self.assertEqual(len(response.data), 10)
+
+        self.assertEqual(
+            len(many_offers_queries.captured_queries),
+            len(one_offer_queries.captured_queries),
+        )
@@ -1,23 +1,30 @@
 import logging
 
+from django.db import transaction
+
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from apps.core.idempotency import IdempotentCreateMixin
+from apps.core.throttling import OfferCreateThrottle
 from apps.marketplace.models import Assignment, Offer
 from apps.marketplace.serializers import (
     OfferAcceptSerializer,
     OfferSerializer,
     OfferWithChatSerializer,
 )
-from apps.users.notifications import send_push_notification
+from apps.users.blocks import is_blocked
+from apps.users.events import publish_profile_event
+from apps.users.outbox import enqueue_push_notification
 from apps.users.views import HttpForbiddenException
 
 logger = logging.getLogger(__name__)
 
 
-class OfferCreateView(generics.CreateAPIView):
+class OfferCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (OfferCreateThrottle,)
     serializer_class = OfferSerializer
     queryset = Offer.objects.all()
 
@@ -33,31 +40,23 @@ class OfferCreateView(generics.CreateAPIView):
             HttpForbiddenException: If the helper is blocked by the task owner.
         """
 
-        # TODO: Room for improvement. Maybe we should combine these two queries
-        helper_blocked = task.owner.blocking_profiles.filter(
-            blocked_profile=helper
-        ).exists()
-
-        owner_blocked = task.owner.blocked_profiles.filter(
-            blocking_profile=helper
-        ).exists()
-
-        if helper_blocked or owner_blocked:
+        if is_blocked(helper.id, task.owner_id):
             raise HttpForbiddenException('You are blocked by the task owner')
 
     def perform_create(self, serializer):
         task = serializer.validated_data['task']
         self._validate_is_not_blocked(task, self.request.user.profile)
 
-        offer = serializer.save()
-        send_push_notification(
-            offer.task.owner,
-            'You have a new offer!',
-            data={
+        with transaction.atomic():
+            offer = serializer.save()
+            data = {
                 'type': 'new_offer',
                 'task_id': str(offer.task.id),
-            },
-        )
+            }
+            publish_profile_event(offer.task.owner_id, data)
+            enqueue_push_notification(
+                offer.task.owner, 'You have a new offer!', data=data
+            )
 
 
 class OfferMineListView(generics.ListCreateAPIView):
@@ -74,6 +73,7 @@ class OfferAcceptView(generics.UpdateAPIView):
     serializer_class = OfferAcceptSerializer
     queryset = Offer.objects.all()
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         offer_instance = self.get_object()
 
@@ -95,13 +95,13 @@ class OfferAcceptView(generics.UpdateAPIView):
         )
         serializer.is_valid()
 
-        send_push_notification(
-            offer_instance.helper,
-            'Your offer has been accepted!',
-            data={
-                'type': 'offer_accepted',
-                'chat_id': str(offer_instance.chat.id),
-            },
+        data = {
+            'type': 'offer_accepted',
+            'chat_id': str(offer_instance.chat.id),
+        }
+        publish_profile_event(offer_instance.helper_id, data)
+        enqueue_push_notification(
+            offer_instance.helper, 'Your offer has been accepted!', data=data
         )
 
         return Response(serializer.data)
@@ -1,103 +1,120 @@
 import logging
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404
 
 from rest_framework import generics
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from apps.marketplace.permissions import IsIdempotent
+from apps.core.idempotency import IdempotentCreateMixin
+from apps.core.pagination import KeysetPagination
+from apps.core.throttling import TaskCreateThrottle
+from apps.marketplace.feed import get_feed
 from apps.marketplace.models import Offer, Task
+from apps.marketplace.notifications import enqueue_new_task_notifications
 from apps.marketplace.serializers import (
     TaskCreateSerializer,
     TaskWithOffersSerializer,
 )
-from apps.users.models import Profile
-from apps.users.notifications import send_push_notification
+from apps.users.blocks import get_block_sets, get_excluded_ids
 
 logger = logging.getLogger(__name__)
 
 
-class TaskCreateView(generics.CreateAPIView):
-    permission_classes = (IsAuthenticated, IsIdempotent)
+class TaskCreateView(IdempotentCreateMixin, generics.CreateAPIView):
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TaskCreateThrottle,)
     serializer_class = TaskCreateSerializer
     queryset = Task.objects.all()
 
+    @transaction.atomic
     def perform_create(self, serializer):
         task = serializer.save()
-        text = f'New task has been created: {task.service.name}'
-        data = {
-            'type': 'new_task',
-            'task_id': str(task.id),
-        }
-
-        # task_service = task.service
-        recipients = (
-            Profile.objects.all()
-            # TODO: Uncomment this, during #284 - add back filters for services
-            # with corresponding services
-            # Profile.objects.filter(services=task_service)
-            .exclude(id=task.owner.id)
-            .exclude(fcm_token='')
-            .exclude(fcm_token__isnull=True)
-        )
-
-        for recipient in recipients:
-            # PERFORMANCE: This is not optimal: Use celery and topics instead
-            send_push_notification(recipient, text, data=data)
+        enqueue_new_task_notifications(task)
 
 
 class TaskMineListView(generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = TaskWithOffersSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         profile = self.request.user.profile
-        return Task.objects.filter(owner=profile)
+        tasks = Task.objects.filter(owner=profile)
+
+        return TaskWithOffersSerializer.setup_eager_loading(tasks, profile)
 
 
 class TaskForMeListView(generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = TaskWithOffersSerializer
-
-    def get_blocking_owners_ids(self, user):
-        return user.profile.blocked_profiles.values_list(
-            'blocking_profile_id', flat=True
-        )
-
-    def get_queryset(self):
-        user = self.request.user
-        # TODO: Check if can be optimized
-        # user_services = user.profile.services.all()
-        # return Task.objects.filter(service__in=user_services).exclude(
-        #     owner=user.profile
-        # )
+    pagination_class = KeysetPagination
+
+    def get_feed_keys(self, user, position=None):
+        """
+        Yields (created_at, id) of the tasks from the cached feed
+        of user's city and online tasks before the position, newest first,
+        without user's own tasks and tasks of the owners blocked by or
+        blocking the user.
+        """
         # TODO: Uncomment this, during #284 - add back filters for services
+        excluded_owners_ids = get_excluded_ids(user.profile.id) | {
+            user.profile.id
+        }
 
-        ONLINE_EVENT = Task.EventTypes.ONLINE
+        feed = get_feed(user.profile.city, position)
+        for created_at, task_id, owner_id in feed:
+            if owner_id not in excluded_owners_ids:
+                yield created_at, task_id
 
-        tasks = Task.objects.all().exclude(owner=user.profile)
-        blocking_owners_ids = self.get_blocking_owners_ids(user)
-        tasks = tasks.exclude(owner__id__in=blocking_owners_ids)
+    def get_queryset(self):
+        return TaskWithOffersSerializer.setup_eager_loading(
+            Task.objects.all(), self.request.user.profile
+        )
 
-        tasks = tasks.filter(
-            Q(owner__city=user.profile.city) | Q(event_type=ONLINE_EVENT)
+    def list(self, request, *args, **kwargs):
+        page_keys = self.paginator.paginate_keys(
+            lambda position: self.get_feed_keys(request.user, position),
+            request,
         )
+        is_paginated = page_keys is not None
+        if not is_paginated:
+            page_keys = self.get_feed_keys(request.user)
 
-        return tasks
+        page_ids = [task_id for _, task_id in page_keys]
+        tasks = self.get_queryset().in_bulk(page_ids)
+        page = [tasks[task_id] for task_id in page_ids if task_id in tasks]
+
+        serializer = self.get_serializer(page, many=True)
+        if not is_paginated:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
 
 
 class TaskWithMyOfferListView(generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = TaskWithOffersSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        user = self.request.user
+        profile = self.request.user.profile
 
-        my_offers = Offer.objects.filter(helper=user.profile)
-        task_ids = [offer.task.id for offer in my_offers]
+        my_offers = Offer.objects.filter(task=OuterRef('pk'), helper=profile)
 
-        return Task.objects.filter(id__in=task_ids)
+        offer_status = self.request.query_params.get('status', None)
+        if offer_status is not None:
+            if offer_status not in Offer.StatusTypes.values:
+                raise ValidationError(
+                    {'status': 'Invalid status value.'},
+                )
+
+            my_offers = my_offers.filter(status=offer_status)
+
+        tasks = Task.objects.filter(Exists(my_offers))
+
+        return TaskWithOffersSerializer.setup_eager_loading(tasks, profile)
 
 
 class TaskRetrieveView(generics.RetrieveAPIView):
@@ -107,14 +124,12 @@ class TaskRetrieveView(generics.RetrieveAPIView):
 
     def _is_blocked_by_owner(self):
         task_id = self.kwargs.get('pk')
-        task = get_object_or_404(self.queryset, id=task_id)
-        owner_profile = task.owner
+        task = get_object_or_404(self.queryset.only('owner_id'), id=task_id)
 
         helper_profile = self.request.user.profile
+        block_sets = get_block_sets(helper_profile.id)
 
-        return owner_profile.blocking_profiles.filter(
-            blocked_profile=helper_profile
-        ).exists()
+        return task.owner_id in block_sets.blocking
 
     def get_queryset(self):
         is_blocked_by_owner = self._is_blocked_by_owner()
@@ -122,4 +137,6 @@ class TaskRetrieveView(generics.RetrieveAPIView):
         if is_blocked_by_owner:
             raise PermissionDenied()
 
-        return self.queryset
+        return TaskWithOffersSerializer.setup_eager_loading(
+            self.queryset, self.request.user.profile
+        )
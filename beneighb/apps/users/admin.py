@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from .models import Profile, User
+from .models import Profile, PushNotification, User
 
 
 @admin.register(User)
@@ -97,3 +97,18 @@ class CustomProfileAdmin(admin.ModelAdmin):
     ]
 
     inlines = [UserInline]
+
+
+@admin.register(PushNotification)
+class PushNotificationAdmin(admin.ModelAdmin):
+    list_display = [
+        'recipient',
+        'condition',
+        'body',
+        'created_at',
+        'available_at',
+        'attempts',
+        'failed_at',
+    ]
+    list_filter = ['failed_at']
+    raw_id_fields = ['recipient']
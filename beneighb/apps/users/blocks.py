@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+from django.db.models import Q
+
+from apps.core.generations import (
+    get_current,
+    invalidate_generations,
+    set_current,
+)
+from apps.users.models import Block
+
+BLOCKS_TIMEOUT = 24 * 60 * 60
+
+BlockSets = namedtuple('BlockSets', ['blocked', 'blocking'])
+
+
+def get_block_sets_key(profile_id):
+    return f'blocks-{profile_id}'
+
+
+def get_block_sets(profile_id):
+    """
+    Returns ids of the profiles blocked by the profile
+    and ids of the profiles blocking the profile, with one cache request.
+    """
+    key = get_block_sets_key(profile_id)
+
+    block_sets, generation = get_current(key)
+    if block_sets is None:
+        block_sets = _load_block_sets(profile_id)
+        set_current(key, block_sets, generation, BLOCKS_TIMEOUT)
+
+    return block_sets
+
+
+def get_excluded_ids(profile_id):
+    """
+    Returns ids of all the profiles blocked by or blocking the profile.
+    """
+    block_sets = get_block_sets(profile_id)
+    return block_sets.blocked | block_sets.blocking
+
+
+def is_blocked(profile_id, other_profile_id):
+    """
+    Checks if the profiles are blocked by each other in any direction.
+    """
+    return other_profile_id in get_excluded_ids(profile_id)
+
+
+def invalidate_block_sets(*profile_ids):
+    invalidate_generations(
+        *[get_block_sets_key(profile_id) for profile_id in profile_ids]
+    )
+
+
+def _load_block_sets(profile_id):
+    blocks = Block.objects.filter(
+        Q(blocked_profile_id=profile_id) | Q(blocking_profile_id=profile_id)
+    ).values_list('blocked_profile_id', 'blocking_profile_id')
+
+    blocked, blocking = set(), set()
+    for blocked_profile_id, blocking_profile_id in blocks:
+        if blocking_profile_id == profile_id:
+            blocked.add(blocked_profile_id)
+        else:
+            blocking.add(blocking_profile_id)
+
+    return BlockSets(frozenset(blocked), frozenset(blocking))
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import logging
+
+from channels.exceptions import StopConsumer
+from channels.generic.http import AsyncHttpConsumer
+
+from apps.core.pubsub import subscribe, unsubscribe
+from apps.users.events import get_profile_topic
+
+logger = logging.getLogger(__name__)
+
+# Comments sent to idle streams, so proxies don't close them
+HEARTBEAT_INTERVAL = 15
+
+
+class ProfileEventsConsumer(AsyncHttpConsumer):
+    """
+    Streams the events of the profile as Server-Sent Events,
+    see apps.users.events.
+
+    The stream is read-only, the apps still change data through
+    the REST API.
+    """
+
+    heartbeat_interval = HEARTBEAT_INTERVAL
+
+    async def http_request(self, message):
+        # Unlike in AsyncHttpConsumer, the response stays open after
+        # handle() until the client disconnects
+        if 'body' in message:
+            self.body.append(message['body'])
+        if not message.get('more_body'):
+            await self.handle(b''.join(self.body))
+
+    async def handle(self, body):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.send_response(
+                401,
+                json.dumps({'detail': 'Invalid token'}).encode(),
+                headers=[(b'Content-Type', b'application/json')],
+            )
+            raise StopConsumer()
+
+        self.topic = get_profile_topic(user.profile_id)
+        await subscribe(self.channel_layer, self.topic, self.channel_name)
+
+        await self.send_headers(
+            headers=[
+                (b'Content-Type', b'text/event-stream'),
+                (b'Cache-Control', b'no-cache'),
+                # Disables buffering of the stream by nginx
+                (b'X-Accel-Buffering', b'no'),
+            ]
+        )
+        # Headers are sent with the first part of the body
+        await self.send_body(b': connected\n\n', more_body=True)
+
+        self.heartbeat = asyncio.create_task(self.send_heartbeats())
+
+    async def disconnect(self):
+        if hasattr(self, 'heartbeat'):
+            self.heartbeat.cancel()
+        if hasattr(self, 'topic'):
+            await unsubscribe(
+                self.channel_layer, self.topic, self.channel_name
+            )
+
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.send_body(b': heartbeat\n\n', more_body=True)
+
+    async def profile_event(self, event):
+        data = event['data']
+        message = f'event: {data["type"]}\ndata: {json.dumps(data)}\n\n'
+        await self.send_body(message.encode(), more_body=True)
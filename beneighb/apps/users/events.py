@@ -0,0 +1,12 @@
+from apps.core.pubsub import publish
+
+
+def get_profile_topic(profile_id):
+    return f'profile-{profile_id}'
+
+
+def publish_profile_event(profile_id, data):
+    publish(
+        get_profile_topic(profile_id),
+        {'type': 'profile.event', 'data': data},
+    )
@@ -0,0 +1,124 @@
+import io
+import timeit
+
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.chat.factories import ChatFactory, MessageFactory
+from apps.chat.models import Message
+from apps.chat.serializers import MessageSerializer
+from apps.core.parsers import ORJSONParser
+from apps.core.renderers import ORJSONRenderer
+from apps.marketplace.factories import (
+    OfferFactory,
+    ServiceFactory,
+    TaskFactory,
+)
+from apps.marketplace.models import Task
+from apps.marketplace.serializers import TaskWithOffersSerializer
+from apps.users.factories import ProfileFactory
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares rendering and parsing of task and message lists with '
+        'the JSON renderer and parser of DRF and the orjson ones. '
+        'The data is created in a transaction, which is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=20)
+        parser.add_argument('--offers', type=int, default=5)
+        parser.add_argument('--messages', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            payloads = (
+                (
+                    f'{options["tasks"]} tasks',
+                    self._get_tasks(options['tasks'], options['offers']),
+                ),
+                (
+                    f'{options["messages"]} messages',
+                    self._get_messages(options['messages']),
+                ),
+            )
+            transaction.set_rollback(True)
+
+        for name, data in payloads:
+            content = JSONRenderer().render(data)
+            self.stdout.write(f'{name}, {len(content)} bytes:')
+
+            for action, stock, fast in (
+                (
+                    'render',
+                    lambda: JSONRenderer().render(data),
+                    lambda: ORJSONRenderer().render(data),
+                ),
+                (
+                    'parse',
+                    lambda: JSONParser().parse(io.BytesIO(content)),
+                    lambda: ORJSONParser().parse(io.BytesIO(content)),
+                ),
+            ):
+                stock_duration = self._measure(stock, options['repeat'])
+                fast_duration = self._measure(fast, options['repeat'])
+                self.stdout.write(
+                    f'  {action}: DRF {stock_duration * 1e6:.1f}us, '
+                    f'orjson {fast_duration * 1e6:.1f}us, '
+                    f'{stock_duration / fast_duration:.1f}x faster'
+                )
+
+    def _measure(self, func, repeat):
+        # Best of the runs, the others are slowed down by the system
+        return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat
+
+    def _get_tasks(self, count, offers_count):
+        owner = ProfileFactory()
+        services = ServiceFactory.create_batch(3)
+
+        for task in TaskFactory.create_batch(
+            count,
+            owner=owner,
+            service=services[0],
+            address='Königsallee 1, Düsseldorf',
+            info='Need help with moving a sofa to the third floor',
+            datetime_options=[
+                '2023-08-01T10:00:00Z',
+                '2023-08-02T18:30:00Z',
+            ],
+        ):
+            for _ in range(offers_count):
+                helper = ProfileFactory()
+                helper.services.set(services)
+                OfferFactory(task=task, helper=helper)
+
+        tasks = TaskWithOffersSerializer.setup_eager_loading(
+            Task.objects.filter(owner=owner).order_by('id'), owner
+        )
+        return TaskWithOffersSerializer(tasks, many=True).data
+
+    def _get_messages(self, count):
+        chat = ChatFactory()
+        for index in range(count):
+            MessageFactory(
+                chat=chat,
+                sender=chat.helper if index % 2 else chat.owner,
+                text='Hello! Is the task still actual? ' * 3,
+            )
+
+        messages = list(Message.objects.filter(chat=chat).order_by('id'))
+        for message in messages:
+            message.read_at = message.sent_at
+
+        request = SimpleNamespace(
+            user=SimpleNamespace(profile_id=chat.owner_id)
+        )
+        return MessageSerializer(
+            messages, many=True, context={'request': request}
+        ).data
@@ -0,0 +1,88 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.users.models import Cities, Genders, LanguageChoices, Profile
+from apps.users.notifications import FakeTransport
+from apps.users.outbox import (
+    DELIVERY_BATCH_SIZE,
+    deliver_notifications,
+    enqueue_push_notification,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares delivering the outbox of push notifications one by one '
+        'and in batches, using the fake FCM transport. '
+        'The data is created in a transaction, which is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=2000)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Seconds every fake FCM request takes',
+        )
+        parser.add_argument(
+            '--invalid-share',
+            type=float,
+            default=0.05,
+            help='Share of recipients with unregistered tokens',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipients = self._get_recipients(
+                options['recipients'], options['invalid_share']
+            )
+
+            for name, batch_size in (
+                ('one by one', 1),
+                ('batches', DELIVERY_BATCH_SIZE),
+            ):
+                # Invalid tokens erased by the former run are restored
+                Profile.objects.bulk_update(recipients, ['fcm_token'])
+                for recipient in recipients:
+                    enqueue_push_notification(
+                        recipient, 'Benchmark', data={'type': 'benchmark'}
+                    )
+
+                transport = FakeTransport(latency=options['latency'])
+                started_at = time.perf_counter()
+                while deliver_notifications(batch_size, transport):
+                    pass
+                duration = time.perf_counter() - started_at
+
+                self.stdout.write(
+                    f'{name}: {len(recipients)} recipients, '
+                    f'{transport.requests_count} FCM requests, '
+                    f'{duration:.3f}s'
+                )
+
+            transaction.set_rollback(True)
+
+    def _get_recipients(self, count, invalid_share):
+        invalid_count = int(count * invalid_share)
+        return Profile.objects.bulk_create(
+            [
+                Profile(
+                    name=f'Benchmark {index}',
+                    age_above_18=True,
+                    agreed_with_conditions=True,
+                    gender=Genders.FEMALE,
+                    speaking_languages=[LanguageChoices.ENGLISH],
+                    city=Cities.BERLIN,
+                    fcm_token=(
+                        f'{FakeTransport.INVALID_TOKEN_PREFIX}-'
+                        f'benchmark-{index}'
+                        if index <= invalid_count
+                        else f'benchmark-{index}'
+                    ),
+                )
+                for index in range(1, count + 1)
+            ]
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.users.outbox import DELIVERY_BATCH_SIZE, deliver_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        'Delivers push notifications from the outbox to FCM. '
+        'Several workers can run in parallel.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DELIVERY_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the outbox is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver all due notifications and exit',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            delivered = deliver_notifications(options['batch_size'])
+            if delivered:
+                self.stdout.write(f'{delivered} notifications processed')
+                continue
+
+            if options['once']:
+                return
+            time.sleep(options['interval'])
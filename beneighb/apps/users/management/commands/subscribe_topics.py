@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.marketplace.models import Service
+from apps.users.models import Profile
+from apps.users.topics import (
+    ALL_TOPIC,
+    get_city_topic,
+    get_personal_topic,
+    get_service_topic,
+    subscribe_to_topic,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Subscribes devices of all profiles to the topic of all devices, '
+        'their city, services and personal FCM topics.'
+    )
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(fcm_token='').exclude(
+            fcm_token__isnull=True
+        )
+
+        self._subscribe(profiles, ALL_TOPIC)
+
+        cities = profiles.values_list('city', flat=True).distinct()
+        for city in cities:
+            if city:
+                tokens = profiles.filter(city=city)
+                self._subscribe(tokens, get_city_topic(city))
+
+        self._subscribe(
+            profiles.filter(Q(city='') | Q(city__isnull=True)),
+            get_city_topic(None),
+        )
+
+        for service_id in Service.objects.values_list('id', flat=True):
+            tokens = profiles.filter(services=service_id)
+            self._subscribe(tokens, get_service_topic(service_id))
+
+        count = 0
+        for profile_id, token in profiles.values_list('id', 'fcm_token'):
+            subscribe_to_topic([token], get_personal_topic(profile_id))
+            count += 1
+        self.stdout.write(f'personal topics: {count} devices subscribed')
+
+    def _subscribe(self, profiles, topic):
+        tokens = list(profiles.values_list('fcm_token', flat=True))
+        if tokens:
+            subscribe_to_topic(tokens, topic)
+
+        self.stdout.write(f'{topic}: {len(tokens)} devices subscribed')
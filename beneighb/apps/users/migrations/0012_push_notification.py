@@ -0,0 +1,59 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0011_alter_block_blocked_profile_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PushNotification',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('condition', models.CharField(blank=True, max_length=1000)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                (
+                    'available_at',
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('failed_at', models.DateTimeField(blank=True, null=True)),
+                (
+                    'recipient',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='push_notifications',
+                        to='users.profile',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        condition=models.Q(('failed_at__isnull', True)),
+                        fields=['available_at', 'id'],
+                        name='pushnotification_pending_idx',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0012_push_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushnotification',
+            name='collapse_key',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pushnotification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='pushnotification',
+            index=models.Index(
+                condition=models.Q(
+                    ('failed_at__isnull', True),
+                    models.Q(('collapse_key', ''), _negated=True),
+                ),
+                fields=['recipient', 'collapse_key'],
+                name='pushnotification_collapse_idx',
+            ),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
@@ -128,10 +129,35 @@ class User(AbstractUser):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
+    from apps.users.principals import invalidate_principals
+
+    invalidate_principals(instance.id)
+
     if instance.profile:
         instance.profile.save()
 
 
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    from apps.users.principals import invalidate_principals
+
+    invalidate_principals(instance.id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_principal(sender, instance, **kwargs):
+    from apps.users.principals import invalidate_principals
+
+    # Cached when the profile is reached from the user
+    try:
+        user = instance.user
+    except User.DoesNotExist:
+        return
+
+    invalidate_principals(user.id)
+
+
 class Block(models.Model):
     blocked_profile = models.ForeignKey(
         Profile, on_delete=models.CASCADE, related_name='blocked_profiles'
@@ -145,3 +171,65 @@ class Block(models.Model):
 
     def __str__(self):
         return f'{self.blocked_profile} is blocked by {self.blocking_profile}'
+
+
+@receiver(post_save, sender=Block)
+@receiver(post_delete, sender=Block)
+def invalidate_block_sets(sender, instance, **kwargs):
+    from apps.users.blocks import invalidate_block_sets
+
+    invalidate_block_sets(
+        instance.blocked_profile_id, instance.blocking_profile_id
+    )
+
+
+class PushNotification(models.Model):
+    """
+    Outbox of push notifications, see apps.users.outbox.
+
+    Rows are written in the transaction of the change they notify about
+    and are deleted once delivered to FCM.
+
+    Pending rows with the same recipient and collapse_key are merged,
+    count is the number of merged notifications.
+    """
+
+    recipient = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='push_notifications',
+    )
+    condition = models.CharField(max_length=1000, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    collapse_key = models.CharField(max_length=64, blank=True)
+    count = models.PositiveIntegerField(default=1)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                condition=models.Q(failed_at__isnull=True),
+                name='pushnotification_pending_idx',
+            ),
+            models.Index(
+                fields=['recipient', 'collapse_key'],
+                condition=(
+                    models.Q(failed_at__isnull=True)
+                    & ~models.Q(collapse_key='')
+                ),
+                name='pushnotification_collapse_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient_id or self.condition}: {self.body}'
@@ -1,61 +1,116 @@
 import logging
-import requests
+import threading
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import firebase_admin
 
 from firebase_admin import messaging
-from firebase_admin.exceptions import InvalidArgumentError
+
+from apps.core.backends import load_backend
+from apps.users.models import Profile, User
+from apps.users.principals import invalidate_principals
 
 
 logger = logging.getLogger(__name__)
 
+INVALID_TOKEN_ERRORS = (
+    firebase_admin._messaging_utils.UnregisteredError,
+    firebase_admin._messaging_utils.SenderIdMismatchError,
+)
+
+
+class FirebaseTransport:
+    """
+    Sends messages to FCM through firebase_admin.
+    """
+
+    def send_each(self, messages):
+        return messaging.send_each(messages)
+
+    def subscribe_to_topic(self, tokens, topic):
+        return messaging.subscribe_to_topic(tokens, topic)
+
+    def unsubscribe_from_topic(self, tokens, topic):
+        return messaging.unsubscribe_from_topic(tokens, topic)
+
+
+class FakeTransport:
+    """
+    Answers like FCM without any network calls, used to benchmark
+    the sending offline.
+
+    Tokens starting with INVALID_TOKEN_PREFIX are answered as unregistered,
+    every request takes `latency` seconds. Like firebase_admin, send_each
+    makes a request per message, all of them in parallel threads.
+    """
+
+    INVALID_TOKEN_PREFIX = 'invalid'
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.requests_count = 0
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def send_each(self, messages):
+        with ThreadPoolExecutor(max_workers=len(messages)) as executor:
+            return messaging.BatchResponse(
+                list(executor.map(self._send, messages))
+            )
+
+    def subscribe_to_topic(self, tokens, topic):
+        self._request()
+        self.subscriptions[topic].update(tokens)
+        return messaging.TopicManagementResponse(
+            {'results': [{} for token in tokens]}
+        )
+
+    def unsubscribe_from_topic(self, tokens, topic):
+        self._request()
+        self.subscriptions[topic].difference_update(tokens)
+        return messaging.TopicManagementResponse(
+            {'results': [{} for token in tokens]}
+        )
+
+    def _send(self, message):
+        self._request()
+        return self._response(message.token)
+
+    def _response(self, token):
+        if token and token.startswith(self.INVALID_TOKEN_PREFIX):
+            error = firebase_admin._messaging_utils.UnregisteredError(
+                'Requested entity was not found.'
+            )
+            return messaging.SendResponse(None, error)
+        return messaging.SendResponse({'name': 'fake-message-id'}, None)
+
+    def _request(self):
+        with self.lock:
+            self.requests_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def get_transport():
+    return load_backend('FCM_TRANSPORT')
+
+
+def erase_fcm_tokens(tokens):
+    """
+    Erases the tokens FCM has rejected as unregistered or mismatched
+    with a single update, returns the number of erased tokens.
+    """
+    # A bulk update sends no signals to drop the cached users
+    user_ids = list(
+        User.objects.filter(profile__fcm_token__in=tokens).values_list(
+            'id', flat=True
+        )
+    )
+    erased = Profile.objects.filter(fcm_token__in=tokens).update(fcm_token='')
+    invalidate_principals(*user_ids)
 
-def send_push_notification(recipient, body, title='', data=None):
-    if not recipient.fcm_token:
-        return
-
-    msg_data = {
-        'notification': messaging.Notification(
-            title=title,
-            body=body,
-        ),
-        'token': recipient.fcm_token,
-    }
-
-    if data:
-        msg_data['data'] = data
-
-    try:
-        message = messaging.Message(**msg_data)
-        response = messaging.send(message)
-        logger.info('Successfully sent message:', response)
-    except InvalidArgumentError:
-        logger.exception(f'Invalid FCM token: {recipient.fcm_token}')
-    except requests.exceptions.HTTPError:
-        recipient.fcm_token = ''
-        recipient.save()
-
-        logger.info('Invalid FCM token has been erased')
-    except (
-        firebase_admin._messaging_utils.UnregisteredError
-    ) as unregistered_error:
-        recipient.fcm_token = ''
-        recipient.save()
-
-        logger.info(f'Unregistered errro: {unregistered_error}')
-        logger.info('Invalid FCM token has been erased')
-    except (
-        firebase_admin._messaging_utils.SenderIdMismatchError
-    ) as sender_id_mismatch_error:
-        recipient.fcm_token = ''
-        recipient.save()
-
-        logger.info(f'Sender ID mismatch error: {sender_id_mismatch_error}')
-        logger.info('Invalid FCM token has been erased')
-    except Exception as e:
-        recipient.fcm_token = ''
-        recipient.save()
-
-        logger.exception('Error:', e)
-        logger.info('FCM token has been erased')
-        logger.info('New fcm token:', recipient.fcm_token)
+    logger.info(f'{erased} invalid FCM tokens have been erased')
+    return erased
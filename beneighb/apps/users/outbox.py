@@ -0,0 +1,248 @@
+import logging
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from firebase_admin import messaging
+
+from apps.core.dispatcher import dispatch
+from apps.users.models import PushNotification
+from apps.users.notifications import (
+    INVALID_TOKEN_ERRORS,
+    erase_fcm_tokens,
+    get_transport,
+)
+
+logger = logging.getLogger(__name__)
+
+# send_each of firebase_admin accepts up to 500 messages
+DELIVERY_BATCH_SIZE = 500
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def enqueue_push_notification(recipient, body, title='', data=None):
+    """
+    Stores the notification in the current transaction, it is delivered
+    after commit.
+    """
+    if not recipient.fcm_token:
+        return
+
+    PushNotification.objects.create(
+        recipient=recipient,
+        title=title,
+        body=body,
+        data=data or {},
+    )
+    _deliver_on_commit()
+
+
+def enqueue_collapsible_push_notification(
+    recipient,
+    body,
+    collapse_key,
+    coalesced_body,
+    window,
+    title='',
+    data=None,
+    count=1,
+):
+    """
+    Enqueues a notification of the recipient with the collapse key.
+    The first one in the window is sent right away, the ones following
+    it are merged and sent at the end of the window.
+
+    The merged notification has coalesced_body formatted with their
+    count, and replaces the former ones on the device. A count above 1
+    enqueues that many notifications at once, merged from the start.
+    """
+    if not recipient.fcm_token:
+        return
+
+    # Rows claimed by a delivery are locked and skipped,
+    # it is too late to merge into them.
+    notification = (
+        PushNotification.objects.select_for_update(skip_locked=True)
+        .filter(
+            recipient=recipient,
+            collapse_key=collapse_key,
+            failed_at__isnull=True,
+        )
+        .order_by('id')
+        .first()
+    )
+    if notification is None:
+        now = timezone.now()
+        window_key = f'push-window-{recipient.id}-{collapse_key}'
+        # Holds the start of the window
+        started = cache.add(window_key, now, window.total_seconds())
+
+        PushNotification.objects.create(
+            recipient=recipient,
+            title=title,
+            body=body if count == 1 else coalesced_body.format(count=count),
+            data=data or {},
+            collapse_key=collapse_key,
+            count=count,
+            available_at=(
+                now if started else cache.get(window_key, now) + window
+            ),
+        )
+        if started:
+            _deliver_on_commit()
+        return
+
+    notification.count += count
+    notification.title = title
+    notification.body = coalesced_body.format(count=notification.count)
+    notification.data = data or {}
+    notification.save(update_fields=['count', 'title', 'body', 'data'])
+
+
+def enqueue_conditional_push_notification(
+    condition, body, title='', data=None
+):
+    """
+    Enqueues a notification to all devices subscribed to the topics
+    matching the FCM condition, e.g. "'city-Berlin' in topics".
+    """
+    PushNotification.objects.create(
+        condition=condition,
+        title=title,
+        body=body,
+        data=data or {},
+    )
+    _deliver_on_commit()
+
+
+def deliver_notifications(batch_size=DELIVERY_BATCH_SIZE, transport=None):
+    """
+    Sends a batch of due notifications with a single send_each call,
+    which makes an FCM request per notification, in parallel.
+    The transport of the settings is used unless another one is given.
+
+    Rows are claimed with SKIP LOCKED, so workers can run in parallel,
+    failed ones are retried with a backoff. Returns the number of
+    claimed notifications.
+    """
+    with transaction.atomic():
+        notifications = list(
+            PushNotification.objects.select_for_update(
+                skip_locked=True, of=('self',)
+            )
+            .select_related('recipient')
+            .filter(failed_at__isnull=True, available_at__lte=timezone.now())
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if not notifications:
+            return 0
+
+        _send(notifications, transport or get_transport())
+
+    return len(notifications)
+
+
+def _send(notifications, transport):
+    delivered, failed, invalid_tokens = [], [], []
+
+    messages = []
+    for notification in notifications:
+        recipient = notification.recipient
+        if recipient and not recipient.fcm_token:
+            # The token has been erased since the notification was enqueued
+            delivered.append(notification)
+            continue
+
+        messages.append((notification, _build_message(notification)))
+
+    if messages:
+        try:
+            batch_response = transport.send_each(
+                [message for _, message in messages]
+            )
+        except Exception as e:
+            logger.exception(f'Delivery of {len(messages)} messages failed')
+            failed = [(notification, e) for notification, _ in messages]
+        else:
+            responses = zip(messages, batch_response.responses)
+            for (notification, message), response in responses:
+                if response.success:
+                    delivered.append(notification)
+                elif isinstance(response.exception, INVALID_TOKEN_ERRORS):
+                    delivered.append(notification)
+                    invalid_tokens.append(message.token)
+                else:
+                    failed.append((notification, response.exception))
+
+    if delivered:
+        PushNotification.objects.filter(
+            id__in=[notification.id for notification in delivered]
+        ).delete()
+
+    if invalid_tokens:
+        erase_fcm_tokens(invalid_tokens)
+
+    if failed:
+        _schedule_retries(failed)
+
+
+def _build_message(notification):
+    msg_data = {
+        'notification': messaging.Notification(
+            title=notification.title,
+            body=notification.body,
+        ),
+    }
+
+    if notification.recipient:
+        msg_data['token'] = notification.recipient.fcm_token
+    else:
+        msg_data['condition'] = notification.condition
+
+    if notification.data:
+        msg_data['data'] = notification.data
+
+    if notification.collapse_key:
+        msg_data['android'] = messaging.AndroidConfig(
+            collapse_key=notification.collapse_key
+        )
+        msg_data['apns'] = messaging.APNSConfig(
+            headers={'apns-collapse-id': notification.collapse_key}
+        )
+
+    return messaging.Message(**msg_data)
+
+
+def _schedule_retries(failed):
+    now = timezone.now()
+
+    notifications = []
+    for notification, error in failed:
+        notification.attempts += 1
+        notification.last_error = str(error)
+
+        if notification.attempts >= MAX_ATTEMPTS:
+            notification.failed_at = now
+            logger.error(
+                f'Push notification {notification.id} has failed: {error}'
+            )
+        else:
+            delay = RETRY_DELAY * 2 ** (notification.attempts - 1)
+            notification.available_at = now + delay
+
+        notifications.append(notification)
+
+    PushNotification.objects.bulk_update(
+        notifications,
+        ['attempts', 'last_error', 'failed_at', 'available_at'],
+    )
+
+
+def _deliver_on_commit():
+    if settings.PUSH_OUTBOX_DELIVER_ON_COMMIT:
+        dispatch(deliver_notifications)
@@ -0,0 +1,105 @@
+import pickle
+import threading
+import time
+
+from collections import OrderedDict
+
+from django.conf import settings
+
+from apps.core.generations import (
+    get_current,
+    invalidate_generations,
+    set_current,
+)
+from apps.users.models import User
+
+LOCAL_SIZE = 4096
+LOCAL_TIMEOUT = 10
+SHARED_TIMEOUT = 5 * 60
+
+
+class LocalCache:
+    """
+    Thread-safe LRU cache of the process, entries expire after timeout.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache(LOCAL_SIZE, LOCAL_TIMEOUT)
+
+
+def get_principal_key(user_id):
+    return f'principal-{user_id}'
+
+
+def get_principal(user_id):
+    """
+    Returns the user with the profile, or None if there is no such user.
+    Users are cached pickled in the process for LOCAL_TIMEOUT, which is
+    how long other processes can lag behind a change, and in the cache.
+    """
+    if not settings.PRINCIPALS_CACHE:
+        return _load_principal(user_id)
+
+    key = get_principal_key(user_id)
+
+    pickled = local_cache.get(key)
+    if pickled is None:
+        pickled, generation = get_current(key)
+        if pickled is None:
+            user = _load_principal(user_id)
+            if user is None:
+                return None
+
+            pickled = pickle.dumps(user)
+            set_current(key, pickled, generation, SHARED_TIMEOUT)
+
+        local_cache.set(key, pickled)
+
+    return pickle.loads(pickled)
+
+
+def invalidate_principals(*user_ids):
+    keys = [get_principal_key(user_id) for user_id in user_ids]
+
+    local_cache.delete_many(keys)
+    invalidate_generations(*keys)
+
+
+def _load_principal(user_id):
+    return User.objects.select_related('profile').filter(id=user_id).first()
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from apps.auth0.middleware import JWTAuthMiddleware
+from apps.users.consumers import ProfileEventsConsumer
+
+http_urlpatterns = [
+    path('events/', JWTAuthMiddleware(ProfileEventsConsumer.as_asgi())),
+]
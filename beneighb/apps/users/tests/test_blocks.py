@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.users.blocks import get_block_sets, get_excluded_ids, is_blocked
+from apps.users.factories import ProfileFactory
+from apps.users.models import Block
+
+
+class BlockGraphTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+        super().tearDown()
+
+    def test_is_blocked_in_both_directions(self):
+        blocking_profile = ProfileFactory()
+        blocked_profile = ProfileFactory()
+        other_profile = ProfileFactory()
+
+        Block.objects.create(
+            blocking_profile=blocking_profile, blocked_profile=blocked_profile
+        )
+
+        self.assertTrue(is_blocked(blocking_profile.id, blocked_profile.id))
+        self.assertTrue(is_blocked(blocked_profile.id, blocking_profile.id))
+        self.assertFalse(is_blocked(blocking_profile.id, other_profile.id))
+
+    def test_block_sets(self):
+        profile = ProfileFactory()
+        blocked_profile = ProfileFactory()
+        blocking_profile = ProfileFactory()
+
+        Block.objects.create(
+            blocking_profile=profile, blocked_profile=blocked_profile
+        )
+        Block.objects.create(
+            blocking_profile=blocking_profile, blocked_profile=profile
+        )
+
+        block_sets = get_block_sets(profile.id)
+        self.assertEqual(block_sets.blocked, {blocked_profile.id})
+        self.assertEqual(block_sets.blocking, {blocking_profile.id})
+        self.assertEqual(
+            get_excluded_ids(profile.id),
+            {blocked_profile.id, blocking_profile.id},
+        )
+
+    def test_cached_check_doesnt_query_database(self):
+        profile = ProfileFactory()
+        other_profile = ProfileFactory()
+
+        with self.assertNumQueries(1):
+            is_blocked(profile.id, other_profile.id)
+
+        with self.assertNumQueries(0):
+            is_blocked(profile.id, other_profile.id)
+
+    def test_cache_is_invalidated_on_block_changes(self):
+        profile = ProfileFactory()
+        other_profile = ProfileFactory()
+
+        self.assertFalse(is_blocked(profile.id, other_profile.id))
+        self.assertFalse(is_blocked(other_profile.id, profile.id))
+
+        block = Block.objects.create(
+            blocking_profile=profile, blocked_profile=other_profile
+        )
+        self.assertTrue(is_blocked(profile.id, other_profile.id))
+        self.assertTrue(is_blocked(other_profile.id, profile.id))
+
+        block.delete()
+        self.assertFalse(is_blocked(profile.id, other_profile.id))
+        self.assertFalse(is_blocked(other_profile.id, profile.id))
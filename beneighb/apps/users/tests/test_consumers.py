@@ -0,0 +1,99 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import ApplicationCommunicator
+from django.test import TransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.marketplace.factories import TaskFactory
+from apps.users.factories import UserWithProfileFactory
+from apps.users.tests.utils import get_client_with_valid_token
+from beneighb.asgi import application
+
+
+# Consumers query the database from other threads, so the data
+# have to be committed instead of living in a test case transaction
+@mock.patch('apps.marketplace.views.offer.enqueue_push_notification')
+class ProfileEventsConsumerTestCase(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.owner = UserWithProfileFactory()
+        self.helper = UserWithProfileFactory()
+        self.task = TaskFactory(owner=self.owner.profile)
+        self.helper.profile.services.add(self.task.service)
+
+    def get_scope(self, query_string=b'', headers=()):
+        return {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'path': '/events/',
+            'query_string': query_string,
+            'headers': list(headers),
+        }
+
+    def get_token(self, user):
+        return str(RefreshToken.for_user(user).access_token)
+
+    def open_stream(self, scope):
+        async def open():
+            # Has to be created in the event loop of the test
+            communicator = ApplicationCommunicator(application, scope)
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output()
+            body = await communicator.receive_output()
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait()
+            return start, body
+
+        return async_to_sync(open)()
+
+    def test_rejects_without_token(self, _mocked_enqueue):
+        start, body = self.open_stream(self.get_scope())
+
+        self.assertEqual(start['status'], 401)
+        self.assertEqual(body['body'], b'{"detail": "Invalid token"}')
+
+    def test_accepts_token_in_header(self, _mocked_enqueue):
+        header = f'Bearer {self.get_token(self.owner)}'.encode()
+        scope = self.get_scope(headers=[(b'authorization', header)])
+
+        start, body = self.open_stream(scope)
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'Content-Type', b'text/event-stream'), start['headers']
+        )
+        self.assertEqual(body['body'], b': connected\n\n')
+        self.assertTrue(body['more_body'])
+
+    def test_streams_new_offer_to_task_owner(self, _mocked_enqueue):
+        query_string = f'token={self.get_token(self.owner)}'.encode()
+        scope = self.get_scope(query_string=query_string)
+        client = get_client_with_valid_token(self.helper)
+
+        async def create_offer():
+            communicator = ApplicationCommunicator(application, scope)
+            await communicator.send_input({'type': 'http.request'})
+            await communicator.receive_output()
+            await communicator.receive_output()
+
+            response = await sync_to_async(client.post)(
+                '/marketplace/offers/', {'task': self.task.id}
+            )
+
+            event = await communicator.receive_output()
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait()
+            return response, event
+
+        response, event = async_to_sync(create_offer)()
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(
+            event['body'],
+            b'event: new_offer\n'
+            b'data: {"type": "new_offer", '
+            b'"task_id": "' + str(self.task.id).encode() + b'"}\n\n',
+        )
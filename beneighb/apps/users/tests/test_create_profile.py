@@ -1,5 +1,6 @@
 from copy import deepcopy
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -9,7 +10,11 @@ from apps.marketplace.factories import ServiceFactory
 from apps.marketplace.models import Service
 
 from apps.users.models import Profile, User
-from apps.users.factories import UserWithVerifiedEmailFactory
+from apps.users.factories import (
+    ProfileFactory,
+    UserWithVerifiedEmailFactory,
+)
+from apps.users.principals import get_principal, local_cache
 from apps.users.tests.utils import get_client_with_valid_token
 
 
@@ -139,6 +144,45 @@ class CreateProfileTestCase(TestCase):
         response = client.post(self.url, self.correct_data)
         self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
 
+    @override_settings(PRINCIPALS_CACHE=1)
+    def test_doesnt_overwrite_user_with_cached_one(self):
+        cache.clear()
+        self.addCleanup(local_cache.clear)
+
+        user = UserWithVerifiedEmailFactory()
+        get_principal(user.id)
+        # Changed by another process, the cached user is not dropped yet
+        User.objects.filter(id=user.id).update(
+            password='changed', is_active=False
+        )
+        # Created in the meantime, the cached user has no profile
+        user.profile = ProfileFactory(user=None)
+        User.objects.filter(id=user.id).update(profile=user.profile)
+
+        client = get_client_with_valid_token(user)
+        response = client.post(self.url, self.correct_data)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        user.refresh_from_db()
+        self.assertEqual(user.password, 'changed')
+        self.assertFalse(user.is_active)
+
+    def test_create_profile_invalidates_cached_user(self):
+        user = UserWithVerifiedEmailFactory()
+        client = get_client_with_valid_token(user)
+
+        with override_settings(PRINCIPALS_CACHE=1):
+            cache.clear()
+            self.addCleanup(local_cache.clear)
+            get_principal(user.id)
+
+            response = client.post(self.url, self.correct_data)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            self.assertEqual(
+                get_principal(user.id).profile_id, response.data['id']
+            )
+
     def test_create_profile_without_any_data(self):
         data = {}
 
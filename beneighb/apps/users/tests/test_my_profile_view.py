@@ -1,4 +1,5 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -8,6 +9,8 @@ from apps.users.factories import (
     UserWithVerifiedEmailFactory,
 )
 from apps.marketplace.factories import ServiceFactory
+from apps.users.models import Profile
+from apps.users.principals import get_principal, local_cache
 from apps.users.tests.utils import get_client_with_valid_token
 
 
@@ -133,3 +136,24 @@ class MyProfileViewUpdateTestCase(TestCase):
 
         another_user.refresh_from_db()
         self.assertEqual(another_user.profile.fcm_token, '')
+
+    @override_settings(PRINCIPALS_CACHE=1)
+    def test_doesnt_overwrite_profile_with_cached_one(self):
+        cache.clear()
+        self.addCleanup(local_cache.clear)
+
+        user = UserWithProfileFactory(profile__name='Cached')
+        get_principal(user.id)
+        # Changed by another process, the cached user is not dropped yet
+        Profile.objects.filter(id=user.profile.id).update(name='Changed')
+
+        client = get_client_with_valid_token(user)
+
+        data = {'fcm_token': 'test_token'}
+        response = client.patch(self.url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Changed')
+
+        user.profile.refresh_from_db()
+        self.assertEqual(user.profile.name, 'Changed')
+        self.assertEqual(user.profile.fcm_token, data['fcm_token'])
@@ -2,19 +2,17 @@ from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
 from apps.marketplace.factories import ServiceFactory
+from apps.marketplace.models import Task
 from apps.users.factories import UserWithProfileFactory
+from apps.users.notifications import erase_fcm_tokens
 from apps.users.tests.utils import get_client_with_valid_token
 
 from django.core.cache import cache
-from django.test import TestCase
-
-from firebase_admin._messaging_utils import (
-    SenderIdMismatchError,
-    UnregisteredError,
-)
+from django.test import TestCase, override_settings
 from requests.exceptions import HTTPError
 
 
+@override_settings(BACKGROUND_JOBS_SYNC=True)
 class NotificationsTestCase(TestCase):
     url = '/marketplace/tasks/'
 
@@ -43,61 +41,64 @@ class NotificationsTestCase(TestCase):
 
         client = get_client_with_valid_token(user)
 
-        return client.post(self.url, self.correct_data)
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.post(self.url, self.correct_data)
 
     def tearDown(self):
         cache.clear()
         super().tearDown()
 
-    @patch('apps.users.notifications.messaging.send')
-    def test_send_push_notification_unregistered_error_erases_fcm_tokens(
-        self, mock_send
-    ):
-        mock_send.side_effect = UnregisteredError(
-            'Device token is unregistered'
+    @patch('apps.users.notifications.messaging.send_each')
+    def test_broadcast_is_sent_to_topic_condition(self, mock_send_each):
+        response = self.send_notification()
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(mock_send_each.call_count, 1)
+        [message] = mock_send_each.call_args.args[0]
+        self.assertIsNone(message.token)
+        self.assertEqual(
+            message.condition,
+            "'city-Dusseldorf' in topics && "
+            f"!('profile-{Task.objects.get().owner_id}' in topics)",
         )
 
-        recipient = UserWithProfileFactory()
-        recipient.profile.fcm_token = 'incorrect token'
-        recipient.profile.save()
-
-        user = UserWithProfileFactory()
-
-        self.send_notification()
-
-        self.assertEqual(user.profile.fcm_token, '')
-
-    @patch('apps.users.notifications.messaging.send')
-    def test_send_push_notification_httperror_erases_fcm_tokens(
-        self, mock_send
-    ):
-        mock_send.side_effect = HTTPError(
+    @patch('apps.users.notifications.messaging.send_each')
+    def test_broadcast_httperror_keeps_fcm_tokens(self, mock_send_each):
+        mock_send_each.side_effect = HTTPError(
             '403 Client Error: Forbidden for url: '
             'https://fcm.googleapis.com/v1/projects/benehighb/messages:send'
         )
 
         recipient = UserWithProfileFactory()
-        recipient.profile.fcm_token = 'incorrect token'
+        recipient.profile.fcm_token = 'correct token'
         recipient.profile.save()
 
-        user = UserWithProfileFactory()
+        response = self.send_notification()
+        self.assertEqual(response.status_code, 201)
 
-        self.send_notification()
+        recipient.profile.refresh_from_db()
+        self.assertEqual(recipient.profile.fcm_token, 'correct token')
 
-        self.assertEqual(user.profile.fcm_token, '')
 
-    @patch('apps.users.notifications.messaging.send')
-    def test_send_push_notification_httperror_sender_id_mismatch_fcm_tokens(
-        self, mock_send
-    ):
-        mock_send.side_effect = SenderIdMismatchError('SenderId mismatch')
+class EraseFcmTokensTestCase(TestCase):
+    def test_erases_tokens_with_one_update(self):
+        valid = UserWithProfileFactory(profile__fcm_token='valid').profile
+        unregistered = UserWithProfileFactory(
+            profile__fcm_token='unregistered'
+        ).profile
+        mismatched = UserWithProfileFactory(
+            profile__fcm_token='mismatched'
+        ).profile
 
-        recipient = UserWithProfileFactory()
-        recipient.profile.fcm_token = 'incorrect token'
-        recipient.profile.save()
+        # The users of the profiles are read to drop them from the cache
+        with self.assertNumQueries(2):
+            erased = erase_fcm_tokens(['unregistered', 'mismatched'])
 
-        user = UserWithProfileFactory()
+        self.assertEqual(erased, 2)
 
-        self.send_notification()
+        for profile in (valid, unregistered, mismatched):
+            profile.refresh_from_db()
 
-        self.assertEqual(user.profile.fcm_token, '')
+        self.assertEqual(valid.fcm_token, 'valid')
+        self.assertEqual(unregistered.fcm_token, '')
+        self.assertEqual(mismatched.fcm_token, '')
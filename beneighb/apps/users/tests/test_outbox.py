@@ -0,0 +1,309 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from apps.users.factories import UserWithProfileFactory
+from apps.users.models import PushNotification
+from apps.users.notifications import FakeTransport
+from apps.users.outbox import (
+    MAX_ATTEMPTS,
+    deliver_notifications,
+    enqueue_collapsible_push_notification,
+    enqueue_conditional_push_notification,
+    enqueue_push_notification,
+)
+from apps.users.principals import get_principal, local_cache
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.transport = FakeTransport()
+        patcher = patch(
+            'apps.users.outbox.get_transport', return_value=self.transport
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enqueue_skips_recipient_without_token(self):
+        profile = UserWithProfileFactory().profile
+
+        enqueue_push_notification(profile, 'Some text')
+
+        self.assertEqual(PushNotification.objects.count(), 0)
+
+    def test_notification_is_rolled_back_with_transaction(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue_push_notification(profile, 'Some text')
+                raise RuntimeError()
+
+        self.assertEqual(PushNotification.objects.count(), 0)
+
+    def test_delivers_batch_with_request_per_notification(self):
+        for i in range(2):
+            profile = UserWithProfileFactory(
+                profile__fcm_token=f'token-{i}'
+            ).profile
+            enqueue_push_notification(
+                profile, 'Some text', data={'type': 'new_message'}
+            )
+        enqueue_conditional_push_notification(
+            "'city-Berlin' in topics", 'Some text'
+        )
+
+        with patch.object(
+            self.transport, 'send_each', wraps=self.transport.send_each
+        ) as mocked_send_each:
+            self.assertEqual(deliver_notifications(), 3)
+
+        self.assertEqual(mocked_send_each.call_count, 1)
+        self.assertEqual(self.transport.requests_count, 3)
+        self.assertEqual(PushNotification.objects.count(), 0)
+        self.assertEqual(deliver_notifications(), 0)
+
+    def test_delivers_with_given_transport(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+        enqueue_push_notification(profile, 'Some text')
+
+        transport = FakeTransport()
+        self.assertEqual(deliver_notifications(transport=transport), 1)
+
+        self.assertEqual(transport.requests_count, 1)
+        self.assertEqual(self.transport.requests_count, 0)
+
+    def test_invalid_token_is_erased_and_not_retried(self):
+        profile = UserWithProfileFactory(
+            profile__fcm_token='invalid-token'
+        ).profile
+        enqueue_push_notification(profile, 'Some text')
+
+        deliver_notifications()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.fcm_token, '')
+        self.assertEqual(PushNotification.objects.count(), 0)
+
+    @override_settings(PRINCIPALS_CACHE=1)
+    def test_invalid_token_is_erased_from_cached_user(self):
+        self.addCleanup(local_cache.clear)
+        user = UserWithProfileFactory(profile__fcm_token='invalid-token')
+        get_principal(user.id)
+        enqueue_push_notification(user.profile, 'Some text')
+
+        deliver_notifications()
+
+        self.assertEqual(get_principal(user.id).profile.fcm_token, '')
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        enqueue_conditional_push_notification(
+            "'city-Berlin' in topics", 'Some text'
+        )
+
+        with patch.object(
+            self.transport, 'send_each', side_effect=Exception('Timeout')
+        ):
+            self.assertEqual(deliver_notifications(), 1)
+
+        notification = PushNotification.objects.get()
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(notification.last_error, 'Timeout')
+        self.assertIsNone(notification.failed_at)
+        self.assertGreater(notification.available_at, timezone.now())
+
+        # Not due until the backoff is over
+        self.assertEqual(deliver_notifications(), 0)
+
+        PushNotification.objects.update(available_at=timezone.now())
+        self.assertEqual(deliver_notifications(), 1)
+        self.assertEqual(PushNotification.objects.count(), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        enqueue_conditional_push_notification(
+            "'city-Berlin' in topics", 'Some text'
+        )
+        PushNotification.objects.update(attempts=MAX_ATTEMPTS - 1)
+
+        with patch.object(
+            self.transport, 'send_each', side_effect=Exception('Timeout')
+        ):
+            deliver_notifications()
+
+        notification = PushNotification.objects.get()
+        self.assertEqual(notification.attempts, MAX_ATTEMPTS)
+        self.assertIsNotNone(notification.failed_at)
+        self.assertEqual(deliver_notifications(), 0)
+
+    @override_settings(
+        BACKGROUND_JOBS_SYNC=True, PUSH_OUTBOX_DELIVER_ON_COMMIT=True
+    )
+    def test_delivers_on_commit(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_push_notification(profile, 'Some text')
+
+            self.assertEqual(PushNotification.objects.count(), 1)
+            self.assertEqual(self.transport.requests_count, 0)
+
+        self.assertEqual(PushNotification.objects.count(), 0)
+        self.assertEqual(self.transport.requests_count, 1)
+
+    # Would close the connection of the test case transaction
+    @patch(
+        'apps.users.management.commands.deliver_notifications'
+        '.close_old_connections'
+    )
+    def test_command_delivers_all_due_notifications(self, _mocked_close):
+        for i in range(3):
+            enqueue_conditional_push_notification(
+                f"'city-{i}' in topics", 'Some text'
+            )
+
+        with patch.object(
+            self.transport, 'send_each', wraps=self.transport.send_each
+        ) as mocked_send_each:
+            call_command(
+                'deliver_notifications',
+                '--once',
+                batch_size=2,
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(mocked_send_each.call_count, 2)
+        self.assertEqual(self.transport.requests_count, 3)
+        self.assertEqual(PushNotification.objects.count(), 0)
+
+
+class CollapsibleOutboxTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.transport = FakeTransport()
+        patcher = patch(
+            'apps.users.outbox.get_transport', return_value=self.transport
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, recipient, body, collapse_key='chat-1', count=1):
+        enqueue_collapsible_push_notification(
+            recipient,
+            body,
+            collapse_key=collapse_key,
+            coalesced_body='{count} new messages',
+            window=timedelta(seconds=5),
+            count=count,
+        )
+
+    @override_settings(
+        BACKGROUND_JOBS_SYNC=True, PUSH_OUTBOX_DELIVER_ON_COMMIT=True
+    )
+    def test_sends_first_notification_right_away(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enqueue(profile, 'Hi')
+
+        self.assertEqual(self.transport.requests_count, 1)
+        self.assertEqual(PushNotification.objects.count(), 0)
+
+    def test_waits_for_the_window_after_first_notification(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+
+        before_first = timezone.now()
+        self.enqueue(profile, 'Hi')
+        after_first = timezone.now()
+        self.assertEqual(deliver_notifications(), 1)
+
+        self.enqueue(profile, 'Are you there?')
+        self.assertEqual(deliver_notifications(), 0)
+
+        notification = PushNotification.objects.get()
+        self.assertEqual(notification.body, 'Are you there?')
+        # At the end of the window started by the first one
+        window = timedelta(seconds=5)
+        self.assertGreaterEqual(
+            notification.available_at, before_first + window
+        )
+        self.assertLessEqual(notification.available_at, after_first + window)
+
+        PushNotification.objects.update(available_at=timezone.now())
+        self.assertEqual(deliver_notifications(), 1)
+
+        # The window is per recipient and collapse key
+        other = UserWithProfileFactory(profile__fcm_token='other').profile
+        self.enqueue(other, 'Hi')
+        self.enqueue(profile, 'Hi', collapse_key='chat-2')
+        self.assertEqual(deliver_notifications(), 2)
+
+    def test_coalesces_notifications_in_the_window(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+        other = UserWithProfileFactory(profile__fcm_token='other').profile
+
+        for text in ('Hi', 'Are you there?', 'Hello?'):
+            self.enqueue(profile, text)
+        self.enqueue(profile, 'Other chat', collapse_key='chat-2')
+        self.enqueue(other, 'Other recipient')
+
+        self.assertEqual(PushNotification.objects.count(), 3)
+
+        notification = PushNotification.objects.get(
+            recipient=profile, collapse_key='chat-1'
+        )
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(notification.body, '3 new messages')
+
+        PushNotification.objects.update(available_at=timezone.now())
+        with patch.object(
+            self.transport, 'send_each', wraps=self.transport.send_each
+        ) as mocked_send_each:
+            deliver_notifications()
+
+        messages = mocked_send_each.call_args.args[0]
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(messages[0].android.collapse_key, 'chat-1')
+        self.assertEqual(
+            messages[0].apns.headers, {'apns-collapse-id': 'chat-1'}
+        )
+
+    def test_coalesces_several_notifications_at_once(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+
+        self.enqueue(profile, 'Hello?', count=2)
+
+        notification = PushNotification.objects.get()
+        self.assertEqual(notification.count, 2)
+        self.assertEqual(notification.body, '2 new messages')
+
+        self.enqueue(profile, 'Hello?', count=2)
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.count, 4)
+        self.assertEqual(notification.body, '4 new messages')
+
+    def test_starts_new_window_after_the_former(self):
+        profile = UserWithProfileFactory(profile__fcm_token='token').profile
+
+        self.enqueue(profile, 'Hi')
+        deliver_notifications()
+
+        cache.clear()
+        self.enqueue(profile, 'Are you there?')
+
+        notification = PushNotification.objects.get()
+        self.assertEqual(notification.count, 1)
+        self.assertEqual(notification.body, 'Are you there?')
+        self.assertLessEqual(notification.available_at, timezone.now())
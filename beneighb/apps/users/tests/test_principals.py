@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.core.generations import get_current
+from apps.users.factories import UserWithProfileFactory
+from apps.users.principals import (
+    LocalCache,
+    get_principal,
+    get_principal_key,
+    local_cache,
+)
+
+
+@override_settings(PRINCIPALS_CACHE=1)
+class PrincipalsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        cache.clear()
+        local_cache.clear()
+        self.addCleanup(local_cache.clear)
+
+        self.user = UserWithProfileFactory()
+
+    def test_loads_user_with_profile_once(self):
+        with self.assertNumQueries(1):
+            user = get_principal(self.user.id)
+            self.assertEqual(user.profile, self.user.profile)
+
+        with self.assertNumQueries(0):
+            user = get_principal(self.user.id)
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.profile, self.user.profile)
+
+    def test_returns_none_for_non_existing_user(self):
+        self.assertIsNone(get_principal(self.user.id + 1000))
+
+    def test_returns_copies(self):
+        first = get_principal(self.user.id)
+        first.profile.name = 'Changed'
+
+        second = get_principal(self.user.id)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.profile.name, self.user.profile.name)
+
+    def test_falls_back_to_shared_cache(self):
+        get_principal(self.user.id)
+        local_cache.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_principal(self.user.id), self.user)
+
+        # Warmed up again from the shared cache
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_principal(self.user.id), self.user)
+
+    def test_invalidated_on_user_save(self):
+        get_principal(self.user.id)
+
+        self.user.first_name = 'Changed'
+        self.user.save()
+
+        key = get_principal_key(self.user.id)
+        self.assertIsNone(local_cache.get(key))
+        self.assertIsNone(get_current(key)[0])
+        self.assertEqual(get_principal(self.user.id).first_name, 'Changed')
+
+    def test_invalidated_on_profile_save(self):
+        get_principal(self.user.id)
+
+        profile = self.user.profile
+        profile.name = 'Changed'
+        profile.save()
+
+        self.assertEqual(get_principal(self.user.id).profile.name, 'Changed')
+
+    def test_invalidated_on_user_delete(self):
+        get_principal(self.user.id)
+
+        self.user.profile.delete()
+
+        self.assertIsNone(get_principal(self.user.id))
+
+    @override_settings(PRINCIPALS_CACHE=0)
+    def test_disabled(self):
+        get_principal(self.user.id)
+
+        with self.assertNumQueries(1):
+            get_principal(self.user.id)
+
+
+class LocalCacheTestCase(TestCase):
+    def test_evicts_least_recently_used_entries(self):
+        local = LocalCache(size=2, timeout=10)
+
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+
+        self.assertEqual(local.get('a'), 1)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(local.get('c'), 3)
+
+    def test_expires_entries(self):
+        local = LocalCache(size=2, timeout=10)
+
+        with mock.patch('apps.users.principals.time.monotonic') as monotonic:
+            monotonic.return_value = 100
+            local.set('a', 1)
+
+            monotonic.return_value = 109
+            self.assertEqual(local.get('a'), 1)
+
+            monotonic.return_value = 110
+            self.assertIsNone(local.get('a'))
@@ -0,0 +1,169 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from apps.marketplace.factories import ServiceFactory
+from apps.users.factories import UserFactory, UserWithProfileFactory
+from apps.users.notifications import FakeTransport
+from apps.users.tests.utils import get_client_with_valid_token
+from apps.users.topics import get_broadcast_condition
+
+
+@override_settings(BACKGROUND_JOBS_SYNC=True)
+class TopicSubscriptionsTestCase(TestCase):
+    url = '/users/profile/'
+
+    def setUp(self):
+        super().setUp()
+
+        self.transport = FakeTransport()
+        patcher = patch(
+            'apps.users.topics.get_transport', return_value=self.transport
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_subscriptions(self):
+        return {
+            topic: tokens
+            for topic, tokens in self.transport.subscriptions.items()
+            if tokens
+        }
+
+    def get_common_subscriptions(self, user, token):
+        return {
+            'all': {token},
+            f'profile-{user.profile.id}': {token},
+        }
+
+    def patch_profile(self, user, data):
+        client = get_client_with_valid_token(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.patch(self.url, data)
+
+    def put_profile(self, user, data):
+        client = get_client_with_valid_token(user)
+
+        profile_data = {
+            'name': user.profile.name,
+            'age_above_18': True,
+            'agreed_with_conditions': True,
+            'gender': user.profile.gender,
+            'speaking_languages': user.profile.speaking_languages,
+            'city': user.profile.city,
+        }
+        profile_data.update(data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return client.put(self.url, profile_data)
+
+    def test_setting_fcm_token_subscribes_to_city_and_services(self):
+        service = ServiceFactory()
+        user = UserWithProfileFactory()
+
+        response = self.patch_profile(
+            user, {'fcm_token': 'token', 'services': [service.id]}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            self.get_subscriptions(),
+            {
+                **self.get_common_subscriptions(user, 'token'),
+                'city-Dusseldorf': {'token'},
+                f'service-{service.id}': {'token'},
+            },
+        )
+
+    def test_new_fcm_token_replaces_old_one(self):
+        user = UserWithProfileFactory()
+
+        self.patch_profile(user, {'fcm_token': 'old-token'})
+        self.patch_profile(user, {'fcm_token': 'new-token'})
+
+        self.assertEqual(
+            self.get_subscriptions(),
+            {
+                **self.get_common_subscriptions(user, 'new-token'),
+                'city-Dusseldorf': {'new-token'},
+            },
+        )
+
+    def test_changing_city_moves_subscription(self):
+        user = UserWithProfileFactory()
+        self.patch_profile(user, {'fcm_token': 'token'})
+
+        response = self.put_profile(user, {'city': 'Berlin'})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            self.get_subscriptions(),
+            {
+                **self.get_common_subscriptions(user, 'token'),
+                'city-Berlin': {'token'},
+            },
+        )
+
+    def test_profile_without_city_is_subscribed_to_no_city_topic(self):
+        user = UserWithProfileFactory(profile__city='')
+
+        self.patch_profile(user, {'fcm_token': 'token'})
+
+        self.assertEqual(
+            self.get_subscriptions(),
+            {
+                **self.get_common_subscriptions(user, 'token'),
+                'city-none': {'token'},
+            },
+        )
+
+    def test_removing_service_unsubscribes(self):
+        service_1 = ServiceFactory()
+        service_2 = ServiceFactory()
+        user = UserWithProfileFactory()
+        self.patch_profile(
+            user,
+            {'fcm_token': 'token', 'services': [service_1.id, service_2.id]},
+        )
+
+        self.patch_profile(
+            user, {'fcm_token': 'token', 'services': [service_2.id]}
+        )
+
+        self.assertEqual(
+            self.get_subscriptions(),
+            {
+                **self.get_common_subscriptions(user, 'token'),
+                'city-Dusseldorf': {'token'},
+                f'service-{service_2.id}': {'token'},
+            },
+        )
+
+    def test_profile_without_token_is_not_subscribed(self):
+        user = UserFactory(profile=None)
+        client = get_client_with_valid_token(user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(
+                '/users/create-profile/',
+                {
+                    'name': 'Name',
+                    'age_above_18': True,
+                    'agreed_with_conditions': True,
+                    'gender': 'female',
+                    'speaking_languages': ['uk'],
+                    'city': 'Berlin',
+                },
+            )
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.get_subscriptions(), {})
+        self.assertEqual(self.transport.requests_count, 0)
+
+
+class BroadcastConditionTestCase(TestCase):
+    def test_excludes_personal_topic(self):
+        self.assertEqual(
+            get_broadcast_condition('city-Berlin', 42),
+            "'city-Berlin' in topics && !('profile-42' in topics)",
+        )
@@ -0,0 +1,96 @@
+import logging
+import re
+
+from apps.users.notifications import get_transport
+
+logger = logging.getLogger(__name__)
+
+# FCM accepts up to 1000 tokens in one (un)subscribe request
+TOPIC_MANAGEMENT_BATCH_SIZE = 1000
+
+ALL_TOPIC = 'all'
+# Topic of the profiles without a city
+NO_CITY_TOPIC = 'city-none'
+
+
+def get_city_topic(city):
+    if not city:
+        return NO_CITY_TOPIC
+    return 'city-' + re.sub(r'[^a-zA-Z0-9-_.~%]', '_', city)
+
+
+def get_personal_topic(profile_id):
+    return f'profile-{profile_id}'
+
+
+def get_service_topic(service_id):
+    return f'service-{service_id}'
+
+
+def get_profile_topics(profile):
+    """
+    Returns the topics of the segments of the profile, so a broadcast
+    to a segment is a single FCM request, and its personal topic.
+    """
+    topics = {
+        get_service_topic(service_id)
+        for service_id in profile.services.values_list('id', flat=True)
+    }
+    topics.add(ALL_TOPIC)
+    topics.add(get_city_topic(profile.city))
+    topics.add(get_personal_topic(profile.id))
+
+    return topics
+
+
+def get_broadcast_condition(topic, excluded_profile_id):
+    """
+    Returns FCM condition matching the devices subscribed to the topic,
+    except for the device of the excluded profile.
+    """
+    excluded_topic = get_personal_topic(excluded_profile_id)
+    return f"'{topic}' in topics && !('{excluded_topic}' in topics)"
+
+
+def sync_topic_subscriptions(old_token, old_topics, new_token, new_topics):
+    """
+    Moves device subscriptions from the old token and topics of a profile
+    to the new ones.
+    """
+    if old_token == new_token:
+        if not new_token:
+            return
+
+        unsubscribe = {new_token: old_topics - new_topics}
+        subscribe = {new_token: new_topics - old_topics}
+    else:
+        unsubscribe = {old_token: old_topics} if old_token else {}
+        subscribe = {new_token: new_topics} if new_token else {}
+
+    transport = get_transport()
+    for token, topics in unsubscribe.items():
+        for topic in topics:
+            _manage_topic(transport.unsubscribe_from_topic, [token], topic)
+
+    for token, topics in subscribe.items():
+        for topic in topics:
+            _manage_topic(transport.subscribe_to_topic, [token], topic)
+
+
+def subscribe_to_topic(tokens, topic):
+    transport = get_transport()
+    batch_size = TOPIC_MANAGEMENT_BATCH_SIZE
+    for start in range(0, len(tokens), batch_size):
+        batch_tokens = tokens[start : start + batch_size]  # noqa
+        _manage_topic(transport.subscribe_to_topic, batch_tokens, topic)
+
+
+def _manage_topic(method, tokens, topic):
+    try:
+        response = method(tokens, topic)
+    except Exception:
+        logger.exception(f'{method.__name__} {topic} has failed')
+        return
+
+    for error in response.errors:
+        logger.info(f'{method.__name__} {topic} error: {error.reason}')
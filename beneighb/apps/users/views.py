@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.db.models import Q
 from django.http.response import HttpResponseBadRequest, HttpResponse
 
@@ -8,12 +9,17 @@ from rest_framework.exceptions import APIException
 from rest_framework.response import Response
 
 from apps.chat.models import Chat
-from apps.users.models import Block, Profile
+from apps.core.dispatcher import dispatch
+from apps.marketplace.feed import invalidate_city_feeds
+from apps.users.blocks import get_block_sets
+from apps.users.models import Block, Profile, User
+from apps.users.principals import invalidate_principals
 from apps.users.serializers import (
     ProfileSerializer,
     ShortProfileSerializer,
     ProfileWithFcmTokenSerializer,
 )
+from apps.users.topics import get_profile_topics, sync_topic_subscriptions
 
 
 # TODO: Move to exceptions.py when we have more
@@ -53,13 +59,41 @@ class MyProfileView(generics.RetrieveUpdateAPIView):
         return ProfileSerializer
 
     def get_object(self):
-        user = self.request.user
-        if user.profile:
-            return user.profile
+        # The profile of the authenticated user can be cached, so the one
+        # being updated is read and locked again
+        profiles = Profile.objects.all()
+        if self.request.method in ['PUT', 'PATCH']:
+            profiles = profiles.select_for_update()
 
-        from django.http import Http404
+        try:
+            return profiles.get(user__id=self.request.user.id)
+        except Profile.DoesNotExist:
+            from django.http import Http404
+
+            raise Http404("User doesn't have a profile yet")
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        old_city = serializer.instance.city
+        old_token = serializer.instance.fcm_token
+        old_topics = get_profile_topics(serializer.instance)
+
+        profile = serializer.save()
 
-        raise Http404("User doesn't have a profile yet")
+        if profile.city != old_city:
+            # Offline tasks of the profile move to another city's feed
+            invalidate_city_feeds(old_city, profile.city)
+
+        dispatch(
+            sync_topic_subscriptions,
+            old_token,
+            old_topics,
+            profile.fcm_token,
+            get_profile_topics(profile),
+        )
 
 
 class ProfileCreateView(generics.CreateAPIView):
@@ -67,19 +101,32 @@ class ProfileCreateView(generics.CreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = ProfileSerializer
 
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        user = self.request.user
+        # The authenticated user can be cached, so it is read and locked
+        # again, and only its profile is written
+        user = User.objects.select_for_update().get(pk=self.request.user.pk)
 
-        if user.profile:
+        if user.profile_id is not None:
             raise UserProfileExistException(
                 'Profile for this user already exists'
             )
 
         profile = serializer.save()
-        profile.user = user
 
-        # Save the profile
-        user.save()
+        User.objects.filter(pk=user.pk).update(profile=profile)
+        invalidate_principals(user.pk)
+
+        dispatch(
+            sync_topic_subscriptions,
+            None,
+            set(),
+            profile.fcm_token,
+            get_profile_topics(profile),
+        )
 
 
 # TODO: Move to utils
@@ -99,11 +146,9 @@ class ProfileBlockView(generics.GenericAPIView):
         blocked_profile = profile
         blocking_profile = request.user.profile
 
-        exists = Block.objects.filter(
-            blocked_profile=blocked_profile, blocking_profile=blocking_profile
-        ).exists()
+        block_sets = get_block_sets(blocking_profile.id)
 
-        if exists:
+        if blocked_profile.id in block_sets.blocked:
             return HttpResponseConflict('You already blocked this user')
 
         Block.objects.create(
@@ -132,15 +177,8 @@ class ProfileBlockView(generics.GenericAPIView):
         blocking_profile.offers.filter(task__owner=blocked_profile).delete()
 
     def _delete_blocked_chats(self, blocking_profile, blocked_profile):
-        # TODO: Room to improvement performance
         chats_to_delete = Chat.objects.filter(
-            Q(
-                offer__helper=blocked_profile,
-                offer__task__owner=blocking_profile,
-            )
-            | Q(  # noqa - conflict with black
-                offer__helper=blocking_profile,
-                offer__task__owner=blocked_profile,
-            )
+            Q(helper=blocked_profile, owner=blocking_profile)
+            | Q(helper=blocking_profile, owner=blocked_profile)
         )
         chats_to_delete.delete()
@@ -3,6 +3,10 @@ ASGI config for beneighb project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+HTTP requests are handled by Django, except for the event streams
+of apps.users.routing, WebSocket connections by the consumers
+of apps.chat.routing.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +17,24 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "beneighb.settings")
 
-application = get_asgi_application()
+# Initialized before the imports below, as they import the models
+django_asgi_application = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from apps.auth0.middleware import JWTAuthMiddleware  # noqa: E402
+from django.urls import re_path  # noqa: E402
+
+from apps.chat.routing import websocket_urlpatterns  # noqa: E402
+from apps.users.routing import http_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter(
+    {
+        'http': URLRouter(
+            http_urlpatterns + [re_path(r'', django_asgi_application)]
+        ),
+        # Authenticated with a token instead of cookies, so cross-site
+        # connections are harmless and Origin is not validated
+        'websocket': JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+    }
+)
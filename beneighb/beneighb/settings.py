@@ -37,6 +37,7 @@ ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS').split(' ')
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sites',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'channels',
     'rest_framework',
     'rest_framework.authtoken',
     'allauth',
@@ -56,6 +58,7 @@ INSTALLED_APPS = [
     'apps.users',
     'apps.marketplace',
     'apps.chat',
+    'apps.core',
 ]
 
 if DEBUG:
@@ -152,6 +155,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'beneighb.wsgi.application'
+ASGI_APPLICATION = 'beneighb.asgi.application'
 
 
 # Database
@@ -186,7 +190,81 @@ if LOCAL:
         }
     }
 
-# IDEMPOTENCY_TIMEOUT
+# Authenticated users are cached in every process and in the cache,
+# see apps.users.principals. Off locally, where the cache is per process.
+PRINCIPALS_CACHE = int(
+    os.environ.get('PRINCIPALS_CACHE', default=0 if LOCAL else 1)
+)
+
+# Events to the connected clients are published to the channel layer,
+# or with Postgres NOTIFY to a listener in every process, which hands
+# them to its own in-memory channel layer, see apps.core.pubsub
+PUBSUB_BACKEND = os.environ.get(
+    'PUBSUB_BACKEND', 'apps.core.pubsub.ChannelLayerBackend'
+)
+
+# Task feeds are kept in sorted sets of Redis, shared by the processes,
+# or in the memory of the process locally, see apps.marketplace.feed
+FEED_BACKEND = os.environ.get(
+    'FEED_BACKEND',
+    default='apps.marketplace.feed.LocalFeedStore'
+    if LOCAL
+    else 'apps.marketplace.feed.RedisFeedStore',
+)
+FEED_REDIS_URL = 'redis://{}:{}/4'.format(REDIS_HOST, REDIS_PORT)
+
+# Buckets of the throttles are kept in Redis, shared by the processes,
+# or in the memory of the process locally, see apps.core.throttling
+THROTTLE_BACKEND = os.environ.get(
+    'THROTTLE_BACKEND',
+    default='apps.core.throttling.LocalTokenBucket'
+    if LOCAL
+    else 'apps.core.throttling.RedisTokenBucket',
+)
+THROTTLE_REDIS_URL = 'redis://{}:{}/3'.format(REDIS_HOST, REDIS_PORT)
+
+# Channel layer of the WebSocket consumers
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': ['redis://{}:{}/2'.format(REDIS_HOST, REDIS_PORT)],
+        },
+    }
+}
+
+if LOCAL or PUBSUB_BACKEND == 'apps.core.pubsub.PostgresBackend':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
+    }
+
+# Responses to requests with X-Idempotency-Key are replayed to retries
+# for this long, see apps.core.idempotency
+IDEMPOTENCY_TIMEOUT = int(
+    os.environ.get('IDEMPOTENCY_TIMEOUT', default=24 * 60 * 60)
+)
+
+# Background jobs (e.g. push broadcasts) run in a thread pool
+# of every worker process, see apps.core.dispatcher
+BACKGROUND_JOBS_WORKERS = int(
+    os.environ.get('BACKGROUND_JOBS_WORKERS', default=2)
+)
+BACKGROUND_JOBS_SYNC = int(os.environ.get('BACKGROUND_JOBS_SYNC', default=0))
+
+# Push notifications are stored in an outbox and delivered by
+# `manage.py deliver_notifications` workers, see apps.users.outbox.
+# With this setting the dispatcher also delivers them right after commit.
+PUSH_OUTBOX_DELIVER_ON_COMMIT = int(
+    os.environ.get('PUSH_OUTBOX_DELIVER_ON_COMMIT', default=1)
+)
+# The first message push of a recipient is sent right away, the ones
+# following it for this many seconds are sent as a single
+# "N new messages" push at the end
+CHAT_PUSH_COALESCING_WINDOW = int(
+    os.environ.get('CHAT_PUSH_COALESCING_WINDOW', default=5)
+)
 
 
 # Password validation
@@ -243,17 +321,32 @@ CSRF_TRUSTED_ORIGINS = [
 
 if DEBUG:
     DEFAULT_RENDERER_CLASSES = (
-        "rest_framework.renderers.JSONRenderer",
+        "apps.core.renderers.ORJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     )
 else:
-    DEFAULT_RENDERER_CLASSES = ("rest_framework.renderers.JSONRenderer",)
+    DEFAULT_RENDERER_CLASSES = ("apps.core.renderers.ORJSONRenderer",)
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': DEFAULT_RENDERER_CLASSES,
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.auth0.authentication.JWTAuthentication',
     ),
+    # Budgets of the write endpoints, see apps.core.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'task_create': '30/hour',
+        'offer_create': '60/hour',
+        'message_create': '60/min',
+        'token_obtain': '20/min',
+    },
+    # Clients are identified by the address added to X-Forwarded-For
+    # by nginx
+    'NUM_PROXIES': 1,
 }
 
 SIMPLE_JWT = {
@@ -278,4 +371,9 @@ DEFAULT_FROM_EMAIL = '<beneighb@gmail.com>'
 
 # Firebase messaging settings
 
+# Set to 'apps.users.notifications.FakeTransport' to send nothing to FCM
+FCM_TRANSPORT = os.environ.get(
+    'FCM_TRANSPORT', 'apps.users.notifications.FirebaseTransport'
+)
+
 firebase_admin.initialize_app()
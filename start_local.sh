@@ -1,3 +1,8 @@
 source export_local_vars.sh
 
+# Push notifications wait in the outbox until this worker delivers them,
+# chat pushes are only sent after their coalescing window by it
+~/.virtualenvs/beneighb/bin/python3 -B beneighb/manage.py deliver_notifications &
+trap "kill $!" EXIT
+
 ~/.virtualenvs/beneighb/bin/python3 -B beneighb/manage.py runserver